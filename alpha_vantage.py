@@ -0,0 +1,169 @@
+import heapq
+import itertools
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import upstream
+
+# ---------------- CONFIG ----------------
+ALPHA_VANTAGE_API_KEY = os.getenv('ALPHA_VANTAGE_API_KEY')
+BASE_URL = os.getenv('ALPHA_VANTAGE_BASE_URL', 'https://www.alphavantage.co/query')
+CALLS_PER_MINUTE = float(os.getenv('ALPHA_VANTAGE_CALLS_PER_MINUTE', 5))
+NEWS_TTL = float(os.getenv('ALPHA_VANTAGE_NEWS_TTL', 30 * 60))
+NEWS_CACHE_DIR = os.path.join(os.getenv('STOCK_CACHE_DIR', '.cache'), 'news')
+# How long a chat request may wait for a rate-limit token before using the cache
+INTERACTIVE_MAX_WAIT = float(os.getenv('ALPHA_VANTAGE_MAX_WAIT', 5))
+REQUEST_TIMEOUT = 10
+
+# Lower value goes first
+INTERACTIVE = 0
+BACKGROUND = 1
+
+
+class TokenBucket:
+    """Token-bucket rate limiter whose waiters are served in priority order"""
+
+    def __init__(self, per_minute, capacity=None, clock=time.monotonic):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or max(1.0, per_minute)
+        self.tokens = self.capacity
+        self.clock = clock
+        self.updated = clock()
+        self._cond = threading.Condition()
+        self._waiters = []
+        self._seq = itertools.count()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return now
+
+    def acquire(self, priority=INTERACTIVE, timeout=None):
+        """Take one token, waiting up to timeout seconds; False if none was granted"""
+        entry = (priority, next(self._seq))
+        with self._cond:
+            deadline = None if timeout is None else self.clock() + timeout
+            heapq.heappush(self._waiters, entry)
+            try:
+                while True:
+                    now = self._refill()
+                    if self._waiters[0] == entry and self.tokens >= 1:
+                        self.tokens -= 1
+                        return True
+                    wait = (1 - self.tokens) / self.rate if self._waiters[0] == entry else None
+                    if deadline is not None:
+                        if now >= deadline:
+                            return False
+                        wait = deadline - now if wait is None else min(wait, deadline - now)
+                    self._cond.wait(wait)
+            finally:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+
+
+class AlphaVantageClient:
+    """Alpha Vantage client with a pooled session, rate limiting and a disk news cache"""
+
+    def __init__(self, api_key=ALPHA_VANTAGE_API_KEY, base_url=BASE_URL, limiter=None,
+                 cache_dir=NEWS_CACHE_DIR, news_ttl=NEWS_TTL):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.limiter = limiter or TokenBucket(CALLS_PER_MINUTE)
+        self.cache_dir = cache_dir
+        self.news_ttl = news_ttl
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=upstream.HOST_LIMITS['alphavantage'])
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _cache_path(self, symbol):
+        safe = re.sub(r'[^A-Za-z0-9._^-]', '_', symbol.upper())
+        return os.path.join(self.cache_dir, f"{safe}.json")
+
+    def _read_cache(self, symbol):
+        try:
+            with open(self._cache_path(symbol)) as f:
+                entry = json.load(f)
+            return entry['fetched_at'], [tuple(item) for item in entry['items']]
+        except (FileNotFoundError, ValueError, KeyError):
+            return None, []
+
+    def _write_cache(self, symbol, items):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'fetched_at': time.time(), 'items': items}, f)
+            os.replace(tmp_path, self._cache_path(symbol))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def query(self, params, priority=INTERACTIVE):
+        """Make one rate-limited API call; None if no token or the call failed"""
+        if not self.api_key:
+            return None
+        max_wait = upstream.timeout_for(INTERACTIVE_MAX_WAIT) if priority == INTERACTIVE else None
+        if not self.limiter.acquire(priority, timeout=max_wait):
+            return None
+        try:
+            with upstream.slot('alphavantage', 'query'):
+                response = self.session.get(
+                    self.base_url, params={**params, 'apikey': self.api_key},
+                    timeout=upstream.timeout_for(REQUEST_TIMEOUT)
+                )
+            data = response.json()
+        except Exception:
+            return None
+        # Quota and usage messages come back as HTTP 200 with a note instead of data
+        if 'Note' in data or 'Information' in data or 'Error Message' in data:
+            return None
+        return data
+
+    def news(self, symbol, priority=INTERACTIVE, limit=3):
+        """Latest (title, url) headlines, served from the cache while it is fresh"""
+        fetched_at, cached = self._read_cache(symbol)
+        if fetched_at is not None and time.time() - fetched_at < self.news_ttl:
+            return cached[:limit]
+
+        data = self.query({'function': 'NEWS_SENTIMENT', 'tickers': symbol}, priority)
+        if data is None:
+            # Stale headlines beat none when the quota is used up
+            return cached[:limit]
+
+        items = []
+        for item in data.get('feed', []):
+            title = item.get('title', '')
+            url = item.get('url', '')
+            if title and url:
+                items.append((title, url))
+        self._write_cache(symbol, items[:10])
+        return items[:limit]
+
+    def refresh_news(self, symbols):
+        """Refresh cached news in the background, behind any interactive requests"""
+        for symbol in symbols:
+            self.news(symbol, priority=BACKGROUND)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Process-wide client, so the session pool and rate limit are shared"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = AlphaVantageClient()
+        return _client
@@ -1,20 +1,32 @@
 import streamlit as st
 import yfinance as yf
-import plotly.graph_objs as go
-from datetime import date
-from prophet import Prophet
-from prophet.plot import plot_plotly
+from contextlib import nullcontext
+from datetime import date, timedelta
+from functools import partial
 import pandas as pd
-import ta
-from io import BytesIO
 import os
 from dotenv import load_dotenv
-import requests
+import threading
+import time
 
-# Load environment variables
+# Load environment variables (before the local modules read their settings)
 load_dotenv()
+import data_store
+import forecasters
+import forecasting
+import indicators
+import live
+import rendering
+import shared_cache
+import exports
+import tickers
+import tracing
+
 ALPHA_VANTAGE_API_KEY = os.getenv('ALPHA_VANTAGE_API_KEY')
 
+# Prometheus-style /metrics endpoint, when TRACING_ENABLED and METRICS_PORT are set
+tracing.start_metrics_server()
+
 # ---------------- CONFIG ----------------
 st.set_page_config(page_title="📈 Stock Price Dashboard", layout="wide")
 st.title("📈 Global Stock Price Dashboard")
@@ -22,72 +34,8 @@ st.title("📈 Global Stock Price Dashboard")
 # ---------------- SIDEBAR ----------------
 st.sidebar.header("Select Stock & Period")
 
-# COMPREHENSIVE STOCK OPTIONS
-ticker_options = {
-    "--- Popular US Tech Stocks ---": None,
-    "Apple (AAPL)": "AAPL", "Microsoft (MSFT)": "MSFT", "Alphabet/Google (GOOGL)": "GOOGL",
-    "Amazon (AMZN)": "AMZN", "Tesla (TSLA)": "TSLA", "Meta Platforms (META)": "META",
-    "NVIDIA (NVDA)": "NVDA", "Netflix (NFLX)": "NFLX", "Adobe (ADBE)": "ADBE",
-    "Salesforce (CRM)": "CRM", "Oracle (ORCL)": "ORCL", "Intel (INTC)": "INTC",
-    "AMD (AMD)": "AMD", "Cisco (CSCO)": "CSCO", "IBM (IBM)": "IBM",
-    
-    "--- US Financial & Healthcare ---": None,
-    "Berkshire Hathaway (BRK-B)": "BRK-B", "J.P. Morgan Chase (JPM)": "JPM", "Visa (V)": "V",
-    "Mastercard (MA)": "MA", "Bank of America (BAC)": "BAC", "Wells Fargo (WFC)": "WFC",
-    "Johnson & Johnson (JNJ)": "JNJ", "Pfizer (PFE)": "PFE", "UnitedHealth (UNH)": "UNH",
-    "Moderna (MRNA)": "MRNA", "AbbVie (ABBV)": "ABBV", "Merck (MRK)": "MRK",
-    
-    "--- US Consumer & Industrial ---": None,
-    "Walmart (WMT)": "WMT", "Procter & Gamble (PG)": "PG", "Coca-Cola (KO)": "KO",
-    "PepsiCo (PEP)": "PEP", "McDonald's (MCD)": "MCD", "Nike (NKE)": "NKE",
-    "Home Depot (HD)": "HD", "Disney (DIS)": "DIS", "Starbucks (SBUX)": "SBUX",
-    "Boeing (BA)": "BA", "Caterpillar (CAT)": "CAT", "3M (MMM)": "MMM",
-    
-    "--- US Energy & Utilities ---": None,
-    "Exxon Mobil (XOM)": "XOM", "Chevron (CVX)": "CVX", "ConocoPhillips (COP)": "COP",
-    "NextEra Energy (NEE)": "NEE", "Dominion Energy (D)": "D", "Duke Energy (DUK)": "DUK",
-    
-    "--- Indian Stocks (NSE) ---": None,
-    "Reliance Industries (RELIANCE.NS)": "RELIANCE.NS", "Tata Consultancy (TCS.NS)": "TCS.NS",
-    "HDFC Bank (HDFCBANK.NS)": "HDFCBANK.NS", "Infosys (INFY.NS)": "INFY.NS",
-    "ICICI Bank (ICICIBANK.NS)": "ICICIBANK.NS", "State Bank of India (SBIN.NS)": "SBIN.NS",
-    "Hindustan Unilever (HINDUNILVR.NS)": "HINDUNILVR.NS", "ITC (ITC.NS)": "ITC.NS",
-    "Bharti Airtel (BHARTIARTL.NS)": "BHARTIARTL.NS", "Kotak Mahindra Bank (KOTAKBANK.NS)": "KOTAKBANK.NS",
-    "Larsen & Toubro (LT.NS)": "LT.NS", "Asian Paints (ASIANPAINT.NS)": "ASIANPAINT.NS",
-    "Maruti Suzuki (MARUTI.NS)": "MARUTI.NS", "Wipro (WIPRO.NS)": "WIPRO.NS",
-    "HCL Technologies (HCLTECH.NS)": "HCLTECH.NS", "Tech Mahindra (TECHM.NS)": "TECHM.NS",
-    
-    "--- Chinese & Asian Stocks ---": None,
-    "Alibaba (BABA)": "BABA", "Tencent (TCEHY)": "TCEHY", "JD.com (JD)": "JD",
-    "Baidu (BIDU)": "BIDU", "NIO (NIO)": "NIO", "Pinduoduo (PDD)": "PDD",
-    "Toyota Motor (TM)": "TM", "Sony (SONY)": "SONY", "SoftBank (SFTBY)": "SFTBY",
-    "Samsung (005930.KS)": "005930.KS", "Taiwan Semiconductor (TSM)": "TSM",
-    
-    "--- European Stocks ---": None,
-    "ASML Holding (ASML)": "ASML", "SAP (SAP)": "SAP", "Nestle (NSRGY)": "NSRGY",
-    "LVMH (LVMUY)": "LVMUY", "Unilever (UL)": "UL", "Shell (SHEL)": "SHEL",
-    "Novo Nordisk (NVO)": "NVO", "Roche (RHHBY)": "RHHBY", "Siemens (SIEGY)": "SIEGY",
-    
-    "--- Cryptocurrency Stocks ---": None,
-    "Coinbase (COIN)": "COIN", "MicroStrategy (MSTR)": "MSTR", "Block (SQ)": "SQ",
-    "PayPal (PYPL)": "PYPL", "Robinhood (HOOD)": "HOOD",
-    
-    "--- ETFs & Funds ---": None,
-    "SPDR S&P 500 ETF (SPY)": "SPY", "Invesco QQQ (QQQ)": "QQQ", "Vanguard Total Stock (VTI)": "VTI",
-    "iShares MSCI Emerging Markets (EEM)": "EEM", "Vanguard FTSE Developed (VEA)": "VEA",
-    "ARK Innovation ETF (ARKK)": "ARKK", "Technology Select Sector (XLK)": "XLK",
-    
-    "--- Global Market Indices ---": None,
-    "S&P 500 (^GSPC)": "^GSPC", "Dow Jones (^DJI)": "^DJI", "Nasdaq Composite (^IXIC)": "^IXIC",
-    "Nasdaq 100 (^NDX)": "^NDX", "Russell 2000 (^RUT)": "^RUT",
-    "Nifty 50 India (^NSEI)": "^NSEI", "Sensex India (^BSESN)": "^BSESN",
-    "FTSE 100 UK (^FTSE)": "^FTSE", "DAX Germany (^GDAXI)": "^GDAXI",
-    "CAC 40 France (^FCHI)": "^FCHI", "Nikkei 225 Japan (^N225)": "^N225",
-    "Hang Seng Hong Kong (^HSI)": "^HSI", "Shanghai Composite (000001.SS)": "000001.SS"
-}
-
 # Clean the options to remove separators (None values) before passing to selectbox
-display_options = {k: v for k, v in ticker_options.items() if v is not None}
+display_options = tickers.display_options()
 
 selected_company = st.sidebar.selectbox("Choose Stock or Index", list(display_options.keys()))
 ticker = display_options.get(selected_company)
@@ -98,74 +46,321 @@ if custom_ticker:
 
 start_date = st.sidebar.date_input("Start Date", date(2023, 1, 1))
 end_date = st.sidebar.date_input("End Date", date.today())
+interval = st.sidebar.selectbox(
+    "Interval", ['1d', *data_store.INTERVAL_SECONDS],
+    help="Intraday bars only go back so far: 30 days for 1m, 60 for 5m/15m, 730 for 1h"
+)
 
 # Toggles
-show_forecast = st.sidebar.checkbox("Show 30-Day Forecast (Prophet)")
+show_forecast = st.sidebar.checkbox("Show 30-Day Forecast")
+forecast_backend = st.sidebar.selectbox(
+    "Forecast model", list(forecasters.FORECASTERS),
+    index=list(forecasters.FORECASTERS).index(forecasters.FORECAST_BACKEND),
+    format_func=lambda name: forecasters.FORECASTERS[name].label,
+    disabled=not show_forecast,
+)
 show_rsi = st.sidebar.checkbox("Show RSI")
 show_macd = st.sidebar.checkbox("Show MACD")
+live_mode = st.sidebar.checkbox("🔴 Live mode", help=f"Refresh the latest {live.LIVE_INTERVAL} bars every {live.LIVE_POLL_SECONDS:.0f}s")
+show_timings = st.sidebar.checkbox("🛠 Show stage timings")
+
+# Combined export of several tickers, built one ticker at a time on click
+with st.sidebar.expander("📦 Export several tickers"):
+    export_names = st.multiselect("Tickers", list(display_options.keys()))
+    combined_format = st.selectbox("Format", list(exports.DATA_FORMATS), key="combined_format")
+    st.caption(f"Bars at the sidebar interval ({interval})")
+    if export_names:
+        combined_extension, combined_mime = exports.DATA_FORMATS[combined_format]
+        if interval == '1d':
+            load_export = partial(data_store.get_history, start=start_date, end=end_date)
+        else:
+            # Same intraday range as the chart: the end date is included
+            def load_export(export_ticker):
+                return data_store.expand_bars(data_store.get_intraday(
+                    export_ticker, interval, start_date, end_date + timedelta(days=1)
+                ))
+        st.download_button(
+            "⬇️ Download combined file",
+            partial(
+                exports.export_tickers,
+                [display_options[name] for name in export_names],
+                load_export,
+                combined_format
+            ),
+            f"stocks_{interval}_{start_date}_{end_date}.{combined_extension}", combined_mime, on_click="ignore"
+        )
+
+# ---------------- CACHED PIPELINE ----------------
+# Each artifact is cached separately, keyed on (ticker, start, end, params), so a
+# toggle only computes the one piece that changed. Ranges ending today carry a
+# time bucket in the key and expire every LIVE_TTL_SECONDS; older entries fall
+# out through LRU eviction once max_entries is reached.
+LIVE_TTL_SECONDS = 60
+CACHE_MAX_ENTRIES = 128
+FORECAST_POLL_SECONDS = 1
+# Load Prophet and the PNG renderer in the background after the first page
+# is served, so the first forecast or chart download does not pay for them
+WARMUP_ON_START = os.getenv('APP_WARMUP', '').lower() in ('1', 'true', 'yes')
+
+
+def freshness_key(end):
+    """Return a time bucket for ranges ending today, None for historical ranges"""
+    if end >= date.today():
+        return int(time.time() // LIVE_TTL_SECONDS)
+    return None
+
+
+def shared_ttl(as_of):
+    """Shared-cache lifetime: live ranges expire with their bucket, historical ones stay until evicted"""
+    return LIVE_TTL_SECONDS if as_of is not None else None
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def load_bars(ticker, start, end, as_of=None, interval='1d'):
+    """OHLCV bars for the selected range and interval, shared by every session and worker"""
+    with tracing.span('bars.load'):
+        if interval == '1d':
+            return shared_cache.cached(
+                'bars', (ticker, start, end, as_of),
+                lambda: data_store.get_history(ticker, start, end), shared_ttl(as_of)
+            )
+        # Intraday ranges include the end date; the compact bars are what gets shared
+        compact = shared_cache.cached(
+            'bars', (ticker, start, end, as_of, interval),
+            lambda: data_store.get_intraday(ticker, interval, start, end + timedelta(days=1)), shared_ttl(as_of)
+        )
+        return data_store.expand_bars(compact)
+
+
+def visible_bars(data, view=None):
+    """Bars inside the zoomed (start, end) dates, or all bars when not zoomed"""
+    if view is None:
+        return data
+    dates = data.index.date
+    return data[(dates >= view[0]) & (dates <= view[1])]
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def build_close_chart(ticker, start, end, as_of=None, interval='1d', view=None):
+    """Downsampled closing-price figure for the visible range"""
+    data = visible_bars(load_bars(ticker, start, end, as_of, interval), view)
+    with tracing.span('chart.close'):
+        return rendering.line_figure(data['Close'])
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def build_candlestick(ticker, start, end, as_of=None, interval='1d', view=None):
+    """Candlestick figure for the visible range, aggregated to fit the chart"""
+    data = visible_bars(load_bars(ticker, start, end, as_of, interval), view)
+    with tracing.span('chart.candlestick'):
+        return rendering.candlestick_figure(data)
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def compute_rsi(ticker, start, end, as_of=None, interval='1d', window=14):
+    """RSI series for the selected range"""
+    def compute():
+        data = load_bars(ticker, start, end, as_of, interval)
+        with tracing.span('indicators.rsi'):
+            values = indicators.rsi(data['Close'].to_numpy(), window)[0]
+        return pd.Series(values, index=data.index, name="RSI")
+
+    return shared_cache.cached(
+        'indicators', ('rsi', ticker, start, end, as_of, interval, window), compute, shared_ttl(as_of)
+    )
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def compute_macd(ticker, start, end, as_of=None, interval='1d', fast=12, slow=26, signal=9):
+    """MACD and signal lines for the selected range"""
+    def compute():
+        data = load_bars(ticker, start, end, as_of, interval)
+        with tracing.span('indicators.macd'):
+            macd, macd_signal, _ = indicators.macd(data['Close'].to_numpy(), fast, slow, signal)
+        return pd.DataFrame({
+            "MACD": macd[0],
+            "Signal": macd_signal[0]
+        }, index=data.index)
+
+    return shared_cache.cached(
+        'indicators', ('macd', ticker, start, end, as_of, interval, fast, slow, signal), compute, shared_ttl(as_of)
+    )
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def forecast_figure(job_key):
+    """Plot a finished forecast job"""
+    _, result = forecasting.get_forecast(job_key)
+    if result['backend'] != 'prophet':
+        with tracing.span('forecast.plot'):
+            return rendering.forecast_figure(result['forecast'])
+
+    # Prophet is only imported once a forecast is shown; it adds seconds to startup
+    from prophet.plot import plot_plotly
+    from prophet.serialize import model_from_json
+
+    with tracing.span('prophet.plot'):
+        return plot_plotly(model_from_json(result['model']), result['forecast'])
+
+
+@st.fragment(run_every=FORECAST_POLL_SECONDS)
+def poll_forecast(job_key):
+    """Wait for a forecast job without blocking the rest of the page"""
+    status, _ = forecasting.get_forecast(job_key)
+    if status == forecasting.PENDING:
+        st.info("⏳ Fitting forecast model... the chart will appear when it's ready.")
+    else:
+        st.rerun()
+
+
+@st.cache_resource(show_spinner=False)
+def start_warmup():
+    """Warm the forecast and export stacks once per server process"""
+    def warm():
+        forecasting.warm_up()
+        try:
+            import prophet.plot  # noqa: F401
+        except ImportError:
+            pass
+        exports.start_renderer()
+
+    thread = threading.Thread(target=warm, daemon=True, name="warmup")
+    thread.start()
+    return thread
+
+
+@st.cache_resource(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def live_series(ticker):
+    """One live series per ticker, shared by every session watching it"""
+    return live.LiveSeries(ticker, live.get_feed()).seed()
+
+
+@st.fragment(run_every=live.LIVE_POLL_SECONDS)
+def live_panel(ticker):
+    """Poll the newest bars and redraw only this part of the page"""
+    series = live_series(ticker)
+    series.poll()
+    bars = series.frame()
+    if bars.empty:
+        st.info(f"No {live.LIVE_INTERVAL} bars available for {ticker} right now.")
+        return
+
+    values = series.values()
+    short = series.short_indicators()
+
+    def shown(name, text):
+        return 'N/A' if name in short else text
+
+    last, first = bars['Close'].iloc[-1], bars['Open'].iloc[0]
+    macd_line, macd_signal, _ = values['macd']
+    col_price, col_rsi, col_macd, col_trend = st.columns(4)
+    col_price.metric("Last", f"{last:,.2f}", f"{(last / first - 1) * 100:.2f}% in window")
+    col_rsi.metric("RSI (14)", shown('rsi', f"{values['rsi']:.1f}"))
+    col_macd.metric("MACD", shown('macd', f"{macd_line:.3f}"),
+                    None if 'macd' in short else f"{macd_line - macd_signal:+.3f} vs signal")
+    sma_20, sma_50 = shown('sma_20', f"{values['sma_20']:,.2f}"), shown('sma_50', f"{values['sma_50']:,.2f}")
+    col_trend.metric("SMA 20 / 50", f"{sma_20} / {sma_50}")
+    if short:
+        st.warning(", ".join(f"{name.upper().replace('_', ' ')} needs {window} bars" for name, window in short.items())
+                   + f"; only {len(bars)} available so far")
+    st.plotly_chart(rendering.candlestick_figure(bars), use_container_width=True)
+    st.caption(f"Last bar {bars.index[-1]:%Y-%m-%d %H:%M %Z} · refreshes every {live.LIVE_POLL_SECONDS:.0f}s")
+
 
 # ---------------- MAIN SECTION ----------------
-if ticker:
-    try:
-        stock = yf.Ticker(ticker)
-        data = stock.history(start=start_date, end=end_date)
+# Spans are only collected while the debug panel is open (or TRACING_ENABLED is set)
+with (tracing.capture() if show_timings else nullcontext()) as stage_timings:
+    if ticker:
+        try:
+            as_of = freshness_key(end_date)
+            data = load_bars(ticker, start_date, end_date, as_of, interval)
+
+            if data.empty:
+                st.error(f"⚠️ No data found for ticker '{ticker}' and date range. Please verify the ticker symbol.")
+            else:
+                if interval != '1d' and data.index[0].date() > start_date:
+                    st.caption(f"{interval} bars are only available from {data.index[0]:%Y-%m-%d}.")
+
+                # Long ranges are downsampled to the chart width; zooming in
+                # narrows the range until the bars are shown at full resolution
+                view = None
+                if len(data) > rendering.CHART_MAX_POINTS:
+                    first_day, last_day = data.index[0].date(), data.index[-1].date()
+                    view = st.slider("🔎 Zoom", min_value=first_day, max_value=last_day, value=(first_day, last_day))
+                    shown = len(visible_bars(data, view))
+                    if shown > rendering.CHART_MAX_POINTS:
+                        st.caption(f"Showing {shown:,} bars downsampled to {rendering.CHART_MAX_POINTS:,} points. Zoom in for full resolution.")
+
+                st.subheader(f"📈 Closing Price: {ticker}")
+                st.plotly_chart(build_close_chart(ticker, start_date, end_date, as_of, interval, view), use_container_width=True)
 
-        if data.empty:
-            st.error(f"⚠️ No data found for ticker '{ticker}' and date range. Please verify the ticker symbol.")
+                st.subheader("🔍 Candlestick Chart")
+                fig = build_candlestick(ticker, start_date, end_date, as_of, interval, view)
+                st.plotly_chart(fig, use_container_width=True)
+
+                # Live mode redraws only its own fragment, not the page
+                if live_mode:
+                    st.subheader(f"🔴 Live ({live.LIVE_INTERVAL} bars)")
+                    live_panel(ticker)
+
+                # Download buttons: files are only built when a button is clicked
+                col_format, col_data, col_chart = st.columns(3)
+                export_format = col_format.selectbox("Data format", list(exports.DATA_FORMATS), label_visibility="collapsed")
+                extension, mime = exports.DATA_FORMATS[export_format]
+                col_data.download_button(
+                    "📅 Download Data", partial(exports.export_data, data, export_format),
+                    f"{ticker}_data.{extension}", mime, on_click="ignore"
+                )
+                col_chart.download_button(
+                    "📷 Download Chart (PNG)", partial(exports.figure_png, fig),
+                    f"{ticker}_chart.png", "image/png", on_click="ignore"
+                )
+
+                # RSI
+                if show_rsi:
+                    st.subheader("📊 RSI - Relative Strength Index")
+                    st.line_chart(compute_rsi(ticker, start_date, end_date, as_of, interval))
+
+                # MACD
+                if show_macd:
+                    st.subheader("📊 MACD - Moving Average Convergence Divergence")
+                    st.line_chart(compute_macd(ticker, start_date, end_date, as_of, interval))
+
+                # Forecast
+                if show_forecast and interval != '1d':
+                    st.info("🔮 Forecasts are built from daily bars; switch the interval to 1d to see one.")
+                elif show_forecast:
+                    st.subheader(f"🔮 Forecast using {forecasters.FORECASTERS[forecast_backend].label} (30 Days)")
+                    job_key = forecasting.submit_forecast(
+                        forecasting.prepare_series(data), periods=30, backend=forecast_backend
+                    )
+                    status, result = forecasting.get_forecast(job_key)
+                    if status == forecasting.DONE:
+                        st.plotly_chart(forecast_figure(job_key), use_container_width=True)
+                    elif status == forecasting.ERROR:
+                        st.error(f"❌ Forecast failed: {result}")
+                    else:
+                        poll_forecast(job_key)
+
+        except Exception as e:
+            st.error(f"❌ Error fetching data for {ticker}: {e}")
+
+if show_timings:
+    with st.sidebar.expander("🛠 Stage timings", expanded=True):
+        if stage_timings:
+            timings = pd.DataFrame(stage_timings, columns=["Stage", "Seconds"])
+            st.dataframe(timings.groupby("Stage", sort=False).sum().round(4), use_container_width=True)
         else:
-            st.subheader(f"📈 Closing Price: {ticker}")
-            st.line_chart(data['Close'])
-
-            st.subheader("🔍 Candlestick Chart")
-            fig = go.Figure(data=[go.Candlestick(
-                x=data.index, open=data['Open'], high=data['High'],
-                low=data['Low'], close=data['Close']
-            )])
-            fig.update_layout(xaxis_rangeslider_visible=False)
-            st.plotly_chart(fig, use_container_width=True)
-
-            # Download buttons
-            csv = data.to_csv().encode()
-            st.download_button("📅 Download Data (CSV)", csv, f"{ticker}_data.csv", "text/csv")
-
-            buf = BytesIO()
-            fig.write_image(buf, format="png")
-            st.download_button("📷 Download Chart (PNG)", buf.getvalue(), f"{ticker}_chart.png", "image/png")
-
-            # RSI
-            if show_rsi:
-                st.subheader("📊 RSI - Relative Strength Index")
-                rsi = ta.momentum.RSIIndicator(close=data['Close']).rsi()
-                st.line_chart(rsi)
-
-            # MACD
-            if show_macd:
-                st.subheader("📊 MACD - Moving Average Convergence Divergence")
-                macd = ta.trend.MACD(data['Close'])
-                macd_df = pd.DataFrame({
-                    "MACD": macd.macd(),
-                    "Signal": macd.macd_signal()
-                })
-                st.line_chart(macd_df)
-
-            # Forecast
-            if show_forecast:
-                st.subheader("🔮 Forecast using Prophet (30 Days)")
-                df = data.reset_index()[['Date', 'Close']]
-                df['Date'] = df['Date'].dt.tz_localize(None)
-                df.rename(columns={"Date": "ds", "Close": "y"}, inplace=True)
-
-                model = Prophet()
-                model.fit(df)
-
-                future = model.make_future_dataframe(periods=30)
-                forecast = model.predict(future)
-
-                forecast_plot = plot_plotly(model, forecast)
-                st.plotly_chart(forecast_plot, use_container_width=True)
-
-    except Exception as e:
-        st.error(f"❌ Error fetching data for {ticker}: {e}")
+            st.caption("Every stage was served from cache on this run.")
+        if tracing.ENABLED:
+            st.caption("Since startup (seconds)")
+            summary = pd.DataFrame.from_dict(tracing.stage_summary(), orient="index")
+            if not summary.empty:
+                st.dataframe(summary[["count", "p50", "p95", "p99"]].round(4), use_container_width=True)
+        shared = shared_cache.get_cache()
+        if shared is not None:
+            st.caption("Shared cache (all sessions and workers)")
+            st.dataframe(pd.DataFrame.from_dict(shared.stats(), orient="index").fillna(0).round(3), use_container_width=True)
 
 # ---------------- INTEGRATED RAG CHATBOT ----------------
 st.markdown("---")
@@ -265,3 +460,7 @@ with col3:
 with col4:
     if st.button("What is RSI?"):
         st.rerun()
+
+# Warm-up runs last so it never delays the first render
+if WARMUP_ON_START:
+    start_warmup()
@@ -0,0 +1,182 @@
+import hmac
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import market_data
+import response_cache
+import tracing
+import upstream
+
+# ---------------- CONFIG ----------------
+BATCH_MAX_QUERIES = int(os.getenv('BATCH_MAX_QUERIES', 1000))
+# Symbols per batched snapshot fetch; chunks run concurrently up to the Yahoo slot limit
+BATCH_FETCH_SIZE = int(os.getenv('BATCH_FETCH_SIZE', 50))
+BATCH_WORKERS = int(os.getenv('BATCH_WORKERS', 16))
+# Whole-batch deadline; calls still waiting on upstream after it give up
+BATCH_DEADLINE_SECONDS = float(os.getenv('BATCH_DEADLINE_SECONDS', 120))
+# Local only by default; set BATCH_API_TOKEN before exposing it on other interfaces
+BATCH_API_HOST = os.getenv('BATCH_API_HOST', '127.0.0.1')
+BATCH_API_TOKEN = os.getenv('BATCH_API_TOKEN')
+
+
+class BatchRunner:
+    """Answers many chatbot queries, fetching each distinct symbol once
+
+    Queries are classified up front and grouped by what their answer depends
+    on, so duplicates are rendered once. Static answers and news start right
+    away; the quote snapshots for every distinct symbol are fetched in a few
+    concurrent batched calls, and each answer that needs them is rendered as
+    soon as the chunks holding its symbols land. Results are yielded as they
+    complete, not in order.
+    """
+
+    def __init__(self, classify, respond, quote_intents):
+        self.classify = classify
+        self.respond = respond
+        self.quote_intents = set(quote_intents)
+
+    def _render(self, message, intent, symbols):
+        started = time.perf_counter()
+        try:
+            return {'response': self.respond(message, intent, symbols), 'seconds': time.perf_counter() - started}
+        except Exception as e:
+            tracing.count('batch_query_errors_total')
+            return {'error': str(e), 'seconds': time.perf_counter() - started}
+
+    @staticmethod
+    def _prefetch(symbols, pool):
+        """{symbol: future of the chunk fetching it}"""
+        chunk_of = {}
+        for i in range(0, len(symbols), BATCH_FETCH_SIZE):
+            chunk = symbols[i:i + BATCH_FETCH_SIZE]
+            future = upstream.submit(pool, market_data.fetch_snapshots, chunk)
+            chunk_of.update(dict.fromkeys(chunk, future))
+        return chunk_of
+
+    def run(self, queries):
+        """Yield one result dict per query, as each answer completes, then a summary"""
+        began = time.perf_counter()
+        groups = {}   # answer key -> (message, intent, symbols, [query indices])
+        for index, message in enumerate(queries):
+            intent, symbols = self.classify(message)
+            # The fallback answer quotes the message, so it cannot be shared
+            key = (intent, message) if intent == 'fallback' else response_cache.response_key(intent, symbols)
+            groups.setdefault(key, (message, intent, symbols, []))[3].append(index)
+
+        quote_symbols = list(dict.fromkeys(
+            symbol for _, intent, symbols, _ in groups.values() if intent in self.quote_intents for symbol in symbols
+        ))
+
+        with upstream.deadline(BATCH_DEADLINE_SECONDS), \
+                ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix='batch') as pool:
+            renders = {
+                upstream.submit(pool, self._render, message, intent, symbols): (message, intent, symbols, indices)
+                for message, intent, symbols, indices in groups.values() if intent not in self.quote_intents
+            }
+            with tracing.span('batch.prefetch'):
+                chunk_of = self._prefetch(quote_symbols, pool)
+            fetches = set(chunk_of.values())
+            # Quote answers with the chunk fetches they wait for
+            waiting = [
+                (group, {chunk_of[symbol] for symbol in group[2]})
+                for group in groups.values() if group[1] in self.quote_intents
+            ]
+
+            while True:
+                ready = [group for group, needs in waiting if not needs & fetches]
+                waiting = [(group, needs) for group, needs in waiting if needs & fetches]
+                # Their snapshots are in the quote cache now; these answers only read it
+                for message, intent, symbols, indices in ready:
+                    renders[upstream.submit(pool, self._render, message, intent, symbols)] = (message, intent, symbols, indices)
+                if not renders and not fetches:
+                    break
+                done, _ = wait(set(renders) | fetches, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in fetches:
+                        fetches.discard(future)
+                        continue
+                    message, intent, symbols, indices = renders.pop(future)
+                    result = future.result()
+                    for index in indices:
+                        yield {'index': index, 'query': queries[index], 'intent': intent, 'symbols': list(symbols), **result}
+
+        tracing.count('batch_queries_total', amount=len(queries))
+        yield {
+            'done': True,
+            'queries': len(queries),
+            'distinct_answers': len(groups),
+            'distinct_symbols': len(quote_symbols),
+            'seconds': time.perf_counter() - began,
+        }
+
+
+class _BatchHandler(BaseHTTPRequestHandler):
+    """POST /query with {"queries": [...]}; answers stream back as NDJSON lines"""
+
+    def _error(self, status, message):
+        body = json.dumps({'error': message}).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if self.path.split('?')[0] != '/query':
+            self.send_error(404)
+            return
+        if BATCH_API_TOKEN and not hmac.compare_digest(
+                self.headers.get('Authorization', ''), f"Bearer {BATCH_API_TOKEN}"):
+            self._error(401, 'missing or wrong bearer token')
+            return
+        try:
+            payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            queries = payload['queries'] if isinstance(payload, dict) else payload
+        except (ValueError, KeyError, TypeError):
+            self._error(400, 'expected a JSON body like {"queries": ["AAPL price", ...]}')
+            return
+        if not isinstance(queries, list) or not all(isinstance(q, str) and q.strip() for q in queries):
+            self._error(400, 'queries must be a list of non-empty strings')
+            return
+        if len(queries) > BATCH_MAX_QUERIES:
+            self._error(413, f"at most {BATCH_MAX_QUERIES} queries per request")
+            return
+
+        # No Content-Length: the body is the stream, ended by closing the connection
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        with tracing.span('batch.request'):
+            for result in self.server.runner.run(queries):
+                try:
+                    self.wfile.write((json.dumps(result, default=str) + "\n").encode())
+                    self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    return
+
+    def log_message(self, *args):
+        pass
+
+
+_server = None
+_lock = threading.Lock()
+
+
+def start_server(runner, port, host=BATCH_API_HOST):
+    """Serve the batch endpoint on a background thread once per process"""
+    global _server
+    with _lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host, port), _BatchHandler)
+            except OSError as e:
+                print(f"[WARN] Batch query API not started on port {port}: {e}")
+                return None
+            _server.runner = runner
+            threading.Thread(target=_server.serve_forever, daemon=True, name='batch-api').start()
+        return _server
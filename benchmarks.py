@@ -0,0 +1,517 @@
+import argparse
+import ast
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+import indicators
+
+# ---------------- CONFIG ----------------
+TOLERANCE = 1e-6
+# Symbols the replay benchmarks need fixtures for
+REPLAY_SYMBOLS = ['AAPL', 'TSLA', 'NVDA', 'MSFT', 'GOOGL', 'AMZN', '^NSEI']
+# One query per process_query intent branch
+CHATBOT_QUERIES = {
+    'comparison': "compare AAPL vs TSLA",
+    'price': "AAPL stock price",
+    'news': "news about TSLA",
+    'macd': "What is MACD?",
+    'rsi': "What is RSI indicator?",
+    'nifty': "Tell me about the nifty index",
+    'sensex': "What is the sensex index?",
+    'overview': "Tell me about NVDA",
+    'prediction': "top stock to buy next week",
+    'fallback': "hello there",
+}
+# Cold import of everything app.py loads before drawing the first page
+STARTUP_BUDGET_SECONDS = float(os.getenv('STARTUP_BUDGET_SECONDS', 3.0))
+# Modules that must only load when their feature is first used
+DEFERRED_MODULES = ['prophet', 'cmdstanpy', 'kaleido', 'ta']
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """Register a benchmark function under a name"""
+    def register(func):
+        BENCHMARKS[name] = func
+        return func
+    return register
+
+
+def timed(func, repeat=5):
+    """Median wall time of func over several runs, in seconds"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def random_closes(n_tickers, n_bars, seed=0):
+    """Random-walk closes with ragged history lengths, one list entry per ticker"""
+    rng = np.random.default_rng(seed)
+    paths = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (n_tickers, n_bars)), axis=1))
+    lengths = rng.integers(n_bars // 2, n_bars + 1, n_tickers)
+    return [paths[i, n_bars - lengths[i]:] for i in range(n_tickers)]
+
+
+@benchmark("indicators")
+def bench_indicators(n_tickers=120, n_bars=750):
+    """Vectorized indicator engine vs per-ticker ta, with a parity check"""
+    import ta
+
+    series = [pd.Series(values) for values in random_closes(n_tickers, n_bars)]
+
+    def run_engine():
+        closes = indicators.stack_closes(series)
+        return {
+            'sma_20': indicators.sma(closes, 20),
+            'sma_50': indicators.sma(closes, 50),
+            'rsi': indicators.rsi(closes),
+            'macd': indicators.macd(closes),
+            'bollinger': indicators.bollinger(closes),
+        }
+
+    def run_ta():
+        results = []
+        for close in series:
+            macd = ta.trend.MACD(close)
+            bands = ta.volatility.BollingerBands(close)
+            results.append({
+                'sma_20': close.rolling(20).mean(),
+                'sma_50': close.rolling(50).mean(),
+                'rsi': ta.momentum.RSIIndicator(close).rsi(),
+                'macd': (macd.macd(), macd.macd_signal(), macd.macd_diff()),
+                'bollinger': (bands.bollinger_mavg(), bands.bollinger_hband(), bands.bollinger_lband()),
+            })
+        return results
+
+    engine, reference = run_engine(), run_ta()
+    max_error = 0.0
+    for i, close in enumerate(series):
+        for name, expected in reference[i].items():
+            actual = engine[name]
+            pairs = zip(actual, expected) if isinstance(expected, tuple) else [(actual, expected)]
+            for got, want in pairs:
+                got, want = got[i, -len(close):], want.to_numpy()
+                if not np.array_equal(np.isnan(got), np.isnan(want)):
+                    max_error = float('inf')
+                elif not np.isnan(want).all():
+                    max_error = max(max_error, float(np.nanmax(np.abs(got - want))))
+
+    engine_seconds = timed(run_engine)
+    ta_seconds = timed(run_ta, repeat=3)
+    return {
+        'tickers': n_tickers,
+        'bars': n_bars,
+        'engine_seconds': engine_seconds,
+        'ta_seconds': ta_seconds,
+        'speedup': ta_seconds / engine_seconds,
+        'max_abs_error': max_error,
+        'matches_ta': max_error <= TOLERANCE,
+    }
+
+
+@benchmark("incremental")
+def bench_incremental(n_tickers=300, n_bars=2500):
+    """Per-bar O(1) indicator updates vs recomputing the full history"""
+    closes = indicators.stack_closes(random_closes(n_tickers, n_bars, seed=1))
+    history, latest = closes[:, :-1], closes[:, -1]
+    states = [indicators.IndicatorSet().seed(row[~np.isnan(row)]) for row in history]
+
+    def run_update():
+        for state, close in zip(states, latest):
+            state.update(close)
+
+    def run_recompute():
+        indicators.sma(closes, 20), indicators.sma(closes, 50)
+        indicators.rsi(closes), indicators.macd(closes)
+
+    # Exactly one update, so the states line up with the full recompute
+    update_seconds = timed(run_update, repeat=1)
+    full_rsi = indicators.rsi(closes)[:, -1]
+    rsi_error = max(abs(state.values()['rsi'] - full) for state, full in zip(states, full_rsi))
+    return {
+        'tickers': n_tickers,
+        'bars': n_bars,
+        'update_seconds': update_seconds,
+        'recompute_seconds': timed(run_recompute, repeat=3),
+        'max_rsi_error': float(rsi_error),
+    }
+
+
+def random_bars(n_bars, seed=0, freq='D'):
+    """Random-walk OHLCV frame with a DatetimeIndex"""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n_bars)))
+    spread = np.abs(rng.normal(0, 0.5, n_bars))
+    return pd.DataFrame({
+        'Open': close + rng.normal(0, 0.2, n_bars),
+        'High': close + spread,
+        'Low': close - spread,
+        'Close': close,
+        'Volume': rng.integers(1_000, 1_000_000, n_bars),
+    }, index=pd.date_range('2000-01-03', periods=n_bars, freq=freq, name='Date'))
+
+
+@benchmark("rendering")
+def bench_rendering(n_bars=50_000):
+    """Chart payload size and build time, raw bars vs downsampled"""
+    import plotly.graph_objs as go
+
+    import rendering
+
+    data = random_bars(n_bars, freq='h')
+
+    def raw_figures():
+        line = go.Figure(data=[go.Scatter(x=data.index, y=data['Close'])])
+        candles = go.Figure(data=[go.Candlestick(
+            x=data.index, open=data['Open'], high=data['High'],
+            low=data['Low'], close=data['Close']
+        )])
+        return len(line.to_json()) + len(candles.to_json())
+
+    def downsampled_figures():
+        line = rendering.line_figure(data['Close'])
+        candles = rendering.candlestick_figure(data)
+        return len(line.to_json()) + len(candles.to_json())
+
+    return {
+        'bars': n_bars,
+        'raw_payload_bytes': raw_figures(),
+        'raw_seconds': timed(raw_figures, repeat=3),
+        'downsampled_payload_bytes': downsampled_figures(),
+        'downsampled_seconds': timed(downsampled_figures, repeat=3),
+        'max_points': rendering.CHART_MAX_POINTS,
+    }
+
+
+@contextmanager
+def replay_environment(latency=None):
+    """Replay recorded fixtures with a throwaway bar store and cold caches"""
+    import data_store
+    import market_data
+    import replay
+
+    fixtures_dir = replay.FIXTURES_DIR
+    if not os.path.exists(replay._fixture_path(fixtures_dir, REPLAY_SYMBOLS[0], 'history.parquet')):
+        fixtures_dir = tempfile.mkdtemp(prefix='replay-fixtures-')
+        replay.generate(REPLAY_SYMBOLS, fixtures_dir)
+
+    saved_bars_dir = data_store.BARS_DIR
+    data_store.BARS_DIR = tempfile.mkdtemp(prefix='bench-bars-')
+    market_data.quote_cache.clear()
+    try:
+        with replay.install(fixtures_dir, replay.REPLAY_LATENCY if latency is None else latency) as provider:
+            yield provider
+    finally:
+        data_store.BARS_DIR = saved_bars_dir
+        market_data.quote_cache.clear()
+
+
+@benchmark("dashboard")
+def bench_dashboard(symbol='AAPL'):
+    """app.py stages on replayed data: fetch, indicators, forecast, figures, export"""
+    import data_store
+    import exports
+    import forecasting
+    import rendering
+
+    end = date.today()
+    start = end - timedelta(days=5 * 365)
+    results = {'symbol': symbol}
+    with replay_environment() as provider:
+        began = time.perf_counter()
+        data = data_store.get_history(symbol, start, end)
+        results['fetch_cold_seconds'] = time.perf_counter() - began
+        results['fetch_warm_seconds'] = timed(lambda: data_store.get_history(symbol, start, end))
+        results['bars'] = len(data)
+        results['upstream_calls'] = dict(provider.calls)
+
+    closes = data['Close'].to_numpy()
+    results['rsi_seconds'] = timed(lambda: indicators.rsi(closes))
+    results['macd_seconds'] = timed(lambda: indicators.macd(closes))
+    results['candlestick_seconds'] = timed(lambda: rendering.candlestick_figure(data).to_json())
+    results['close_chart_seconds'] = timed(lambda: rendering.line_figure(data['Close']).to_json())
+    for fmt in exports.DATA_FORMATS:
+        key = re.sub(r'[^a-z0-9]+', '_', fmt.lower()).strip('_')
+        results[f"export_{key}_seconds"] = timed(
+            lambda: exports.export_data(data, fmt).close(), repeat=3
+        )
+
+    try:
+        import prophet  # noqa: F401
+    except ImportError:
+        results['forecast_seconds'] = None
+    else:
+        series = forecasting.prepare_series(data)
+        results['forecast_seconds'] = timed(lambda: forecasting._fit('prophet', series, 30), repeat=1)
+    return results
+
+
+@benchmark("intraday")
+def bench_intraday(n_tickers=10, days=252):
+    """Compact intraday storage: memory against yfinance frames, and local resampling"""
+    import data_store
+
+    sessions = pd.bdate_range(end=date.today(), periods=days)
+    minutes = pd.DatetimeIndex([
+        stamp for day in sessions
+        for stamp in pd.date_range(day + pd.Timedelta(hours=9, minutes=30), periods=390, freq='min')
+    ]).tz_localize('America/New_York').rename('Datetime')
+    frames = []
+    for seed in range(n_tickers):
+        bars = random_bars(len(minutes), seed=seed, freq='min').set_axis(minutes)
+        frames.append(bars.assign(Dividends=0.0, **{'Stock Splits': 0.0}))
+    compacts = [data_store.compact_bars(frame) for frame in frames]
+
+    results = {
+        'tickers': n_tickers,
+        'rows': sum(len(frame) for frame in frames),
+        'yfinance_bytes': int(sum(frame.memory_usage(deep=True).sum() for frame in frames)),
+        'compact_bytes': int(sum(compact.memory_usage(deep=True).sum() for compact in compacts)),
+        'compact_seconds': timed(lambda: [data_store.compact_bars(frame) for frame in frames], repeat=3),
+    }
+    results['compression'] = results['yfinance_bytes'] / results['compact_bytes']
+    for interval in ('5m', '15m', '1h'):
+        seconds = data_store.INTERVAL_SECONDS[interval]
+        results[f"resample_{interval}_seconds"] = timed(
+            lambda: [data_store.resample_bars(compact, seconds) for compact in compacts], repeat=3
+        )
+    # Chunks overlapping by a day, as neighbouring fetches do around the forming bar
+    day = 390
+    chunks = [compacts[0].iloc[max(0, i - day):i + 5 * day] for i in range(0, len(compacts[0]), 5 * day)]
+    stitched = data_store.stitch_bars(chunks)
+    results['stitch_seconds'] = timed(lambda: data_store.stitch_bars(chunks))
+    results['stitch_matches'] = bool(stitched.equals(compacts[0]))
+    return results
+
+
+@benchmark("chatbot")
+def bench_chatbot():
+    """process_query latency per intent branch: cold, warm quote cache, and cached answer"""
+    import enhanced_rag_app
+    import market_data
+    import response_cache
+
+    def rebuild(query):
+        response_cache.cache.clear()
+        enhanced_rag_app.process_query(query)
+
+    results = {}
+    with replay_environment() as provider:
+        for intent, query in CHATBOT_QUERIES.items():
+            market_data.quote_cache.clear()
+            response_cache.cache.clear()
+            before = sum(provider.calls.values())
+            began = time.perf_counter()
+            enhanced_rag_app.process_query(query)
+            cold = time.perf_counter() - began
+            upstream_calls = sum(provider.calls.values()) - before
+            results[intent] = {
+                'cold_seconds': cold,
+                'warm_seconds': timed(lambda: rebuild(query), repeat=3),
+                'cached_seconds': timed(lambda: enhanced_rag_app.process_query(query), repeat=3),
+                'upstream_calls': upstream_calls,
+            }
+    results['response_cache'] = response_cache.cache.snapshot()
+    return results
+
+
+@benchmark("batch")
+def bench_batch(sizes=(50, 200, 800)):
+    """Batch query API: latency by number of queries over the same replayed symbols"""
+    import batch_api
+    import enhanced_rag_app
+    import market_data
+    import response_cache
+
+    runner = batch_api.BatchRunner(
+        enhanced_rag_app.classify_query, enhanced_rag_app.respond_classified, enhanced_rag_app.QUOTE_INTENTS
+    )
+    templates = ["{0} price", "news about {0}", "compare {0} vs {1}", "Tell me about {0}", "What is RSI?"]
+    symbols = [symbol for symbol in REPLAY_SYMBOLS if not symbol.startswith('^')]
+    results = {}
+    with replay_environment() as provider:
+        for size in sizes:
+            queries = [
+                templates[i % len(templates)].format(symbols[i % len(symbols)], symbols[(i + 1) % len(symbols)])
+                for i in range(size)
+            ]
+            market_data.quote_cache.clear()
+            response_cache.cache.clear()
+            before = sum(provider.calls.values())
+            summary = list(runner.run(queries))[-1]
+            results[str(size)] = {
+                'seconds': summary['seconds'],
+                'distinct_symbols': summary['distinct_symbols'],
+                'distinct_answers': summary['distinct_answers'],
+                'upstream_calls': sum(provider.calls.values()) - before,
+            }
+    return results
+
+
+@benchmark("screener")
+def bench_screener():
+    """Full screener refresh over the ticker_options universe on replayed data"""
+    import replay
+    import screener
+    import tickers
+
+    symbols = [symbol for group in tickers.ticker_groups().values() for symbol in group]
+    fixtures_dir = tempfile.mkdtemp(prefix='screener-fixtures-')
+    replay.generate(symbols, fixtures_dir)
+    with replay.install(fixtures_dir, replay.REPLAY_LATENCY) as provider:
+        histories = screener.fetch_universe(symbols)
+        results = {
+            'symbols': len(symbols),
+            'refresh_seconds': timed(lambda: screener.run_screen(symbols), repeat=3),
+            'downloads_per_refresh': provider.calls['download'] // 4,
+        }
+    results['indicators_seconds'] = timed(lambda: screener.screen(histories))
+    return results
+
+
+@benchmark("forecasters")
+def bench_forecasters(horizon=30, n_watchlist=100):
+    """Rolling-origin backtest of every forecast backend on replayed history, plus watchlist fit time"""
+    import forecasters
+    import market_data
+
+    with replay_environment():
+        histories = market_data.fetch_histories(REPLAY_SYMBOLS, '5y')
+    closes = indicators.stack_closes([histories[symbol]['Close'].to_numpy() for symbol in histories])
+    watchlist = indicators.stack_closes(random_closes(n_watchlist, 750, seed=2))
+
+    results = {'symbols': len(histories), 'bars': closes.shape[1]}
+    for forecaster in [forecasters.BASELINE, *forecasters.FORECASTERS.values()]:
+        if not forecaster.available():
+            results[forecaster.name] = None
+            continue
+        report = forecasters.backtest(closes, forecaster, horizon)
+        if forecaster.batched:
+            # Prophet would take minutes here; its per-series fit time above scales linearly
+            report['watchlist_seconds'] = timed(lambda: forecaster.predict_many(watchlist, horizon), repeat=3)
+            report['watchlist_series'] = n_watchlist
+        results[forecaster.name] = report
+    return results
+
+
+def module_imports(path):
+    """Top-level module names a script imports, in source order"""
+    with open(path) as f:
+        tree = ast.parse(f.read())
+    names = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0:
+            names.append(node.module)
+    return list(dict.fromkeys(names))
+
+
+_STARTUP_PROBE = """
+import json, sys, time
+began = time.perf_counter()
+for name in sys.argv[1:]:
+    __import__(name)
+elapsed = time.perf_counter() - began
+print(json.dumps({'seconds': elapsed, 'modules': sorted(m.split('.')[0] for m in sys.modules)}))
+"""
+
+
+@benchmark("startup")
+def bench_startup(script='app.py', repeat=3):
+    """Cold import time of a script's module graph, checked against the budget"""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), script)
+    names = module_imports(path)
+    samples, loaded = [], set()
+    for _ in range(repeat):
+        # A fresh interpreter each time, so nothing is already imported
+        output = subprocess.run(
+            [sys.executable, '-c', _STARTUP_PROBE, *names],
+            cwd=os.path.dirname(path), capture_output=True, text=True, check=True
+        ).stdout
+        probe = json.loads(output.strip().splitlines()[-1])
+        samples.append(probe['seconds'])
+        loaded.update(probe['modules'])
+    seconds = statistics.median(samples)
+    eager = [name for name in DEFERRED_MODULES if name in loaded]
+    return {
+        'script': script,
+        'seconds': seconds,
+        'budget_seconds': STARTUP_BUDGET_SECONDS,
+        'eager_heavy_modules': eager,
+        'passed': seconds <= STARTUP_BUDGET_SECONDS and not eager,
+    }
+
+
+def compare(current, previous):
+    """Ratio current/previous for every numeric metric present in both reports"""
+    ratios = {}
+    for key, value in current.items():
+        old = previous.get(key)
+        if isinstance(value, dict) and isinstance(old, dict):
+            nested = compare(value, old)
+            if nested:
+                ratios[key] = nested
+        elif isinstance(value, (int, float)) and isinstance(old, (int, float)) \
+                and not isinstance(value, bool) and old:
+            ratios[key] = value / old
+    return ratios
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run dashboard and chatbot benchmarks")
+    parser.add_argument('names', nargs='*', help=f"benchmarks to run (default: all of {', '.join(BENCHMARKS)})")
+    parser.add_argument('--output', help="write JSON results to this file instead of stdout")
+    parser.add_argument('--compare', help="earlier JSON report; adds current/previous ratios")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name in args.names or BENCHMARKS:
+        if name not in BENCHMARKS:
+            parser.error(f"unknown benchmark '{name}'")
+        results[name] = BENCHMARKS[name]()
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+        },
+        'results': results,
+    }
+    if args.compare:
+        with open(args.compare) as f:
+            report['ratios'] = compare(results, json.load(f).get('results', {}))
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    # Benchmarks with a budget report 'passed'; a miss fails the run
+    failed = [name for name, result in results.items() if result.get('passed') is False]
+    if failed:
+        print(f"[FAIL] Over budget: {', '.join(failed)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,490 @@
+import json
+import os
+import re
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import yfinance as yf
+
+import tracing
+import upstream
+
+try:
+    import fcntl
+except ImportError:   # Windows
+    fcntl = None
+    import msvcrt
+
+# ---------------- CONFIG ----------------
+CACHE_DIR = os.getenv('STOCK_CACHE_DIR', '.cache')
+BARS_DIR = os.path.join(CACHE_DIR, 'bars')
+
+# Parquet schema metadata keys: the ranges already fetched (dates for daily
+# bars, epoch seconds for intraday), the exchange time zone of intraday bars,
+# and the day the stored daily bars were split/dividend-adjusted as of
+COVERAGE_KEY = b'stock_store.coverage'
+TZ_KEY = b'stock_store.tz'
+ADJUSTED_KEY = b'stock_store.adjusted_as_of'
+# Daily bars are auto-adjusted when fetched, so a later split or dividend puts
+# new bars on a different price basis. A corporate action in newly fetched
+# bars, or a basis older than this many days, refetches the requested range.
+ADJUSTMENT_MAX_AGE_DAYS = int(os.getenv('BAR_ADJUSTMENT_MAX_AGE_DAYS', 30))
+ACTION_COLUMNS = ['Dividends', 'Stock Splits']
+
+# Intraday bar length in seconds. Yahoo serves each interval only so far back
+# (INTRADAY_LOOKBACK_DAYS) and only so many days per request; ranges are split
+# into INTRADAY_CHUNK_DAYS pieces that are fetched in parallel.
+INTERVAL_SECONDS = {'1m': 60, '5m': 300, '15m': 900, '1h': 3600}
+INTRADAY_LOOKBACK_DAYS = {'1m': 30, '5m': 60, '15m': 60, '1h': 730}
+INTRADAY_CHUNK_DAYS = {'1m': 7, '5m': 15, '15m': 30, '1h': 120}
+INTRADAY_FETCH_WORKERS = int(os.getenv('INTRADAY_FETCH_WORKERS', 4))
+
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close']
+
+
+def _bars_path(ticker, interval='1d'):
+    """Return the on-disk file for a ticker's bars at an interval"""
+    safe = re.sub(r'[^A-Za-z0-9._^-]', '_', ticker.upper())
+    if interval == '1d':
+        return os.path.join(BARS_DIR, f"{safe}.parquet")
+    return os.path.join(BARS_DIR, f"{safe}.{interval}.parquet")
+
+
+def _to_date(value):
+    if isinstance(value, pd.Timestamp):
+        return value.date()
+    if isinstance(value, str):
+        return date.fromisoformat(value)
+    return value
+
+
+def merge_ranges(ranges):
+    """Merge overlapping or touching [start, end) date ranges"""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def missing_ranges(coverage, start, end):
+    """Return the parts of [start, end) not covered by the given ranges"""
+    gaps = []
+    cursor = start
+    for cov_start, cov_end in merge_ranges(coverage):
+        if cov_end <= cursor:
+            continue
+        if cov_start >= end:
+            break
+        if cov_start > cursor:
+            gaps.append((cursor, cov_start))
+        cursor = max(cursor, cov_end)
+    if cursor < end:
+        gaps.append((cursor, end))
+    return gaps
+
+
+def load_bars(ticker, interval='1d'):
+    """Load stored bars and coverage for a ticker; empty if nothing is stored"""
+    path = _bars_path(ticker, interval)
+    try:
+        table = pq.read_table(path)
+    except (FileNotFoundError, OSError, pa.ArrowInvalid):
+        return pd.DataFrame(), []
+
+    meta = table.schema.metadata or {}
+    stored = json.loads(meta.get(COVERAGE_KEY, b'[]'))
+    if interval == '1d':
+        coverage = [(date.fromisoformat(s), date.fromisoformat(e)) for s, e in stored]
+        data = table.to_pandas()
+        if ADJUSTED_KEY in meta:
+            data.attrs['adjusted_as_of'] = date.fromisoformat(meta[ADJUSTED_KEY].decode())
+        return data, coverage
+
+    data = table.to_pandas()
+    data.attrs['tz'] = meta.get(TZ_KEY, b'UTC').decode()
+    return data, [(s, e) for s, e in stored]
+
+
+def save_bars(ticker, data, coverage, interval='1d'):
+    """Atomically replace a ticker's stored bars and coverage"""
+    os.makedirs(BARS_DIR, exist_ok=True)
+    # attrs travel in our own metadata keys below, not pandas' JSON copy of them
+    plain = data.copy(deep=False)
+    plain.attrs = {}
+    table = pa.Table.from_pandas(plain, preserve_index=True)
+    meta = dict(table.schema.metadata or {})
+    if interval == '1d':
+        coverage = [(s.isoformat(), e.isoformat()) for s, e in merge_ranges(coverage)]
+        if data.attrs.get('adjusted_as_of') is not None:
+            meta[ADJUSTED_KEY] = data.attrs['adjusted_as_of'].isoformat().encode()
+    else:
+        coverage = merge_ranges(coverage)
+        meta[TZ_KEY] = data.attrs.get('tz', 'UTC').encode()
+    meta[COVERAGE_KEY] = json.dumps(coverage).encode()
+    table = table.replace_schema_metadata(meta)
+
+    # Write next to the target then rename, so readers never see a partial file
+    fd, tmp_path = tempfile.mkstemp(dir=BARS_DIR, suffix='.tmp')
+    os.close(fd)
+    try:
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, _bars_path(ticker, interval))
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+@contextmanager
+def _file_lock(path):
+    """Hold an exclusive lock on path's .lock file, across processes"""
+    os.makedirs(BARS_DIR, exist_ok=True)
+    with open(path + '.lock', 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK gives up after ten seconds; keep waiting
+                    pass
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def merge_save_bars(ticker, data, coverage, interval='1d'):
+    """Merge bars and coverage into what is stored now, under a file lock
+
+    Another worker may have saved the same ticker since it was loaded; its
+    bars and coverage are re-read and kept, with this call's bars winning
+    where both have the same timestamp. Daily bars adjusted as of different
+    days are never mixed: the more recently adjusted set wins. Returns the
+    merged bars.
+    """
+    with _file_lock(_bars_path(ticker, interval)):
+        stored, stored_coverage = load_bars(ticker, interval)
+        if interval == '1d':
+            ours, theirs = data.attrs.get('adjusted_as_of'), stored.attrs.get('adjusted_as_of')
+            if not stored.empty and theirs != ours:
+                if theirs is not None and (ours is None or theirs > ours):
+                    return stored
+                stored, stored_coverage = pd.DataFrame(), []
+            frames = [frame for frame in (stored, data) if not frame.empty]
+            if frames:
+                data = pd.concat(frames)
+                data = data[~data.index.duplicated(keep='last')].sort_index()
+                data.attrs['adjusted_as_of'] = ours
+        else:
+            data = stitch_bars([stored, data])
+        save_bars(ticker, data, stored_coverage + list(coverage), interval)
+    return data
+
+
+def _slice(data, start, end):
+    if data.empty:
+        return data
+    index = data.index
+    if getattr(index, 'tz', None) is not None:
+        index = index.tz_localize(None)
+    mask = (index >= pd.Timestamp(start)) & (index < pd.Timestamp(end))
+    return data[mask]
+
+
+def no_trading_days(start, end):
+    """Whether the [start, end) dates are all weekend days, so an empty fetch proves nothing is missing
+
+    Holidays are not modelled, so an empty fetch over one is retried later.
+    """
+    return np.busday_count(start, end) == 0
+
+
+def _fetch_daily(stock, gaps, today):
+    """Fetch daily gaps; returns (non-empty frames, ranges now known to be covered)
+
+    Today's bar is still forming, so it is never recorded as covered. yfinance
+    reports errors and unknown tickers as an empty frame, so a gap that came
+    back empty only counts as covered when it holds no trading days.
+    """
+    frames, covered = [], []
+    for gap_start, gap_end in gaps:
+        try:
+            with tracing.span('yahoo.history'):
+                fetched = stock.history(start=gap_start, end=gap_end)
+        except Exception:
+            tracing.count('upstream_errors_total', host='yahoo', call='history')
+            raise
+        covered_end = min(gap_end, today)
+        if not fetched.empty:
+            frames.append(fetched)
+        elif not no_trading_days(gap_start, covered_end):
+            tracing.count('bar_store_empty_fetches_total')
+            continue
+        if covered_end > gap_start:
+            covered.append((gap_start, covered_end))
+    return frames, covered
+
+
+def _actions_since(frames, as_of):
+    """Whether any frame has a split or dividend dated on or after as_of"""
+    for frame in frames:
+        columns = [column for column in ACTION_COLUMNS if column in frame]
+        if not columns:
+            continue
+        actions = frame.index[(frame[columns].fillna(0) != 0).any(axis=1)]
+        if len(actions) and max(_to_date(day) for day in actions) >= as_of:
+            return True
+    return False
+
+
+def get_history(ticker, start, end):
+    """Get daily bars for [start, end), fetching only ranges not already stored
+
+    Stored bars whose adjustment basis is stale (see ADJUSTMENT_MAX_AGE_DAYS)
+    or predates a split or dividend seen in new bars are dropped, and the
+    range is fetched again on the current basis.
+    """
+    start, end = _to_date(start), _to_date(end)
+    today = date.today()
+    data, coverage = load_bars(ticker)
+    as_of = data.attrs.get('adjusted_as_of')
+    if not data.empty and (as_of is None or (today - as_of).days > ADJUSTMENT_MAX_AGE_DAYS):
+        tracing.count('bar_store_rebased_total', reason='age')
+        data, coverage, as_of = pd.DataFrame(), [], None
+
+    gaps = missing_ranges(coverage, start, end)
+    tracing.count('bar_store_lookups_total', outcome='miss' if gaps else 'hit')
+    if gaps:
+        stock = yf.Ticker(ticker)
+        frames, covered = _fetch_daily(stock, gaps, today)
+        if not data.empty and _actions_since(frames, as_of):
+            tracing.count('bar_store_rebased_total', reason='corporate_action')
+            data, coverage, as_of = pd.DataFrame(), [], None
+            frames, covered = _fetch_daily(stock, missing_ranges([], start, end), today)
+
+        frames = ([data] if not data.empty else []) + frames
+        if frames:
+            data = pd.concat(frames)
+            data = data[~data.index.duplicated(keep='last')].sort_index()
+        data.attrs['adjusted_as_of'] = as_of or today
+        data = merge_save_bars(ticker, data, coverage + covered)
+
+    return _slice(data, start, end)
+
+
+# ---------------- INTRADAY ----------------
+# Intraday bars are held compact: float32 prices and int64 volume on an int64
+# index of epoch seconds (UTC), with the exchange time zone in attrs['tz'].
+# A year of 1-minute bars is about 100k rows per ticker; this layout takes half
+# the memory of yfinance's float64 frames. expand_bars turns a slice back into
+# a regular tz-aware frame for charts and exports.
+
+
+def _to_epoch(value):
+    """Epoch seconds for a date (midnight UTC), datetime or Timestamp"""
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, date) and not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day, tzinfo=timezone.utc)
+    value = pd.Timestamp(value)
+    if value.tz is None:
+        value = value.tz_localize('UTC')
+    return int(value.timestamp())
+
+
+def _empty_compact(tz='UTC'):
+    data = pd.DataFrame(
+        {**{column: np.array([], dtype='float32') for column in PRICE_COLUMNS}, 'Volume': np.array([], dtype='int64')},
+        index=pd.Index(np.array([], dtype='int64'), name='Epoch')
+    )
+    data.attrs['tz'] = tz
+    return data
+
+
+def compact_bars(data):
+    """Convert a yfinance OHLCV frame to the compact intraday layout"""
+    tz = str(getattr(data.index, 'tz', None) or 'UTC')
+    if data.empty:
+        return _empty_compact(tz)
+    index = data.index if data.index.tz is not None else data.index.tz_localize('UTC')
+    compact = pd.DataFrame(
+        {
+            **{column: data[column].to_numpy(dtype='float32') for column in PRICE_COLUMNS},
+            'Volume': data['Volume'].fillna(0).to_numpy(dtype='int64'),
+        },
+        index=pd.Index(index.tz_convert('UTC').as_unit('s').asi8, name='Epoch')
+    )
+    compact.attrs['tz'] = tz
+    return compact
+
+
+def expand_bars(compact):
+    """Compact bars as an OHLCV frame on a tz-aware DatetimeIndex, for charts and exports"""
+    data = compact.copy(deep=False)
+    data.index = pd.to_datetime(compact.index.to_numpy(), unit='s', utc=True) \
+        .tz_convert(compact.attrs.get('tz', 'UTC')).rename('Datetime')
+    return data
+
+
+def stitch_bars(frames):
+    """Concatenate compact frames in time order, keeping the newest copy of any repeated bar"""
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return _empty_compact()
+    tz = frames[-1].attrs.get('tz', 'UTC')
+    data = pd.concat(frames)
+    data = data[~data.index.duplicated(keep='last')].sort_index()
+    data.attrs['tz'] = tz
+    return data
+
+
+def resample_bars(compact, seconds):
+    """Aggregate compact bars into coarser bars of the given length
+
+    Buckets are anchored to each day's first bar, the way Yahoo aligns its
+    hourly bars to the session open (09:30, 10:30, ... in New York).
+    """
+    if compact.empty:
+        return compact
+    epoch = compact.index.to_numpy()
+    day_starts = np.flatnonzero(np.diff(epoch // 86400, prepend=-1))
+    first_bar = np.repeat(epoch[day_starts], np.diff(np.append(day_starts, len(epoch))))
+    bucket = first_bar + (epoch - first_bar) // seconds * seconds
+    starts = np.flatnonzero(np.diff(bucket, prepend=bucket[0] - 1))
+    ends = np.append(starts[1:], len(epoch)) - 1
+
+    data = pd.DataFrame({
+        'Open': compact['Open'].to_numpy()[starts],
+        'High': np.maximum.reduceat(compact['High'].to_numpy(), starts),
+        'Low': np.minimum.reduceat(compact['Low'].to_numpy(), starts),
+        'Close': compact['Close'].to_numpy()[ends],
+        'Volume': np.add.reduceat(compact['Volume'].to_numpy(), starts),
+    }, index=pd.Index(bucket[starts], name='Epoch'))
+    data.attrs['tz'] = compact.attrs.get('tz', 'UTC')
+    return data
+
+
+def _slice_epoch(data, start, end):
+    tz = data.attrs.get('tz', 'UTC')
+    data = data[(data.index >= start) & (data.index < end)]
+    data.attrs['tz'] = tz
+    return data
+
+
+def chunk_ranges(ranges, seconds):
+    """Split [start, end) ranges into pieces of at most the given length"""
+    return [
+        (chunk_start, min(chunk_start + seconds, end))
+        for start, end in ranges
+        for chunk_start in range(start, end, seconds)
+    ]
+
+
+def _fetch_chunk(ticker, interval, start, end):
+    with upstream.slot('yahoo', 'intraday'):
+        fetched = yf.Ticker(ticker).history(
+            start=pd.Timestamp(start, unit='s', tz='UTC'), end=pd.Timestamp(end, unit='s', tz='UTC'),
+            interval=interval
+        )
+    return compact_bars(fetched)
+
+
+def _no_trading_epochs(start, end, tz):
+    local = pd.to_datetime([start, end - 1], unit='s', utc=True).tz_convert(tz)
+    return no_trading_days(local[0].date(), local[1].date() + timedelta(days=1))
+
+
+def fetch_intraday(ticker, interval, ranges):
+    """Fetch [start, end) epoch ranges in parallel chunks
+
+    Returns (stitched compact bars, the chunks known to be covered). A chunk
+    that came back empty only counts when it spans no weekday (in the
+    exchange's tz), since yfinance reports errors as empty frames too.
+    Raises only when every chunk failed.
+    """
+    chunks = chunk_ranges(ranges, INTRADAY_CHUNK_DAYS[interval] * 86400)
+    if not chunks:
+        return _empty_compact(), []
+    frames, fetched, errors = [], [], []
+    with ThreadPoolExecutor(max_workers=min(len(chunks), INTRADAY_FETCH_WORKERS)) as pool:
+        futures = [upstream.submit(pool, _fetch_chunk, ticker, interval, start, end) for start, end in chunks]
+        for chunk, future in zip(chunks, futures):
+            try:
+                frame = future.result()
+            except Exception as e:
+                errors.append(e)
+                continue
+            frames.append(frame)
+            if not frame.empty or _no_trading_epochs(*chunk, frame.attrs.get('tz', 'UTC')):
+                fetched.append(chunk)
+    if errors and not fetched:
+        raise errors[0]
+    return stitch_bars(frames), fetched
+
+
+def get_intraday(ticker, interval, start, end):
+    """Compact intraday bars for [start, end) (dates, datetimes or epoch seconds)
+
+    When a finer interval already stored covers the range, the bars are
+    resampled from it locally; otherwise only the missing parts are fetched.
+    Ranges older than the interval's lookback are served from what is stored.
+    """
+    seconds = INTERVAL_SECONDS[interval]
+    start, end = _to_epoch(start), _to_epoch(end)
+    now = int(time.time())
+    # The current bar is still forming, so coverage stops at the last closed one
+    closed = min(end, now // seconds * seconds)
+
+    for finer, finer_seconds in INTERVAL_SECONDS.items():
+        if finer_seconds >= seconds or seconds % finer_seconds:
+            continue
+        data, coverage = load_bars(ticker, finer)
+        if not data.empty and not missing_ranges(coverage, start, closed):
+            tracing.count('bar_store_lookups_total', outcome='resampled')
+            with tracing.span('bars.resample'):
+                return resample_bars(_slice_epoch(data, start, end), seconds)
+
+    data, coverage = load_bars(ticker, interval)
+    if data.empty:
+        data = _empty_compact()
+    earliest = now - INTRADAY_LOOKBACK_DAYS[interval] * 86400
+    gaps = [(max(gap_start, earliest), gap_end) for gap_start, gap_end in missing_ranges(coverage, start, end)
+            if gap_end > earliest]
+    tracing.count('bar_store_lookups_total', outcome='miss' if gaps else 'hit')
+    if gaps:
+        with tracing.span('yahoo.intraday'):
+            fetched, chunks = fetch_intraday(ticker, interval, gaps)
+        coverage.extend(
+            (chunk_start, min(chunk_end, closed)) for chunk_start, chunk_end in chunks if min(chunk_end, closed) > chunk_start
+        )
+        data = stitch_bars([data, fetched])
+        data = merge_save_bars(ticker, data, coverage, interval)
+
+    return _slice_epoch(data, start, end)
+
+
+def clear_bars(ticker):
+    """Remove a ticker's stored bars, daily and intraday"""
+    for interval in ['1d', *INTERVAL_SECONDS]:
+        try:
+            os.remove(_bars_path(ticker, interval))
+        except FileNotFoundError:
+            pass
@@ -1,24 +1,59 @@
 import gradio as gr
-import requests
 from bs4 import BeautifulSoup
 import yfinance as yf
 import pandas as pd
 from datetime import datetime, timedelta
 import time
+import asyncio
 import urllib.parse
 import os
 from dotenv import load_dotenv
 
-# Load environment variables
+# Load environment variables (before the local modules read their settings)
 load_dotenv()
+import market_data
+import indicators
+import upstream
+import symbol_resolver
+import tickers
+import prefetch
+import providers
+import response_cache
+import batch_api
+import tracing
+
 ALPHA_VANTAGE_API_KEY = os.getenv('ALPHA_VANTAGE_API_KEY')
 
-def get_stock_price(symbol):
+# Prometheus-style /metrics endpoint, when TRACING_ENABLED and METRICS_PORT are set
+tracing.start_metrics_server()
+
+# Chat handler concurrency and waiting-room size for the Gradio queue
+CHAT_CONCURRENCY = int(os.getenv('CHAT_CONCURRENCY', 32))
+CHAT_QUEUE_SIZE = int(os.getenv('CHAT_QUEUE_SIZE', 256))
+
+# Stocks ranked for "top stock" / prediction questions
+TOP_STOCKS = ['AAPL', 'TSLA', 'NVDA', 'MSFT', 'GOOGL']
+# Keep the dashboard's listed symbols and TOP_STOCKS warm in the quote cache
+PREFETCH_ENABLED = os.getenv('PREFETCH_ENABLED', '1').lower() in ('1', 'true', 'yes')
+
+# Words that make a question a comparison; "and" only counts between two stocks
+COMPARISON_WORDS = {'vs', 'versus', 'compare', 'comparison'}
+
+# Bars each indicator needs before it has a value
+TECHNICAL_WINDOWS = {'20-day SMA': 20, '50-day SMA': 50, 'RSI': 14}
+
+# Intents answered from market_data.fetch_snapshots (news has its own source)
+QUOTE_INTENTS = {'comparison', 'price', 'overview', 'prediction'}
+# Headless batch endpoint for internal callers; 0 keeps it off
+BATCH_API_PORT = int(os.getenv('BATCH_API_PORT', 0))
+
+def get_stock_price(symbol, hist=None, info=None):
     """Get current stock price and basic info"""
     try:
-        stock = yf.Ticker(symbol)
-        info = stock.info
-        hist = stock.history(period="5d")
+        if hist is None or info is None:
+            histories, infos = market_data.fetch_snapshots([symbol])
+            info = infos.get(symbol, {}) if info is None else info
+            hist = histories.get(symbol, pd.DataFrame()) if hist is None else hist
         
         if hist.empty:
             return None
@@ -41,143 +76,114 @@ def get_stock_price(symbol):
     except Exception as e:
         return None
 
-def get_alpha_vantage_news(symbol):
-    """Get news from Alpha Vantage API"""
-    if not ALPHA_VANTAGE_API_KEY:
-        return []
-    
-    try:
-        url = f"https://www.alphavantage.co/query?function=NEWS_SENTIMENT&tickers={symbol}&apikey={ALPHA_VANTAGE_API_KEY}"
-        response = requests.get(url, timeout=10)
-        data = response.json()
-        
-        results = []
-        if 'feed' in data:
-            for item in data['feed'][:3]:
-                title = item.get('title', '')
-                url = item.get('url', '')
-                if title and url:
-                    results.append((title, url))
-        
-        return results
-    except:
-        return []
-
 def get_stock_news(symbol):
-    """Get news using Alpha Vantage first, fallback to yfinance"""
-    # Try Alpha Vantage first
-    if ALPHA_VANTAGE_API_KEY:
-        alpha_news = get_alpha_vantage_news(symbol)
-        if alpha_news:
-            return alpha_news
-    
-    # Fallback to yfinance
-    try:
-        stock = yf.Ticker(symbol)
-        news = stock.news
-        
-        results = []
-        for item in news[:3]:
-            title = item.get('title', '')
-            url = item.get('link', '')
-            if title and url:
-                results.append((title, url))
-        
-        return results
-    except:
-        return []
+    """Get news from Alpha Vantage, hedged with yfinance if it is slow or fails"""
+    return providers.news(symbol)
 
 def extract_stock_symbol(message):
     """Extract stock symbol from message"""
-    message_lower = message.lower()
-    
-    # Common stock mappings
-    stock_map = {
-        'tesla': 'TSLA', 'tsla': 'TSLA',
-        'apple': 'AAPL', 'aapl': 'AAPL', 
-        'microsoft': 'MSFT', 'msft': 'MSFT',
-        'google': 'GOOGL', 'googl': 'GOOGL', 'alphabet': 'GOOGL',
-        'amazon': 'AMZN', 'amzn': 'AMZN',
-        'meta': 'META', 'facebook': 'META',
-        'nvidia': 'NVDA', 'nvda': 'NVDA',
-        'netflix': 'NFLX', 'nflx': 'NFLX'
-    }
-    
-    # Check for direct symbol matches first
-    words = message_lower.split()
-    for word in words:
-        if word.upper() in ['AAPL', 'TSLA', 'MSFT', 'GOOGL', 'AMZN', 'META', 'NVDA', 'NFLX', 'SNAP', 'UBER', 'ZOOM']:
-            return word.upper()
+    return symbol_resolver.get_resolver().find_first(message)
+
+def get_technical_analyses(histories):
+    """Get technical analysis for several stocks in one vectorized pass"""
+    symbols = [symbol for symbol, hist in histories.items() if hist is not None and not hist.empty]
+    if not symbols:
+        return {}
     
-    # Check for company name matches
-    for name, symbol in stock_map.items():
-        if name in message_lower:
-            return symbol
+    with tracing.span('indicators.technicals'):
+        closes = indicators.stack_closes([histories[symbol]['Close'].to_numpy() for symbol in symbols])
+        sma_20 = indicators.sma(closes, 20)[:, -1]
+        sma_50 = indicators.sma(closes, 50)[:, -1]
+        rsi = indicators.rsi(closes)[:, -1]
+        bars = indicators.valid_counts(closes)
+        short = {name: indicators.insufficient_history(closes, window) for name, window in TECHNICAL_WINDOWS.items()}
     
-    return None
+    results = {}
+    for i, symbol in enumerate(symbols):
+        current_price = closes[i, -1]
+        results[symbol] = {
+            'current_price': current_price,
+            'sma_20': sma_20[i],
+            'sma_50': sma_50[i],
+            'rsi': rsi[i],
+            'trend': 'Bullish' if current_price > sma_20[i] > sma_50[i] else 'Bearish' if current_price < sma_20[i] < sma_50[i] else 'Neutral',
+            'warnings': [
+                f"{name} needs {TECHNICAL_WINDOWS[name]} bars, only {bars[i]} available"
+                for name in TECHNICAL_WINDOWS if short[name][i]
+            ]
+        }
+    return results
 
-def get_technical_analysis(symbol, period="1mo"):
+def get_technical_analysis(symbol, period="1mo", hist=None):
     """Get technical analysis for a stock"""
     try:
-        stock = yf.Ticker(symbol)
-        hist = stock.history(period=period)
-        
-        if hist.empty:
-            return None
-            
-        # Calculate simple moving averages
-        hist['SMA_20'] = hist['Close'].rolling(window=20).mean()
-        hist['SMA_50'] = hist['Close'].rolling(window=50).mean()
-        
-        # Calculate RSI
-        delta = hist['Close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-        rs = gain / loss
-        rsi = 100 - (100 / (1 + rs))
+        if hist is None:
+            stock = yf.Ticker(symbol)
+            hist = stock.history(period=period)
         
-        current_price = hist['Close'].iloc[-1]
-        sma_20 = hist['SMA_20'].iloc[-1]
-        sma_50 = hist['SMA_50'].iloc[-1]
-        current_rsi = rsi.iloc[-1]
-        
-        return {
-            'current_price': current_price,
-            'sma_20': sma_20,
-            'sma_50': sma_50,
-            'rsi': current_rsi,
-            'trend': 'Bullish' if current_price > sma_20 > sma_50 else 'Bearish' if current_price < sma_20 < sma_50 else 'Neutral'
-        }
+        return get_technical_analyses({symbol: hist}).get(symbol)
     except Exception as e:
         return None
 
-def process_query(message):
-    """Process user query and provide accurate responses"""
+def format_price(value):
+    """Format a price, or N/A when it could not be computed"""
+    return "N/A" if pd.isna(value) else f"${value:.2f}"
+
+def get_stock_overviews(symbols, with_technicals=True):
+    """Get price data (and technicals) for several stocks from one batched fetch"""
+    histories, infos = market_data.fetch_snapshots(symbols)
+    
+    technicals = get_technical_analyses(histories) if with_technicals else {}
+    
+    results = []
+    for symbol in symbols:
+        hist = histories.get(symbol, pd.DataFrame())
+        data = get_stock_price(symbol, hist=hist, info=infos.get(symbol, {}))
+        if data:
+            if with_technicals:
+                data['tech'] = technicals.get(symbol)
+            results.append(data)
+    return results
+
+def classify_query(message):
+    """Normalized intent of a query and the symbols it is about"""
     message_lower = message.lower()
     
+    mentioned = symbol_resolver.find_symbols(message)
+    words = {word.lower() for word in symbol_resolver.tokenize(message)}
+    
+    # Comparisons come FIRST
+    if words & COMPARISON_WORDS or ('and' in words and len(mentioned) >= 2):
+        return 'comparison', mentioned[:3] if len(mentioned) >= 2 else []
+    if any(word in message_lower for word in ['price', 'stock price', 'current price', 'trading at']):
+        symbol = extract_stock_symbol(message)
+        return 'price', [symbol] if symbol else []
+    if any(word in message_lower for word in ['news', 'latest', 'headlines', 'updates']):
+        symbol = extract_stock_symbol(message)
+        return 'news', [symbol] if symbol else []
+    for intent in ('macd', 'rsi', 'nifty', 'sensex', 'index'):
+        if intent in message_lower:
+            return intent, []
+    
+    # Anything else is a general stock inquiry
+    symbol = extract_stock_symbol(message)
+    if symbol:
+        return 'overview', [symbol]
+    if any(word in message_lower for word in ['predict', 'forecast', 'future', 'next week', 'top stock', 'best stock', 'expected', 'trend']):
+        return 'prediction', list(TOP_STOCKS)
+    return 'fallback', []
+
+def answer_query(intent, symbols, message):
+    """Build the answer for a classified query
+    
+    Returns (response, kind) where kind is the response_cache kind deciding how
+    long the answer may be reused, or None when it must not be cached (fetch
+    failures and answers that quote the message).
+    """
     # Handle comparison queries FIRST
-    if any(word in message_lower for word in ['vs', 'versus', 'compare', 'comparison', ' and ']):
-        # Extract symbols for comparison
-        symbols = []
-        words = message_lower.replace('vs', ' ').replace('versus', ' ').replace('compare', ' ').replace('with', ' ').replace('and', ' ').split()
-        
-        # Check for direct symbols
-        for word in words:
-            if word.upper() in ['AAPL', 'TSLA', 'MSFT', 'GOOGL', 'AMZN', 'META', 'NVDA', 'NFLX']:
-                symbols.append(word.upper())
-        
-        # Check for company names
-        stock_map = {'apple': 'AAPL', 'tesla': 'TSLA', 'microsoft': 'MSFT', 'google': 'GOOGL', 'amazon': 'AMZN', 'meta': 'META', 'nvidia': 'NVDA', 'netflix': 'NFLX'}
-        for name, symbol in stock_map.items():
-            if name in message_lower and symbol not in symbols:
-                symbols.append(symbol)
-        
+    if intent == 'comparison':
         if len(symbols) >= 2:
-            comparison_data = []
-            for symbol in symbols[:3]:
-                data = get_stock_price(symbol)
-                if data:
-                    comparison_data.append(data)
+            comparison_data = get_stock_overviews(symbols, with_technicals=False)
             
             if comparison_data:
                 response = "**Stock Comparison:**\n\n"
@@ -190,16 +196,17 @@ def process_query(message):
                 response += f"\n🏆 **Best Today:** {best['symbol']} ({best['change_pct']:.2f}%)\n"
                 response += f"📉 **Worst Today:** {worst['symbol']} ({worst['change_pct']:.2f}%)\n"
                 
-                return response
+                return response, response_cache.DATA
+            return "Please specify stocks to compare. Example: 'compare AAPL vs TSLA' or 'MSFT and GOOGL'", None
         
-        return "Please specify stocks to compare. Example: 'compare AAPL vs TSLA' or 'MSFT and GOOGL'"
+        return "Please specify stocks to compare. Example: 'compare AAPL vs TSLA' or 'MSFT and GOOGL'", response_cache.STATIC
     
     # Check for stock price queries
-    elif any(word in message_lower for word in ['price', 'stock price', 'current price', 'trading at']):
-        symbol = extract_stock_symbol(message)
-        
-        if symbol:
-            data = get_stock_price(symbol)
+    elif intent == 'price':
+        if symbols:
+            symbol = symbols[0]
+            overviews = get_stock_overviews([symbol])
+            data = overviews[0] if overviews else None
             if data:
                 response = f"**{data['name']} ({data['symbol']})**\n\n"
                 response += f"💰 **Current Price:** ${data['price']:.2f}\n"
@@ -211,23 +218,25 @@ def process_query(message):
                 response += f"📊 **Volume:** {data['volume']:,}\n"
                 
                 # Add technical analysis
-                tech = get_technical_analysis(symbol)
+                tech = data['tech']
                 if tech:
                     response += f"\n**Technical Analysis:**\n"
                     response += f"📈 **Trend:** {tech['trend']}\n"
                     response += f"📊 **RSI:** {tech['rsi']:.2f}\n"
-                    response += f"📉 **20-day SMA:** ${tech['sma_20']:.2f}\n"
-                    response += f"📉 **50-day SMA:** ${tech['sma_50']:.2f}\n"
+                    response += f"📉 **20-day SMA:** {format_price(tech['sma_20'])}\n"
+                    response += f"📉 **50-day SMA:** {format_price(tech['sma_50'])}\n"
+                    for warning in tech['warnings']:
+                        response += f"⚠️ *{warning}*\n"
                 
-                return response
+                return response, response_cache.DATA
             else:
-                return f"Sorry, couldn't fetch current price data for {symbol}. Please verify the ticker symbol."
+                return f"Sorry, couldn't fetch current price data for {symbol}. Please verify the ticker symbol.", None
+        return None, None
     
     # Check for news queries
-    elif any(word in message_lower for word in ['news', 'latest', 'headlines', 'updates']):
-        symbol = extract_stock_symbol(message)
-        
-        if symbol:
+    elif intent == 'news':
+        if symbols:
+            symbol = symbols[0]
             news_results = get_stock_news(symbol)
             
             if news_results:
@@ -235,14 +244,14 @@ def process_query(message):
                 for i, (title, url) in enumerate(news_results, 1):
                     response += f"{i}. **{title}**\n   🔗 [Read more]({url})\n\n"
                 response += "\n*Source: Yahoo Finance*"
-                return response
+                return response, response_cache.NEWS
             else:
-                return f"**No recent news found for {symbol}.**\n\nTry visiting [Yahoo Finance](https://finance.yahoo.com/quote/{symbol}/news) or [MarketWatch](https://www.marketwatch.com/) for the latest updates."
+                return f"**No recent news found for {symbol}.**\n\nTry visiting [Yahoo Finance](https://finance.yahoo.com/quote/{symbol}/news) or [MarketWatch](https://www.marketwatch.com/) for the latest updates.", None
         else:
-            return "**Please specify a stock symbol or company name for news.**\n\nExample: 'news about AAPL' or 'Tesla latest news'"
+            return "**Please specify a stock symbol or company name for news.**\n\nExample: 'news about AAPL' or 'Tesla latest news'", response_cache.STATIC
     
     # Technical indicator explanations
-    elif 'macd' in message_lower:
+    elif intent == 'macd':
         return """**MACD (Moving Average Convergence Divergence)**
 
 MACD is a trend-following momentum indicator that shows the relationship between two moving averages of a security's price.
@@ -257,9 +266,9 @@ MACD is a trend-following momentum indicator that shows the relationship between
 📉 **Bearish Signal:** MACD crosses below signal line
 🎯 **Divergence:** Price and MACD move in opposite directions
 
-**Usage:** Best used in trending markets to identify momentum changes."""
+**Usage:** Best used in trending markets to identify momentum changes.""", response_cache.STATIC
     
-    elif 'rsi' in message_lower:
+    elif intent == 'rsi':
         return """**RSI (Relative Strength Index)**
 
 RSI is a momentum oscillator that measures the speed and change of price movements, ranging from 0 to 100.
@@ -272,10 +281,10 @@ Where RS = Average Gain / Average Loss over 14 periods
 🟢 **Oversold:** RSI < 30 (potential buy signal)
 🟡 **Neutral:** RSI between 30-70
 
-**Usage:** Helps identify potential reversal points and momentum shifts."""
+**Usage:** Helps identify potential reversal points and momentum shifts.""", response_cache.STATIC
     
-    elif any(word in message_lower for word in ['nifty', 'sensex', 'index']):
-        if 'nifty' in message_lower:
+    elif intent in ('nifty', 'sensex', 'index'):
+        if intent == 'nifty':
             return """**Nifty 50 Index**
 
 The Nifty 50 is India's benchmark stock market index representing the weighted average of 50 of the largest Indian companies listed on the National Stock Exchange (NSE).
@@ -288,9 +297,9 @@ The Nifty 50 is India's benchmark stock market index representing the weighted a
 
 **Top Holdings:** Reliance, TCS, HDFC Bank, Infosys, ICICI Bank
 
-**Usage:** Benchmark for Indian equity market performance and basis for index funds/ETFs."""
+**Usage:** Benchmark for Indian equity market performance and basis for index funds/ETFs.""", response_cache.STATIC
         
-        elif 'sensex' in message_lower:
+        elif intent == 'sensex':
             return """**BSE Sensex**
 
 The Sensex is India's oldest stock market index comprising 30 well-established and financially sound companies listed on the Bombay Stock Exchange (BSE).
@@ -303,15 +312,16 @@ The Sensex is India's oldest stock market index comprising 30 well-established a
 
 **Top Holdings:** Reliance, TCS, HDFC Bank, Infosys, Hindustan Unilever
 
-**Usage:** Barometer of Indian stock market performance and economic health."""
+**Usage:** Barometer of Indian stock market performance and economic health.""", response_cache.STATIC
+        return None, None
     
     # Handle any other query as a general stock inquiry
     else:
-        symbol = extract_stock_symbol(message)
-        
-        if symbol:
+        if intent == 'overview':
+            symbol = symbols[0]
             # Provide comprehensive stock info
-            data = get_stock_price(symbol)
+            overviews = get_stock_overviews([symbol])
+            data = overviews[0] if overviews else None
             if data:
                 response = f"**{data['name']} ({data['symbol']}) Overview:**\n\n"
                 response += f"💰 **Price:** ${data['price']:.2f} "
@@ -323,7 +333,7 @@ The Sensex is India's oldest stock market index comprising 30 well-established a
                     response += f"📊 **P/E Ratio:** {data['pe_ratio']:.2f}\n"
                 
                 # Add technical analysis
-                tech = get_technical_analysis(symbol)
+                tech = data['tech']
                 if tech:
                     response += f"\n**Technical Analysis:**\n"
                     response += f"📈 **Trend:** {tech['trend']}\n"
@@ -333,22 +343,14 @@ The Sensex is India's oldest stock market index comprising 30 well-established a
                 response += f"• 'news about {symbol}'\n"
                 response += f"• 'compare {symbol} vs [other stock]'"
                 
-                return response
+                return response, response_cache.DATA
             else:
-                return f"**Could not fetch data for {symbol}.**\n\nPlease verify the ticker symbol or try:\n• Stock prices: 'AAPL price'\n• News: 'news about Tesla'\n• Analysis: 'What is MACD?'"
+                return f"**Could not fetch data for {symbol}.**\n\nPlease verify the ticker symbol or try:\n• Stock prices: 'AAPL price'\n• News: 'news about Tesla'\n• Analysis: 'What is MACD?'", None
         
         # Handle predictions and forecasts with analysis
-        if any(word in message_lower for word in ['predict', 'forecast', 'future', 'next week', 'top stock', 'best stock', 'expected', 'trend']):
+        if intent == 'prediction':
             # Provide current top performers with technical analysis
-            top_stocks = ['AAPL', 'TSLA', 'NVDA', 'MSFT', 'GOOGL']
-            performance_data = []
-            
-            for symbol in top_stocks:
-                data = get_stock_price(symbol)
-                if data:
-                    tech = get_technical_analysis(symbol)
-                    data['tech'] = tech
-                    performance_data.append(data)
+            performance_data = get_stock_overviews(symbols)
             
             if performance_data:
                 # Sort by performance
@@ -368,10 +370,33 @@ The Sensex is India's oldest stock market index comprising 30 well-established a
                 response += "• 'compare AAPL vs TSLA' for direct comparison\n"
                 response += "• 'news about [stock]' for market sentiment"
                 
-                return response
+                return response, response_cache.DATA
         
         # Handle any other question intelligently
-        return f"**Your question: \"{message}\"**\n\n**I can provide:**\n📊 Real-time stock prices & analysis\n📰 Latest news for any company\n📈 Technical indicators (MACD, RSI)\n🔍 Stock comparisons\n💡 Market insights\n\n**Examples:**\n• \"AAPL price\" \n• \"news about TSLA\"\n• \"compare MSFT vs GOOGL\"\n• \"What is RSI?\""
+        return f"**Your question: \"{message}\"**\n\n**I can provide:**\n📊 Real-time stock prices & analysis\n📰 Latest news for any company\n📈 Technical indicators (MACD, RSI)\n🔍 Stock comparisons\n💡 Market insights\n\n**Examples:**\n• \"AAPL price\" \n• \"news about TSLA\"\n• \"compare MSFT vs GOOGL\"\n• \"What is RSI?\"", None
+
+def process_query(message):
+    """Process user query and provide accurate responses"""
+    intent, symbols = classify_query(message)
+    return respond_classified(message, intent, symbols)
+
+def respond_classified(message, intent, symbols):
+    """Answer an already classified query through the response cache
+    
+    Answers are reused by intent and symbol set: static explanations for the
+    life of the process, data answers according to their exchanges' hours.
+    """
+    key = response_cache.response_key(intent, symbols)
+    response = response_cache.cache.get(key)
+    if response is not None:
+        return response
+    
+    started = time.perf_counter()
+    response, kind = answer_query(intent, symbols, message)
+    if kind is not None:
+        ttl = response_cache.response_ttl(kind, symbols)
+        response_cache.cache.put(key, response, ttl, time.perf_counter() - started)
+    return response
 
 def chat_function(message, history):
     """Main chat function with enhanced responses"""
@@ -384,6 +409,18 @@ def chat_function(message, history):
     except Exception as e:
         return f"Sorry, I encountered an error processing your request: {str(e)}. Please try again."
 
+async def chat_function_async(message, history):
+    """Async chat entry point: runs the query off the event loop under a deadline"""
+    if not message.strip():
+        return "Please enter a question about stocks, prices, or financial terms."
+    
+    try:
+        with tracing.span('chat.request'):
+            return await upstream.run(chat_function, message, history, timeout=upstream.REQUEST_DEADLINE)
+    except asyncio.TimeoutError:
+        tracing.count('chat_timeouts_total')
+        return "Sorry, the market data sources are responding slowly right now. Please try again in a moment."
+
 # Create enhanced Gradio interface
 with gr.Blocks(title="Enhanced Stock RAG Chatbot", theme=gr.themes.Soft()) as demo:
     gr.Markdown("# 📈 Enhanced Stock RAG Chatbot")
@@ -421,11 +458,11 @@ with gr.Blocks(title="Enhanced Stock RAG Chatbot", theme=gr.themes.Soft()) as de
         gr.Button("compare AAPL vs TSLA", size="sm").click(lambda: "compare AAPL and TSLA", None, msg)
         gr.Button("What is RSI?", size="sm").click(lambda: "What is RSI indicator?", None, msg)
     
-    def respond(message, chat_history):
+    async def respond(message, chat_history):
         if not message.strip():
             return "", chat_history
             
-        bot_message = chat_function(message, chat_history)
+        bot_message = await chat_function_async(message, chat_history)
         chat_history.append({"role": "user", "content": message})
         chat_history.append({"role": "assistant", "content": bot_message})
         return "", chat_history
@@ -435,11 +472,23 @@ with gr.Blocks(title="Enhanced Stock RAG Chatbot", theme=gr.themes.Soft()) as de
     send_btn.click(respond, [msg, chatbot], [msg, chatbot])
     clear.click(lambda: [], None, chatbot, queue=False)
 
+# Handlers spend their time waiting on upstream I/O, so allow many to run at
+# once; upstream.py caps the actual outbound calls per host
+demo.queue(default_concurrency_limit=CHAT_CONCURRENCY, max_size=CHAT_QUEUE_SIZE)
+
 if __name__ == "__main__":
     print("[INFO] Starting Enhanced Stock RAG Chatbot...")
     print("[INFO] Features: Real-time prices + News + Technical analysis")
     print("[INFO] Powered by yfinance and web scraping")
     
+    if PREFETCH_ENABLED:
+        prefetch.PrefetchScheduler(TOP_STOCKS + list(tickers.display_options().values())).start()
+        print("[INFO] Prefetching popular symbols during market hours")
+    
+    if BATCH_API_PORT:
+        batch_api.start_server(batch_api.BatchRunner(classify_query, respond_classified, QUOTE_INTENTS), BATCH_API_PORT)
+        print(f"[INFO] Batch query API on port {BATCH_API_PORT} (POST /query)")
+    
     demo.launch(
         server_name="0.0.0.0",
         server_port=7865,
@@ -0,0 +1,195 @@
+import gzip
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+
+import plotly.io as pio
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import tracing
+
+# ---------------- CONFIG ----------------
+PNG_CACHE_MAX_BYTES = int(os.getenv('PNG_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+# Exports are written in row chunks into a temp file that stays in memory up
+# to EXPORT_SPOOL_BYTES and moves to disk beyond that
+EXPORT_CHUNK_ROWS = int(os.getenv('EXPORT_CHUNK_ROWS', 50_000))
+EXPORT_SPOOL_BYTES = int(os.getenv('EXPORT_SPOOL_BYTES', 8 * 1024 * 1024))
+
+# label -> (file extension, MIME type)
+DATA_FORMATS = {
+    'CSV': ('csv', 'text/csv'),
+    'CSV (gzip)': ('csv.gz', 'application/gzip'),
+    'Parquet': ('parquet', 'application/vnd.apache.parquet'),
+}
+# Fixed column set so every ticker in a combined export shares one schema
+COMBINED_COLUMNS = ['Ticker', 'Open', 'High', 'Low', 'Close', 'Volume', 'Dividends', 'Stock Splits']
+
+_png_lock = threading.Lock()
+_png_cache = OrderedDict()   # figure hash -> PNG bytes, LRU order
+_png_cache_bytes = 0
+_renderer_started = False
+
+
+def figure_hash(fig):
+    """Content hash of a figure, used as the PNG cache key"""
+    return hashlib.sha256(fig.to_json().encode()).hexdigest()
+
+
+def start_renderer():
+    """Keep one kaleido browser process running for every export
+
+    Kaleido 1.x otherwise launches a fresh Chrome per image; 0.x keeps its own
+    subprocess alive after the first call, so there is nothing to start.
+    """
+    global _renderer_started
+    with _png_lock:
+        if _renderer_started:
+            return
+        try:
+            import kaleido
+            if hasattr(kaleido, 'start_sync_server'):
+                kaleido.start_sync_server(silence_warnings=True)
+        except ImportError:
+            pass
+        _renderer_started = True
+
+
+def _remember(key, png):
+    global _png_cache_bytes
+    _png_cache[key] = png
+    _png_cache_bytes += len(png)
+    while _png_cache_bytes > PNG_CACHE_MAX_BYTES and len(_png_cache) > 1:
+        _, evicted = _png_cache.popitem(last=False)
+        _png_cache_bytes -= len(evicted)
+
+
+def figure_png(fig):
+    """Render a figure to PNG bytes, reusing earlier renders of identical figures"""
+    key = figure_hash(fig)
+    with _png_lock:
+        if key in _png_cache:
+            _png_cache.move_to_end(key)
+            tracing.count('png_cache_lookups_total', outcome='hit')
+            return _png_cache[key]
+
+    tracing.count('png_cache_lookups_total', outcome='miss')
+    start_renderer()
+    with tracing.span('export.write_image'):
+        png = pio.to_image(fig, format="png")
+    with _png_lock:
+        _remember(key, png)
+    return png
+
+
+def export_pngs(figures, directory):
+    """Write {name: figure} charts as PNG files into directory; returns the paths
+
+    Cached renders are written directly and the rest go to the renderer as one
+    batch.
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths, pending = {}, {}
+    for name, fig in figures.items():
+        safe = re.sub(r'[^A-Za-z0-9._^-]', '_', name)
+        path = paths[name] = os.path.join(directory, f"{safe}.png")
+        key = figure_hash(fig)
+        with _png_lock:
+            png = _png_cache.get(key)
+        if png is None:
+            pending[name] = fig
+        else:
+            tracing.count('png_cache_lookups_total', outcome='hit')
+            with open(path, 'wb') as f:
+                f.write(png)
+
+    if pending:
+        start_renderer()
+        names = list(pending)
+        tracing.count('png_cache_lookups_total', amount=len(names), outcome='miss')
+        with tracing.span('export.write_image'):
+            if hasattr(pio, 'write_images'):
+                pio.write_images([pending[n] for n in names], [paths[n] for n in names], format="png")
+            else:
+                for name in names:
+                    pio.write_image(pending[name], paths[name], format="png")
+        for name in names:
+            with open(paths[name], 'rb') as f:
+                png = f.read()
+            with _png_lock:
+                _remember(figure_hash(pending[name]), png)
+    return paths
+
+
+# ---------------- DATA EXPORT ----------------
+
+def iter_chunks(data, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Split a frame into row chunks"""
+    for start in range(0, len(data), chunk_rows):
+        yield data.iloc[start:start + chunk_rows]
+
+
+def write_frames(frames, fileobj, fmt):
+    """Stream frames into fileobj as CSV, gzip CSV or Parquet, one chunk at a time"""
+    if fmt == 'Parquet':
+        writer = None
+        for frame in frames:
+            table = pa.Table.from_pandas(frame, preserve_index=True)
+            if writer is None:
+                writer = pq.ParquetWriter(fileobj, table.schema)
+            writer.write_table(table.cast(writer.schema))
+        if writer is not None:
+            writer.close()
+        return
+
+    if fmt not in DATA_FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}'")
+    out = gzip.GzipFile(fileobj=fileobj, mode='wb') if fmt == 'CSV (gzip)' else fileobj
+    header = True
+    for frame in frames:
+        out.write(frame.to_csv(header=header).encode())
+        header = False
+    if out is not fileobj:
+        out.close()
+
+
+def export_data(data, fmt='CSV'):
+    """Build a download file for one ticker's bars; returns a file object at position 0"""
+    spool = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_BYTES)
+    with tracing.span('export.data'):
+        write_frames(iter_chunks(data), spool, fmt)
+    spool.seek(0)
+    return spool
+
+
+def _combined_frames(tickers, load):
+    # Loaded one ticker at a time so only one frame is ever in memory
+    for ticker in tickers:
+        data = load(ticker)
+        if data is None or data.empty:
+            continue
+        data = data.reindex(columns=COMBINED_COLUMNS[1:])
+        data['Volume'] = data['Volume'].fillna(0).astype('int64')
+        data[['Dividends', 'Stock Splits']] = data[['Dividends', 'Stock Splits']].fillna(0.0)
+        data.insert(0, 'Ticker', ticker)
+        # Exchanges use different time zones, so the combined file is in UTC
+        if getattr(data.index, 'tz', None) is not None:
+            data.index = data.index.tz_convert('UTC')
+        data.index.name = 'Date'
+        yield from iter_chunks(data)
+
+
+def export_tickers(tickers, load, fmt='CSV', fileobj=None):
+    """Write several tickers' bars into one combined file
+
+    load(ticker) returns that ticker's bars. Returns fileobj (or a new spooled
+    temp file) positioned at the start.
+    """
+    out = fileobj if fileobj is not None else tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_BYTES)
+    with tracing.span('export.combined'):
+        write_frames(_combined_frames(tickers, load), out, fmt)
+    out.seek(0)
+    return out
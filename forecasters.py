@@ -0,0 +1,297 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+import indicators
+
+# ---------------- CONFIG ----------------
+FORECAST_BACKEND = os.getenv('FORECAST_BACKEND', 'prophet')
+# Most recent bars the NumPy backends fit on (about two trading years)
+FORECAST_WINDOW = int(os.getenv('FORECAST_WINDOW', 504))
+AR_LAGS = int(os.getenv('FORECAST_AR_LAGS', 5))
+# Damped Holt: smoothing parameters are picked per series from this grid
+HOLT_ALPHAS = np.linspace(0.05, 0.95, 19)
+HOLT_BETAS = np.array([0.01, 0.05, 0.1, 0.2])
+HOLT_DAMPING = 0.98
+# Two-sided 80% band, the same width Prophet draws by default
+INTERVAL_Z = 1.2816
+BACKTEST_ORIGINS = 4
+
+# Forecaster interface. Every backend forecasts closes, either one ds/y
+# frame at a time for the dashboard (fit_predict) or a NaN-padded
+# (tickers, bars) matrix at once for watchlists and backtests (predict_many,
+# laid out like the indicator engine's input). Horizons in predict_many are
+# counted in bars; the dashboard plots them on business days.
+
+
+def future_dates(last, periods):
+    """The next periods business days after last"""
+    return pd.bdate_range(pd.Timestamp(last) + pd.offsets.BDay(), periods=periods)
+
+
+class Forecaster:
+    """One forecasting backend"""
+
+    name = 'forecaster'
+    label = 'Forecaster'
+    # Cheap enough to run in the calling thread, and fits many series at once
+    batched = False
+
+    def available(self):
+        """Whether the backend's dependencies are installed"""
+        return True
+
+    def predict_many(self, closes, periods):
+        """(yhat, lower, upper) closes, each shaped (tickers, periods)"""
+        raise NotImplementedError
+
+    def fit_predict(self, df, periods):
+        """Forecast a ds/y frame; the result's 'forecast' frame has the history rows (y) then the future (yhat)"""
+        yhat, lower, upper = self.predict_many(df['y'].to_numpy()[np.newaxis, :], periods)
+        future = pd.DataFrame({
+            'ds': future_dates(df['ds'].iloc[-1], periods),
+            'yhat': yhat[0], 'yhat_lower': lower[0], 'yhat_upper': upper[0],
+        })
+        return {'backend': self.name, 'forecast': pd.concat([df[['ds', 'y']], future], ignore_index=True)}
+
+
+def _log_window(closes):
+    closes = indicators.as_matrix(closes)[:, -FORECAST_WINDOW:]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.log(np.where(closes > 0, closes, np.nan))
+
+
+def _band(log_last, log_path, sigma):
+    # Log-space forecast and per-step standard deviation -> price forecast and band
+    return np.exp(log_last[:, None] + log_path), \
+        np.exp(log_last[:, None] + log_path - INTERVAL_Z * sigma), \
+        np.exp(log_last[:, None] + log_path + INTERVAL_Z * sigma)
+
+
+class NaiveForecaster(Forecaster):
+    """Last close carried forward; the baseline the others have to beat"""
+
+    name = 'naive'
+    label = 'Last close (baseline)'
+    batched = True
+
+    def predict_many(self, closes, periods):
+        logs = _log_window(closes)
+        returns = np.diff(logs, axis=1)
+        with np.errstate(invalid='ignore'):
+            sigma = np.nanstd(returns, axis=1, ddof=1) if returns.shape[1] > 1 else np.full(len(logs), np.nan)
+        steps = np.arange(1, periods + 1)
+        return _band(logs[:, -1], np.zeros((len(logs), periods)), sigma[:, None] * np.sqrt(steps))
+
+
+class HoltForecaster(Forecaster):
+    """Damped Holt linear trend on log closes
+
+    Every series is filtered against the whole (alpha, beta) grid in one
+    pass over the bars, and each keeps the pair with the lowest one-step
+    squared error.
+    """
+
+    name = 'holt'
+    label = 'Holt (damped trend)'
+    batched = True
+
+    def predict_many(self, closes, periods):
+        logs = _log_window(closes)
+        alpha = np.repeat(HOLT_ALPHAS, len(HOLT_BETAS))[np.newaxis, :]
+        beta = np.tile(HOLT_BETAS, len(HOLT_ALPHAS))[np.newaxis, :]
+        n, grid = len(logs), alpha.shape[1]
+        level = np.zeros((n, grid))
+        trend = np.zeros((n, grid))
+        sse = np.zeros((n, grid))
+        started = np.zeros((n, 1), dtype=bool)
+
+        for column in logs.T:
+            x = column[:, np.newaxis]
+            valid = ~np.isnan(x)
+            update = valid & started
+            predicted = level + HOLT_DAMPING * trend
+            error = np.where(update, x - predicted, 0.0)
+            sse += error ** 2
+            # Series start at their first valid bar with a flat trend
+            level = np.where(update, predicted + alpha * error, np.where(valid & ~started, x, level))
+            trend = np.where(update, HOLT_DAMPING * trend + alpha * beta * error, trend)
+            started |= valid
+
+        rows = np.arange(n)
+        best = np.argmin(sse, axis=1)
+        level, trend, sse = level[rows, best], trend[rows, best], sse[rows, best]
+        alpha, beta = alpha[0, best], beta[0, best]
+        counts = indicators.valid_counts(logs)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sigma = np.where(counts > 3, np.sqrt(sse / np.maximum(counts - 3, 1)), np.nan)
+
+        damping = np.cumsum(HOLT_DAMPING ** np.arange(1, periods + 1))
+        path = trend[:, None] * damping
+        # Forecast variance of the additive damped-trend model
+        weights = alpha[:, None] * (1 + beta[:, None] * damping[np.newaxis, :-1]) if periods > 1 else np.zeros((n, 0))
+        variance = 1 + np.concatenate([np.zeros((n, 1)), np.cumsum(weights ** 2, axis=1)], axis=1)
+        last = np.where(counts >= 3, level, np.nan)
+        return _band(last, path, sigma[:, None] * np.sqrt(variance))
+
+
+class ARForecaster(Forecaster):
+    """AR(p) with intercept on daily log returns
+
+    Each series gets its own least-squares fit, solved for all series in one
+    batched call; the forecast compounds the predicted returns.
+    """
+
+    name = 'ar'
+    label = f'AR({AR_LAGS}) on log returns'
+    batched = True
+
+    def __init__(self, lags=AR_LAGS):
+        self.lags = lags
+
+    def predict_many(self, closes, periods):
+        p = self.lags
+        logs = _log_window(closes)
+        returns = np.diff(logs, axis=1)
+        n = len(logs)
+        nan = np.full((n, periods), np.nan)
+        if returns.shape[1] < 2 * (p + 1):
+            return nan, nan.copy(), nan.copy()
+
+        # Rows of [r(t-p) ... r(t-1), r(t)]; rows touching the NaN padding are zeroed out
+        windows = sliding_window_view(returns, p + 1, axis=1)
+        usable = ~np.isnan(windows).any(axis=2)
+        windows = np.where(usable[..., None], windows, 0.0)
+        design = np.concatenate([usable[..., None].astype(float), windows[..., :p]], axis=2)
+        target = windows[..., p]
+        observations = usable.sum(axis=1)
+
+        gram = np.einsum('nmi,nmj->nij', design, design) + 1e-8 * np.eye(p + 1)
+        coefficients = np.linalg.solve(gram, np.einsum('nmi,nm->ni', design, target)[..., None])[..., 0]
+        residuals = (target - np.einsum('nmi,ni->nm', design, coefficients)) * usable
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sigma = np.sqrt((residuals ** 2).sum(axis=1) / (observations - p - 1))
+        intercept, weights = coefficients[:, 0], coefficients[:, 1:]   # weights oldest lag first
+
+        lagged = returns[:, -p:].copy()
+        path = np.empty((n, periods))
+        for step in range(periods):
+            predicted = intercept + np.einsum('np,np->n', lagged, weights)
+            path[:, step] = predicted
+            lagged = np.concatenate([lagged[:, 1:], predicted[:, None]], axis=1)
+
+        # Error variance of the compounded return: cumulated impulse responses
+        psi = np.zeros((n, periods))
+        psi[:, 0] = 1.0
+        for j in range(1, periods):
+            for i in range(1, min(j, p) + 1):
+                psi[:, j] += weights[:, p - i] * psi[:, j - i]
+        variance = np.cumsum(np.cumsum(psi, axis=1) ** 2, axis=1)
+
+        enough = observations >= 2 * (p + 1)
+        last = np.where(enough, logs[:, -1], np.nan)
+        return _band(last, np.cumsum(path, axis=1), sigma[:, None] * np.sqrt(variance))
+
+
+class ProphetForecaster(Forecaster):
+    """Prophet, one series at a time; slow but models seasonality and changepoints"""
+
+    name = 'prophet'
+    label = 'Prophet'
+
+    def available(self):
+        try:
+            import prophet  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def fit_predict(self, df, periods):
+        # Imported here so the dashboard starts without loading Prophet
+        from prophet import Prophet
+        from prophet.serialize import model_to_json
+
+        model = Prophet()
+        model.fit(df)
+        future = model.make_future_dataframe(periods=periods)
+        forecast = model.predict(future)
+        return {'backend': self.name, 'model': model_to_json(model), 'forecast': forecast}
+
+    def predict_many(self, closes, periods):
+        from prophet import Prophet
+
+        closes = indicators.as_matrix(closes)
+        yhat, lower, upper = (np.full((len(closes), periods), np.nan) for _ in range(3))
+        for row, values in enumerate(closes):
+            values = values[~np.isnan(values)][-FORECAST_WINDOW:]
+            if len(values) < 3:
+                continue
+            # Bars are laid on consecutive business days; the matrix has no dates
+            ds = pd.bdate_range(end='2000-01-03', periods=len(values) + periods)
+            model = Prophet()
+            model.fit(pd.DataFrame({'ds': ds[:len(values)], 'y': values}))
+            forecast = model.predict(pd.DataFrame({'ds': ds[len(values):]}))
+            yhat[row], lower[row], upper[row] = forecast['yhat'], forecast['yhat_lower'], forecast['yhat_upper']
+        return yhat, lower, upper
+
+
+FORECASTERS = {f.name: f for f in (ProphetForecaster(), HoltForecaster(), ARForecaster())}
+BASELINE = NaiveForecaster()
+
+
+def get_forecaster(name=FORECAST_BACKEND):
+    try:
+        return FORECASTERS[name]
+    except KeyError:
+        raise ValueError(f"unknown forecast backend '{name}' (choose from {', '.join(FORECASTERS)})") from None
+
+
+def backtest(closes, forecaster, horizon=30, origins=BACKTEST_ORIGINS):
+    """Rolling-origin error and fit latency of a backend over a closes matrix
+
+    The last origins * horizon bars are cut into consecutive test windows;
+    each window is forecast from the bars before it, all series in one call.
+    """
+    closes = indicators.as_matrix(closes)
+    bars = closes.shape[1]
+    errors, log_errors, direction_hits, covered = [], [], [], []
+    fit_seconds, fits = 0.0, 0
+    for k in range(origins, 0, -1):
+        cut = bars - k * horizon
+        if cut < 2 * horizon:
+            continue
+        train, actual = closes[:, :cut], closes[:, cut:cut + horizon]
+        started = time.perf_counter()
+        yhat, lower, upper = forecaster.predict_many(train, horizon)
+        fit_seconds += time.perf_counter() - started
+        fits += len(train)
+
+        valid = ~np.isnan(yhat) & ~np.isnan(actual)
+        last = train[:, -1:]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            errors.append(np.abs(yhat - actual)[valid] / actual[valid])
+            log_errors.append(np.log(yhat[valid] / actual[valid]))
+        end = valid[:, -1]
+        direction_hits.append(np.sign(yhat[end, -1] - last[end, 0]) == np.sign(actual[end, -1] - last[end, 0]))
+        covered.append((actual[valid] >= lower[valid]) & (actual[valid] <= upper[valid]))
+
+    def mean(parts):
+        values = np.concatenate(parts) if parts else np.array([])
+        return float(values.mean()) if len(values) else None
+
+    squared = mean([e ** 2 for e in log_errors])
+    return {
+        'backend': forecaster.name,
+        'horizon': horizon,
+        'origins': len(direction_hits),
+        'series': len(closes),
+        'mape': mean(errors),
+        'rmse_log': None if squared is None else float(np.sqrt(squared)),
+        'direction_accuracy': mean(direction_hits),
+        'interval_coverage': mean(covered),
+        'fit_seconds': fit_seconds,
+        'fit_seconds_per_series': fit_seconds / fits if fits else None,
+    }
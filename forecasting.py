@@ -0,0 +1,241 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pandas as pd
+
+import forecasters
+import shared_cache
+import tracing
+
+# ---------------- CONFIG ----------------
+FORECAST_WORKERS = int(os.getenv('FORECAST_WORKERS', max(1, (os.cpu_count() or 2) // 2)))
+FORECAST_CACHE_SIZE = int(os.getenv('FORECAST_CACHE_SIZE', 64))
+# Finished fits are shared with other worker processes through shared_cache;
+# a fit running in one process is awaited by the others for up to this long
+FORECAST_LEASE_SECONDS = float(os.getenv('FORECAST_LEASE_SECONDS', 300))
+
+PENDING = 'pending'
+DONE = 'done'
+ERROR = 'error'
+MISSING = 'missing'
+
+_lock = threading.Lock()
+_pool = None
+_jobs = {}                 # key -> Future for fits that are running or failed
+_results = OrderedDict()   # key -> {'model': json, 'forecast': DataFrame}, LRU order
+_remote = set()            # keys another process is fitting
+_owner = uuid.uuid4().hex
+
+
+def _fit(backend, df, periods):
+    """Fit a backend (in a worker process for Prophet) and return its forecast"""
+    started = time.perf_counter()
+    result = forecasters.get_forecaster(backend).fit_predict(df, periods)
+    # Timed here because spans in the worker process never reach the parent
+    result['fit_seconds'] = time.perf_counter() - started
+    return result
+
+
+def _import_prophet():
+    try:
+        import prophet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=FORECAST_WORKERS)
+    return _pool
+
+
+def warm_up():
+    """Start the worker processes and import Prophet in each, ahead of the first fit"""
+    with _lock:
+        pool = _get_pool()
+    futures = [pool.submit(_import_prophet) for _ in range(FORECAST_WORKERS)]
+    return all(future.result() for future in futures)
+
+
+def series_key(df, periods, backend=forecasters.FORECAST_BACKEND):
+    """Hash of the input series, horizon and backend, used as the job and cache key"""
+    digest = hashlib.sha256(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    digest.update(f"{periods}:{backend}".encode())
+    return digest.hexdigest()
+
+
+def _store_result(key, result):
+    _results[key] = result
+    _results.move_to_end(key)
+    while len(_results) > FORECAST_CACHE_SIZE:
+        _results.popitem(last=False)
+
+
+def _shared_key(key):
+    return f"forecasts:{key}"
+
+
+def _shared_result(key):
+    """A finished fit from the shared cache, or None"""
+    cache = shared_cache.get_cache()
+    if cache is None:
+        return None
+    try:
+        result = cache.get('forecasts', _shared_key(key), count=False)
+    except sqlite3.Error:
+        return None
+    return None if result is shared_cache.MISSING else result
+
+
+def _claim(key):
+    """True if this process should fit key, False if another process already is"""
+    cache = shared_cache.get_cache()
+    if cache is None:
+        return True
+    try:
+        return cache.acquire_lease(_shared_key(key), _owner, FORECAST_LEASE_SECONDS)
+    except sqlite3.Error:
+        return True
+
+
+def _publish(key, result):
+    cache = shared_cache.get_cache()
+    if cache is None:
+        return
+    try:
+        if result is not None:
+            cache.set('forecasts', _shared_key(key), result)
+        cache.release_lease(_shared_key(key), _owner)
+    except sqlite3.Error:
+        pass
+
+
+def _remote_pending(key):
+    cache = shared_cache.get_cache()
+    try:
+        return cache is not None and cache.lease_held(_shared_key(key))
+    except sqlite3.Error:
+        return False
+
+
+def _on_done(key, future):
+    with _lock:
+        if future.cancelled() or future.exception() is not None:
+            tracing.count('forecast_errors_total')
+            result = None
+        else:
+            result = future.result()
+            tracing.observe(f"{result['backend']}.fit", result.get('fit_seconds', 0.0))
+            _store_result(key, result)
+            _jobs.pop(key, None)
+    _publish(key, result)
+
+
+def submit_forecast(df, periods=30, backend=forecasters.FORECAST_BACKEND):
+    """Start a forecast for a ds/y frame and return its key immediately
+
+    Cached results are reused and a fit already running for the same key is
+    shared, so concurrent viewers of the same series trigger a single fit.
+    Batched backends take milliseconds, so they are fitted right here and
+    their key is already done when it is returned.
+    """
+    global _pool
+    key = series_key(df, periods, backend)
+    with _lock:
+        if key in _results or key in _jobs or key in _remote:
+            tracing.count('forecast_cache_lookups_total', outcome='hit' if key in _results else 'shared')
+            return key
+
+    if forecasters.get_forecaster(backend).batched:
+        tracing.count('forecast_cache_lookups_total', outcome='miss')
+        try:
+            with tracing.span(f"{backend}.fit"):
+                result = _fit(backend, df, periods)
+        except Exception as e:
+            tracing.count('forecast_errors_total')
+            failed = Future()
+            failed.set_exception(e)
+            with _lock:
+                _jobs[key] = failed
+            return key
+        with _lock:
+            _store_result(key, result)
+        return key
+
+    # Another worker process may have fitted this series already, or be fitting it
+    result = _shared_result(key)
+    claimed = result is None and _claim(key)
+    with _lock:
+        if result is not None:
+            tracing.count('forecast_cache_lookups_total', outcome='hit')
+            _store_result(key, result)
+            return key
+        if not claimed:
+            tracing.count('forecast_cache_lookups_total', outcome='shared')
+            _remote.add(key)
+            return key
+        if key in _results or key in _jobs:
+            return key
+        tracing.count('forecast_cache_lookups_total', outcome='miss')
+        try:
+            future = _get_pool().submit(_fit, backend, df, periods)
+        except BrokenProcessPool:
+            _pool = None
+            future = _get_pool().submit(_fit, backend, df, periods)
+        _jobs[key] = future
+    future.add_done_callback(lambda f: _on_done(key, f))
+    return key
+
+
+def get_forecast(key):
+    """Return (status, result) for a forecast key without blocking"""
+    with _lock:
+        if key in _results:
+            _results.move_to_end(key)
+            return DONE, _results[key]
+        future = _jobs.get(key)
+        remote = future is None and key in _remote
+    if remote:
+        result = _shared_result(key)
+        with _lock:
+            if result is not None:
+                _remote.discard(key)
+                _store_result(key, result)
+                return DONE, result
+            if _remote_pending(key):
+                return PENDING, None
+            # The other process gave up; the next submit fits it here
+            _remote.discard(key)
+            return MISSING, None
+
+    with _lock:
+        if future is None:
+            return MISSING, None
+        if not future.done():
+            return PENDING, None
+        # Failed fits are dropped so the next request retries them
+        _jobs.pop(key, None)
+        if future.cancelled():
+            return ERROR, 'Forecast was cancelled'
+        error = future.exception()
+        if error is not None:
+            return ERROR, error
+        _store_result(key, future.result())
+        return DONE, _results[key]
+
+
+def prepare_series(data):
+    """Convert dashboard bars into the ds/y frame the forecasters expect"""
+    df = data.reset_index()[['Date', 'Close']]
+    df['Date'] = df['Date'].dt.tz_localize(None)
+    df.rename(columns={"Date": "ds", "Close": "y"}, inplace=True)
+    return df
@@ -0,0 +1,376 @@
+import json
+import math
+import os
+import tempfile
+from collections import deque
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Indicator engine over a 2-D array of closes shaped (tickers, bars).
+# Rows may start with NaN padding when tickers have different history
+# lengths (see stack_closes); every indicator treats that padding as "no
+# data yet", the same way the ta library sees a shorter series. Interior
+# NaNs are not expected. Results match ta's defaults (fillna=False).
+
+
+def as_matrix(closes):
+    """Return closes as a float 2-D (tickers, bars) array"""
+    closes = np.asarray(closes, dtype=float)
+    if closes.ndim == 1:
+        closes = closes[np.newaxis, :]
+    return closes
+
+
+def stack_closes(series_list):
+    """Right-align close series of different lengths into one NaN-padded matrix"""
+    arrays = [np.asarray(s, dtype=float) for s in series_list]
+    bars = max((len(a) for a in arrays), default=0)
+    closes = np.full((len(arrays), bars), np.nan)
+    for row, values in enumerate(arrays):
+        if len(values):
+            closes[row, bars - len(values):] = values
+    return closes
+
+
+def valid_counts(closes):
+    """Number of non-NaN bars per ticker"""
+    return np.count_nonzero(~np.isnan(as_matrix(closes)), axis=1)
+
+
+def insufficient_history(closes, window):
+    """Per-ticker flag: True where there are fewer bars than the window needs"""
+    return valid_counts(closes) < window
+
+
+def _windows(closes, window):
+    closes = as_matrix(closes)
+    out = np.full(closes.shape, np.nan)
+    if closes.shape[1] >= window:
+        return closes, out, sliding_window_view(closes, window, axis=1)
+    return closes, out, None
+
+
+def sma(closes, window):
+    """Simple moving average"""
+    closes, out, windows = _windows(closes, window)
+    if windows is not None:
+        out[:, window - 1:] = windows.mean(axis=-1)
+    return out
+
+
+def _backfill_padding(values):
+    """Fill each row's leading NaN padding with its first valid value"""
+    started = np.cumsum(~np.isnan(values), axis=1) > 0
+    first = np.argmax(started, axis=1)
+    seed = values[np.arange(values.shape[0]), first]
+    return np.where(started, values, seed[:, np.newaxis]), started
+
+
+def ema(closes, window=None, alpha=None, min_periods=None):
+    """Exponential moving average (pandas ewm with adjust=False)
+
+    Pass window for span-based smoothing (alpha = 2 / (window + 1)) or alpha
+    directly, e.g. 1 / window for Wilder smoothing. alpha and min_periods may
+    also be per-row arrays so several EMAs share one pass over the bars.
+    """
+    closes = as_matrix(closes)
+    if alpha is None:
+        alpha = 2.0 / (np.asarray(window, dtype=float) + 1)
+    if min_periods is None:
+        min_periods = window if window is not None else 1
+    alpha = np.broadcast_to(np.asarray(alpha, dtype=float), closes.shape[:1])
+    min_periods = np.broadcast_to(np.asarray(min_periods), closes.shape[:1])
+
+    # Seeding the padding with the first valid value leaves the recursion
+    # untouched (an EMA of a constant is that constant), so the loop needs no
+    # per-bar NaN handling
+    filled, started = _backfill_padding(closes)
+    out = np.empty_like(filled)
+    state = filled[:, 0].copy()
+    for t in range(filled.shape[1]):
+        state += alpha * (filled[:, t] - state)
+        out[:, t] = state
+
+    count = np.cumsum(started, axis=1)
+    ready = started & (count >= np.maximum(min_periods, 1)[:, np.newaxis])
+    return np.where(ready, out, np.nan)
+
+
+def rsi(closes, window=14):
+    """Wilder RSI"""
+    closes = as_matrix(closes)
+    diff = np.diff(closes, axis=1, prepend=np.nan)
+    started = np.cumsum(~np.isnan(closes), axis=1) > 0
+    up = np.where(started, np.where(diff > 0, diff, 0.0), np.nan)
+    down = np.where(started, np.where(diff < 0, -diff, 0.0), np.nan)
+
+    avg_up, avg_down = np.split(ema(np.vstack([up, down]), alpha=1.0 / window, min_periods=window), 2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        value = np.where(avg_down == 0, 100.0, 100.0 - 100.0 / (1.0 + avg_up / avg_down))
+    return np.where(np.isnan(avg_down), np.nan, value)
+
+
+def macd(closes, fast=12, slow=26, signal=9):
+    """MACD line, signal line and histogram"""
+    closes = as_matrix(closes)
+    rows = closes.shape[0]
+    windows = np.repeat([fast, slow], rows)
+    ema_fast, ema_slow = np.split(ema(np.vstack([closes, closes]), windows), 2)
+    line = ema_fast - ema_slow
+    signal_line = ema(line, signal)
+    return line, signal_line, line - signal_line
+
+
+def bollinger(closes, window=20, num_std=2):
+    """Bollinger middle, upper and lower bands (population std, like ta)"""
+    closes, mid, windows = _windows(closes, window)
+    upper, lower = mid.copy(), mid.copy()
+    if windows is not None:
+        mean = windows.mean(axis=-1)
+        std = windows.std(axis=-1)
+        mid[:, window - 1:] = mean
+        upper[:, window - 1:] = mean + num_std * std
+        lower[:, window - 1:] = mean - num_std * std
+    return mid, upper, lower
+
+
+# ---------------- INCREMENTAL STATE ----------------
+# Stateful counterparts of the indicators above for live bar updates: seed
+# once from history, then each update() costs O(1) time and memory. Values
+# match the vectorized engine bar for bar, and to_dict()/state_from_dict()
+# round-trip through JSON so warm state survives a restart.
+
+class SMAState:
+    """Rolling-sum simple moving average"""
+
+    # Recompute the running sum from the window now and then to stop
+    # floating-point drift from accumulating over long runs
+    RESYNC_EVERY = 1000
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque(maxlen=window)
+        self.total = 0.0
+        self.updates = 0
+
+    def update(self, close):
+        if len(self.values) == self.window:
+            self.total -= self.values[0]
+        self.values.append(close)
+        self.total += close
+        self.updates += 1
+        if self.updates % self.RESYNC_EVERY == 0:
+            self.total = math.fsum(self.values)
+        return self.value
+
+    @property
+    def warmup(self):
+        """Closes needed before value is defined"""
+        return self.window
+
+    @property
+    def value(self):
+        if len(self.values) < self.window:
+            return math.nan
+        return self.total / self.window
+
+    def to_dict(self):
+        return {'type': 'sma', 'window': self.window, 'values': list(self.values), 'updates': self.updates}
+
+    @classmethod
+    def from_dict(cls, data):
+        state = cls(data['window'])
+        state.values.extend(data['values'])
+        state.total = math.fsum(state.values)
+        state.updates = data['updates']
+        return state
+
+
+class EMAState:
+    """Exponential moving average (span-based unless alpha is given)"""
+
+    def __init__(self, window=None, alpha=None, min_periods=None):
+        self.alpha = alpha if alpha is not None else 2.0 / (window + 1)
+        self.min_periods = max(min_periods if min_periods is not None else (window or 1), 1)
+        self.state = math.nan
+        self.count = 0
+
+    def update(self, close):
+        if self.count == 0:
+            self.state = close
+        else:
+            self.state += self.alpha * (close - self.state)
+        self.count += 1
+        return self.value
+
+    @property
+    def warmup(self):
+        return self.min_periods
+
+    @property
+    def value(self):
+        return self.state if self.count >= self.min_periods else math.nan
+
+    def to_dict(self):
+        return {'type': 'ema', 'alpha': self.alpha, 'min_periods': self.min_periods,
+                'state': self.state, 'count': self.count}
+
+    @classmethod
+    def from_dict(cls, data):
+        state = cls(alpha=data['alpha'], min_periods=data['min_periods'])
+        state.state = data['state']
+        state.count = data['count']
+        return state
+
+
+class RSIState:
+    """Wilder-smoothed RSI"""
+
+    def __init__(self, window=14):
+        self.window = window
+        self.prev_close = None
+        self.avg_up = EMAState(alpha=1.0 / window, min_periods=window)
+        self.avg_down = EMAState(alpha=1.0 / window, min_periods=window)
+
+    def update(self, close):
+        change = 0.0 if self.prev_close is None else close - self.prev_close
+        self.prev_close = close
+        self.avg_up.update(max(change, 0.0))
+        self.avg_down.update(max(-change, 0.0))
+        return self.value
+
+    @property
+    def warmup(self):
+        # The first close only primes prev_close, but still feeds a zero change
+        return self.avg_up.warmup
+
+    @property
+    def value(self):
+        up, down = self.avg_up.value, self.avg_down.value
+        if math.isnan(down):
+            return math.nan
+        if down == 0:
+            return 100.0
+        return 100.0 - 100.0 / (1.0 + up / down)
+
+    def to_dict(self):
+        return {'type': 'rsi', 'window': self.window, 'prev_close': self.prev_close,
+                'avg_up': self.avg_up.to_dict(), 'avg_down': self.avg_down.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data):
+        state = cls(data['window'])
+        state.prev_close = data['prev_close']
+        state.avg_up = EMAState.from_dict(data['avg_up'])
+        state.avg_down = EMAState.from_dict(data['avg_down'])
+        return state
+
+
+class MACDState:
+    """MACD line, signal line and histogram"""
+
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast = EMAState(fast)
+        self.slow = EMAState(slow)
+        self.signal = EMAState(signal)
+
+    def update(self, close):
+        fast, slow = self.fast.update(close), self.slow.update(close)
+        if not math.isnan(fast) and not math.isnan(slow):
+            self.signal.update(fast - slow)
+        return self.value
+
+    @property
+    def warmup(self):
+        # The signal line starts once both averages are defined
+        return max(self.fast.warmup, self.slow.warmup) + self.signal.warmup - 1
+
+    @property
+    def value(self):
+        line = self.fast.value - self.slow.value
+        signal = self.signal.value
+        return line, signal, line - signal
+
+    def to_dict(self):
+        return {'type': 'macd', 'fast': self.fast.to_dict(), 'slow': self.slow.to_dict(),
+                'signal': self.signal.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data):
+        state = cls()
+        state.fast = EMAState.from_dict(data['fast'])
+        state.slow = EMAState.from_dict(data['slow'])
+        state.signal = EMAState.from_dict(data['signal'])
+        return state
+
+
+class IndicatorSet:
+    """The indicators the apps show for one ticker, updated together per bar"""
+
+    def __init__(self, states=None):
+        self.states = states if states is not None else {
+            'sma_20': SMAState(20),
+            'sma_50': SMAState(50),
+            'rsi': RSIState(14),
+            'macd': MACDState(12, 26, 9),
+        }
+
+    def seed(self, closes):
+        """Warm every indicator from historical closes"""
+        for close in np.asarray(closes, dtype=float):
+            self.update(close)
+        return self
+
+    def update(self, close):
+        """Feed one new close and return the latest values"""
+        close = float(close)
+        for state in self.states.values():
+            state.update(close)
+        return self.values()
+
+    def values(self):
+        return {name: state.value for name, state in self.states.items()}
+
+    def warmups(self):
+        """{indicator: closes needed before its value is defined}"""
+        return {name: state.warmup for name, state in self.states.items()}
+
+    def to_dict(self):
+        return {'type': 'set', 'states': {name: state.to_dict() for name, state in self.states.items()}}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls({name: state_from_dict(state) for name, state in data['states'].items()})
+
+
+STATE_TYPES = {'sma': SMAState, 'ema': EMAState, 'rsi': RSIState, 'macd': MACDState, 'set': IndicatorSet}
+
+
+def state_from_dict(data):
+    """Rebuild any indicator state from its to_dict() form"""
+    return STATE_TYPES[data['type']].from_dict(data)
+
+
+def save_states(path, states):
+    """Atomically write a {ticker: IndicatorSet} mapping as JSON"""
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump({key: state.to_dict() for key, state in states.items()}, f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def load_states(path):
+    """Load states written by save_states; empty if the file is missing or unreadable"""
+    try:
+        with open(path) as f:
+            return {key: state_from_dict(data) for key, data in json.load(f).items()}
+    except (FileNotFoundError, ValueError, KeyError):
+        return {}
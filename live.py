@@ -0,0 +1,174 @@
+import copy
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+import indicators
+import tracing
+import upstream
+
+# ---------------- CONFIG ----------------
+LIVE_FEED = os.getenv('LIVE_FEED', 'yahoo')   # 'yahoo' or 'stub'
+LIVE_INTERVAL = os.getenv('LIVE_INTERVAL', '1m')
+LIVE_POLL_SECONDS = float(os.getenv('LIVE_POLL_SECONDS', 15))
+# Bars kept and charted; one US session of 1-minute bars. Each refresh only
+# touches this window, so its cost does not grow with the history length.
+LIVE_WINDOW = int(os.getenv('LIVE_WINDOW', 390))
+LIVE_SEED_PERIOD = '5d'
+
+BAR_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+INTERVAL_STEPS = {'1m': '1min', '5m': '5min', '15m': '15min', '1h': '1h'}
+
+
+class YahooFeed:
+    """Intraday bars from yfinance"""
+
+    def history(self, symbol, interval=LIVE_INTERVAL, period=LIVE_SEED_PERIOD):
+        with upstream.slot('yahoo', 'live'):
+            data = yf.Ticker(symbol).history(period=period, interval=interval)
+        return data[BAR_COLUMNS] if not data.empty else data
+
+    def latest(self, symbol, since, interval=LIVE_INTERVAL):
+        """Bars from since (inclusive) onwards, i.e. the forming bar and anything newer"""
+        with upstream.slot('yahoo', 'live'):
+            data = yf.Ticker(symbol).history(start=since, interval=interval)
+        return data[BAR_COLUMNS] if not data.empty else data
+
+
+class StubFeed:
+    """Random-walk bars generated locally, for demos and offline work"""
+
+    def __init__(self, seed=0, clock=time.time):
+        self.rng = np.random.default_rng(seed)
+        self.clock = clock
+        self.last = {}   # symbol -> (timestamp, close)
+
+    def _bars(self, symbol, start, end, step):
+        index = pd.date_range(start, end, freq=step, tz='UTC', name='Datetime')
+        if len(index) == 0:
+            return pd.DataFrame(columns=BAR_COLUMNS)
+        price = self.last.get(symbol, (None, 100.0))[1]
+        closes = price * np.exp(np.cumsum(self.rng.normal(0, 0.0015, len(index))))
+        opens = np.concatenate([[price], closes[:-1]])
+        spread = np.abs(self.rng.normal(0, 0.001, len(index))) * closes
+        data = pd.DataFrame({
+            'Open': opens,
+            'High': np.maximum(opens, closes) + spread,
+            'Low': np.minimum(opens, closes) - spread,
+            'Close': closes,
+            'Volume': self.rng.integers(1_000, 100_000, len(index)),
+        }, index=index)
+        self.last[symbol] = (index[-1], closes[-1])
+        return data
+
+    def history(self, symbol, interval=LIVE_INTERVAL, period=LIVE_SEED_PERIOD):
+        step = pd.Timedelta(INTERVAL_STEPS[interval])
+        end = pd.Timestamp(self.clock(), unit='s', tz='UTC').floor(step)
+        return self._bars(symbol, end - step * (LIVE_WINDOW - 1), end, step)
+
+    def latest(self, symbol, since, interval=LIVE_INTERVAL):
+        step = pd.Timedelta(INTERVAL_STEPS[interval])
+        end = pd.Timestamp(self.clock(), unit='s', tz='UTC').floor(step)
+        last_time = self.last.get(symbol, (None, None))[0]
+        start = since if last_time is None else last_time + step
+        return self._bars(symbol, start, end, step)
+
+
+def get_feed(name=LIVE_FEED):
+    return StubFeed() if name == 'stub' else YahooFeed()
+
+
+class LiveSeries:
+    """The latest LIVE_WINDOW bars of one symbol, grown by polling
+
+    Indicators are kept as incremental state over closed bars only; the
+    forming (last) bar is applied to a copy on read, so its updates never
+    corrupt the state. One instance can serve many sessions: polls closer
+    together than poll_seconds return without calling the feed.
+    """
+
+    def __init__(self, symbol, feed, interval=LIVE_INTERVAL, window=LIVE_WINDOW,
+                 poll_seconds=LIVE_POLL_SECONDS, clock=time.monotonic):
+        self.symbol = symbol
+        self.feed = feed
+        self.interval = interval
+        self.poll_seconds = poll_seconds
+        self.clock = clock
+        self.bars = deque(maxlen=window)   # (timestamp, open, high, low, close, volume)
+        self.indicators = indicators.IndicatorSet()
+        self.last_poll = None
+        self._lock = threading.Lock()
+
+    def _ingest(self, data):
+        added = 0
+        for row in data.itertuples():
+            timestamp = row.Index
+            bar = (timestamp, row.Open, row.High, row.Low, row.Close, row.Volume)
+            if self.bars and timestamp < self.bars[-1][0]:
+                continue
+            if self.bars and timestamp == self.bars[-1][0]:
+                # The forming bar moved; replace it
+                self.bars[-1] = bar
+                continue
+            if self.bars:
+                # The previous bar is final now, so it joins the indicator state
+                self.indicators.update(self.bars[-1][4])
+            self.bars.append(bar)
+            added += 1
+        return added
+
+    def seed(self):
+        """Load recent history once and warm the indicators from it"""
+        with self._lock, tracing.span('live.seed'):
+            data = self.feed.history(self.symbol, self.interval)
+            self._ingest(data.dropna(subset=['Close']))
+            self.last_poll = self.clock()
+        return self
+
+    def poll(self):
+        """Fetch bars since the forming bar; returns how many new bars were appended"""
+        with self._lock:
+            if self.last_poll is not None and self.clock() - self.last_poll < self.poll_seconds:
+                return 0
+            self.last_poll = self.clock()
+            since = self.bars[-1][0] if self.bars else None
+            with tracing.span('live.poll'):
+                try:
+                    if since is None:
+                        data = self.feed.history(self.symbol, self.interval)
+                    else:
+                        data = self.feed.latest(self.symbol, since, self.interval)
+                except Exception:
+                    tracing.count('live_poll_errors_total')
+                    return 0
+                return self._ingest(data.dropna(subset=['Close']))
+
+    def frame(self):
+        """The window as an OHLCV frame"""
+        with self._lock:
+            rows = list(self.bars)
+        frame = pd.DataFrame(rows, columns=['Datetime', *BAR_COLUMNS])
+        return frame.set_index('Datetime')
+
+    def short_indicators(self):
+        """{indicator: bars it needs} for those the window is still too short for"""
+        with self._lock:
+            closes = np.array([bar[4] for bar in self.bars], dtype=float)
+        return {
+            name: window for name, window in self.indicators.warmups().items()
+            if indicators.insufficient_history(closes, window)[0]
+        }
+
+    def values(self):
+        """Indicator values including the forming bar"""
+        with self._lock:
+            if not self.bars:
+                return self.indicators.values()
+            current = copy.deepcopy(self.indicators)
+            last_close = self.bars[-1][4]
+        return current.update(last_close)
@@ -0,0 +1,267 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import yfinance as yf
+
+import alpha_vantage
+import providers
+import tracing
+import upstream
+
+# ---------------- CONFIG ----------------
+# One history window shared by price and technicals: the last two closes give
+# the daily change and the full window feeds the indicators.
+BATCH_PERIOD = "1mo"
+MAX_WORKERS = int(os.getenv('MARKET_DATA_WORKERS', 8))
+
+# Seconds each quote field stays fresh. Price, change and volume all come from
+# the recent 'history' window; name, market cap and P/E come from .info.
+QUOTE_TTL_FAST = float(os.getenv('QUOTE_TTL_FAST', 60))
+QUOTE_TTL_SLOW = float(os.getenv('QUOTE_TTL_SLOW', 6 * 3600))
+QUOTE_FIELD_TTLS = {
+    'history': QUOTE_TTL_FAST,
+    'longName': 24 * 3600,
+    'marketCap': QUOTE_TTL_SLOW,
+    'trailingPE': QUOTE_TTL_SLOW,
+}
+INFO_FIELDS = ['longName', 'marketCap', 'trailingPE']
+# Symbols kept in the quote cache; the least recently used are dropped past it
+QUOTE_CACHE_MAX_SYMBOLS = int(os.getenv('QUOTE_CACHE_MAX_SYMBOLS', 2048))
+# Request counts halve every hour when ranking symbols for prefetch
+POPULARITY_HALF_LIFE = float(os.getenv('POPULARITY_HALF_LIFE', 3600))
+
+
+class QuoteCache:
+    """Process-wide per-field TTL cache with single-flight loading
+
+    Misses are fetched through a batch loader that takes a list of symbols and
+    returns {symbol: {field: value}}. Concurrent misses for a symbol already
+    being loaded wait for that load instead of starting their own. At most
+    max_symbols symbols are kept, evicting the least recently used.
+    """
+
+    def __init__(self, field_ttls, clock=time.monotonic, max_symbols=QUOTE_CACHE_MAX_SYMBOLS):
+        self.field_ttls = field_ttls
+        self.clock = clock
+        self.max_symbols = max_symbols
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # symbol -> {field: (value, expires_at)}, least recent first
+        self._inflight = {}   # (source, symbol) -> Future
+        self.stats = {'hits': 0, 'misses': 0, 'coalesced': 0, 'refreshed': 0}
+
+    def _cached(self, symbol, fields, now):
+        values = {}
+        entries = self._entries.get(symbol, {})
+        for field in fields:
+            entry = entries.get(field)
+            if entry is None or entry[1] <= now:
+                return None
+            values[field] = entry[0]
+        return values
+
+    def stale(self, symbols, fields):
+        """Symbols missing a fresh value for any of the fields"""
+        with self._lock:
+            now = self.clock()
+            return [symbol for symbol in symbols if self._cached(symbol, fields, now) is None]
+
+    def get_many(self, symbols, fields, loader, source=None, refresh=False):
+        """Return {symbol: {field: value}}, loading stale symbols in one batch
+
+        refresh=True reloads every symbol even if fresh (background prefetch);
+        those loads are kept out of the hit-rate counters.
+        """
+        source = source or loader.__name__
+        results, waiting, owned = {}, {}, {}
+        with self._lock:
+            now = self.clock()
+            for symbol in symbols:
+                cached = None if refresh else self._cached(symbol, fields, now)
+                if cached is not None:
+                    self.stats['hits'] += 1
+                    self._entries.move_to_end(symbol)
+                    results[symbol] = cached
+                elif (source, symbol) in self._inflight:
+                    self.stats['refreshed' if refresh else 'coalesced'] += 1
+                    waiting[symbol] = self._inflight[(source, symbol)]
+                else:
+                    self.stats['refreshed' if refresh else 'misses'] += 1
+                    owned[symbol] = self._inflight[(source, symbol)] = Future()
+
+        if owned:
+            try:
+                loaded = loader(list(owned))
+            except Exception:
+                loaded = {}
+            with self._lock:
+                now = self.clock()
+                for symbol, values in loaded.items():
+                    entries = self._entries.setdefault(symbol, {})
+                    for field, value in values.items():
+                        entries[field] = (value, now + self.field_ttls.get(field, QUOTE_TTL_FAST))
+                    self._entries.move_to_end(symbol)
+                while len(self._entries) > self.max_symbols:
+                    self._entries.popitem(last=False)
+                for symbol in owned:
+                    self._inflight.pop((source, symbol), None)
+            for symbol, future in owned.items():
+                future.set_result(loaded.get(symbol))
+                waiting[symbol] = future
+
+        for symbol, future in waiting.items():
+            values = future.result()
+            if values is not None:
+                results[symbol] = {field: values.get(field) for field in fields}
+        return results
+
+    def snapshot(self):
+        """Counters plus hit rate, for sizing the TTLs"""
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats['hits'] + stats['misses'] + stats['coalesced']
+        stats['hit_rate'] = (stats['hits'] + stats['coalesced']) / lookups if lookups else 0.0
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def fetch_histories(symbols, period=BATCH_PERIOD):
+    """Download history for several symbols in one batched Yahoo request"""
+    if not symbols:
+        return {}
+    try:
+        return providers.yahoo.histories(list(symbols), period)
+    except Exception:
+        return {}
+
+
+def fetch_info(symbol):
+    """Get the yfinance info dict for a symbol, empty on failure"""
+    try:
+        with upstream.slot('yahoo', 'info'):
+            return yf.Ticker(symbol).info or {}
+    except Exception:
+        return {}
+
+
+def _load_histories(symbols, priority=alpha_vantage.INTERACTIVE):
+    # Hedged across providers, so a slow or failing Yahoo still yields prices
+    return {
+        symbol: {'history': hist}
+        for symbol, hist in providers.histories(symbols, BATCH_PERIOD, priority).items()
+    }
+
+
+def _refresh_histories(symbols):
+    return _load_histories(symbols, alpha_vantage.BACKGROUND)
+
+
+def _load_infos(symbols):
+    with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(symbols))) as pool:
+        futures = [upstream.submit(pool, fetch_info, symbol) for symbol in symbols]
+        infos = {symbol: future.result() for symbol, future in zip(symbols, futures)}
+    # Failed lookups are left out so they are retried instead of cached
+    return {
+        symbol: {field: info.get(field, 'N/A') for field in INFO_FIELDS}
+        for symbol, info in infos.items() if info
+    }
+
+
+class Popularity:
+    """Request counts per symbol that decay with a half-life, so recent interest wins"""
+
+    def __init__(self, half_life=POPULARITY_HALF_LIFE, clock=time.monotonic):
+        self.half_life = half_life
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._scores = {}   # symbol -> (score, updated_at)
+
+    def _decayed(self, symbol, now):
+        score, updated = self._scores.get(symbol, (0.0, now))
+        return score * 0.5 ** ((now - updated) / self.half_life)
+
+    def record(self, symbols):
+        with self._lock:
+            now = self.clock()
+            for symbol in symbols:
+                self._scores[symbol] = (self._decayed(symbol, now) + 1.0, now)
+
+    def score(self, symbol):
+        with self._lock:
+            return self._decayed(symbol, self.clock())
+
+    def ranked(self, symbols):
+        """Symbols by descending score; ties keep their given order"""
+        with self._lock:
+            now = self.clock()
+            scores = {symbol: self._decayed(symbol, now) for symbol in symbols}
+        return sorted(symbols, key=lambda symbol: -scores[symbol])
+
+
+quote_cache = QuoteCache(QUOTE_FIELD_TTLS)
+popularity = Popularity()
+
+
+def quote_cache_stats():
+    """Hit, miss and coalesce counters of the process-wide quote cache"""
+    return quote_cache.snapshot()
+
+
+def _quote_cache_metrics():
+    stats = quote_cache_stats()
+    metrics = [('quote_cache_hit_rate', {}, round(stats['hit_rate'], 6), 'gauge')]
+    for key, outcome in (('hits', 'hit'), ('misses', 'miss'), ('coalesced', 'coalesced'), ('refreshed', 'refreshed')):
+        metrics.append(('quote_cache_lookups_total', {'outcome': outcome}, stats[key], 'counter'))
+    return metrics
+
+
+tracing.register_collector(_quote_cache_metrics)
+
+
+def fetch_snapshots(symbols):
+    """Fetch history and info for several symbols concurrently, through the quote cache
+
+    Stale histories come from a single batched download while the per-symbol
+    info calls fan out over a bounded thread pool alongside it.
+    """
+    symbols = list(dict.fromkeys(symbols))
+    if not symbols:
+        return {}, {}
+    popularity.record(symbols)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        hist_future = upstream.submit(pool, quote_cache.get_many, symbols, ['history'], _load_histories)
+        infos = quote_cache.get_many(symbols, INFO_FIELDS, _load_infos)
+        histories = hist_future.result()
+    return (
+        {symbol: values['history'] for symbol, values in histories.items()},
+        infos,
+    )
+
+
+def refresh_histories(symbols):
+    """Reload histories ahead of their TTL in one batched call (prefetch)
+
+    Does not count towards popularity or the hit-rate counters.
+    """
+    symbols = list(dict.fromkeys(symbols))
+    if not symbols:
+        return
+    # Same single-flight source as user lookups, but rate-limited calls queue behind them
+    quote_cache.get_many(symbols, ['history'], _refresh_histories, source='_load_histories', refresh=True)
+
+
+def stale_infos(symbols):
+    """Symbols whose name, market cap or P/E needs reloading"""
+    return quote_cache.stale(symbols, INFO_FIELDS)
+
+
+def refresh_infos(symbols):
+    """Reload info for the symbols, one upstream call each (prefetch)"""
+    symbols = list(dict.fromkeys(symbols))
+    if symbols:
+        quote_cache.get_many(symbols, INFO_FIELDS, _load_infos, refresh=True)
@@ -0,0 +1,62 @@
+import streamlit as st
+import time
+from dotenv import load_dotenv
+
+# Load environment variables (before the local modules read their settings)
+load_dotenv()
+import screener
+import tickers
+
+SCREEN_TTL_SECONDS = 300
+
+st.set_page_config(page_title="🔎 Stock Screener", layout="wide")
+st.title("🔎 Stock Screener")
+
+# ---------------- SIDEBAR ----------------
+groups = tickers.ticker_groups()
+selected_groups = st.sidebar.multiselect("Groups", list(groups), default=list(groups))
+rank_by = st.sidebar.selectbox("Rank by", ["1M %", "1D %", "3M %", "Fcst 1M %", "RSI", "Volume Spike"])
+descending = st.sidebar.checkbox("Highest first", value=True)
+
+
+@st.cache_data(ttl=SCREEN_TTL_SECONDS, show_spinner=False)
+def load_screen(symbols):
+    """Screener table for a tuple of symbols, with the time it took to build"""
+    began = time.perf_counter()
+    table = screener.run_screen(list(symbols))
+    return table, time.perf_counter() - began
+
+
+symbols = tuple(dict.fromkeys(symbol for group in selected_groups for symbol in groups[group]))
+if not symbols:
+    st.info("Select at least one group in the sidebar.")
+    st.stop()
+
+if st.sidebar.button("🔄 Refresh now"):
+    load_screen.clear()
+
+with st.spinner(f"Screening {len(symbols)} tickers..."):
+    table, elapsed = load_screen(symbols)
+
+missing = len(symbols) - len(table)
+st.caption(
+    f"{len(table)} of {len(symbols)} tickers screened in {elapsed:.1f}s"
+    + (f" ({missing} returned no data)" if missing else "")
+    + f". Results are reused for {SCREEN_TTL_SECONDS // 60} minutes; click a column header to re-sort."
+)
+st.dataframe(
+    table.sort_values(rank_by, ascending=not descending, na_position="last"),
+    hide_index=True,
+    use_container_width=True,
+    column_config={
+        "Price": st.column_config.NumberColumn(format="%.2f"),
+        "1D %": st.column_config.NumberColumn(format="%.2f"),
+        "1M %": st.column_config.NumberColumn(format="%.2f"),
+        "3M %": st.column_config.NumberColumn(format="%.2f"),
+        "Fcst 1M %": st.column_config.NumberColumn(
+            format="%.2f", help=f"Expected change over the next {screener.FORECAST_BARS} trading days"
+        ),
+        "RSI": st.column_config.NumberColumn(format="%.1f"),
+        "Volume Spike": st.column_config.NumberColumn(format="%.2fx", help="Today's volume vs the 20-day average"),
+    },
+)
@@ -0,0 +1,168 @@
+import os
+import threading
+import time
+from datetime import datetime, time as dtime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import alpha_vantage
+import market_data
+import tracing
+
+# ---------------- CONFIG ----------------
+# While a symbol's exchange is open its history is reloaded a little before
+# the quote cache would expire it; while closed, only every CLOSED_INTERVAL
+# (0 turns closed-market refreshes off).
+OPEN_INTERVAL = float(os.getenv('PREFETCH_OPEN_INTERVAL', market_data.QUOTE_TTL_FAST * 0.75))
+CLOSED_INTERVAL = float(os.getenv('PREFETCH_CLOSED_INTERVAL', 6 * 3600))
+BATCH_SIZE = int(os.getenv('PREFETCH_BATCH_SIZE', 25))
+TICK_SECONDS = float(os.getenv('PREFETCH_TICK_SECONDS', 5))
+# Upstream calls the prefetcher may make per minute, on top of user traffic
+CALLS_PER_MINUTE = float(os.getenv('PREFETCH_CALLS_PER_MINUTE', 12))
+
+# Exchange -> (time zone, sessions as (open, close) local times). Holidays
+# are not modelled; a refresh on a holiday just finds the same bars.
+EXCHANGES = {
+    'US': ('America/New_York', [(dtime(9, 30), dtime(16, 0))]),
+    'NSE': ('Asia/Kolkata', [(dtime(9, 15), dtime(15, 30))]),
+    'TSE': ('Asia/Tokyo', [(dtime(9, 0), dtime(11, 30)), (dtime(12, 30), dtime(15, 30))]),
+    'HKEX': ('Asia/Hong_Kong', [(dtime(9, 30), dtime(12, 0)), (dtime(13, 0), dtime(16, 0))]),
+    'SSE': ('Asia/Shanghai', [(dtime(9, 30), dtime(11, 30)), (dtime(13, 0), dtime(15, 0))]),
+    'KRX': ('Asia/Seoul', [(dtime(9, 0), dtime(15, 30))]),
+    'LSE': ('Europe/London', [(dtime(8, 0), dtime(16, 30))]),
+    'XETRA': ('Europe/Berlin', [(dtime(9, 0), dtime(17, 30))]),
+    'EURONEXT': ('Europe/Paris', [(dtime(9, 0), dtime(17, 30))]),
+}
+SUFFIX_EXCHANGES = {
+    '.NS': 'NSE', '.BO': 'NSE', '.T': 'TSE', '.HK': 'HKEX', '.SS': 'SSE', '.SZ': 'SSE',
+    '.KS': 'KRX', '.L': 'LSE', '.DE': 'XETRA', '.PA': 'EURONEXT', '.AS': 'EURONEXT',
+}
+INDEX_EXCHANGES = {
+    '^NSEI': 'NSE', '^BSESN': 'NSE', '^N225': 'TSE', '^HSI': 'HKEX',
+    '^FTSE': 'LSE', '^GDAXI': 'XETRA', '^FCHI': 'EURONEXT',
+}
+
+
+def exchange_for(symbol):
+    """Exchange a symbol trades on, from its index name or suffix; US otherwise"""
+    symbol = symbol.upper()
+    if symbol in INDEX_EXCHANGES:
+        return INDEX_EXCHANGES[symbol]
+    for suffix, exchange in SUFFIX_EXCHANGES.items():
+        if symbol.endswith(suffix):
+            return exchange
+    return 'US'
+
+
+def is_open(exchange, now=None):
+    """Whether the exchange is in a trading session at now (an aware datetime)"""
+    zone, sessions = EXCHANGES[exchange]
+    local = (now or datetime.now(timezone.utc)).astimezone(ZoneInfo(zone))
+    if local.weekday() >= 5:
+        return False
+    return any(start <= local.time() < end for start, end in sessions)
+
+
+def next_open(exchange, now=None):
+    """When the exchange's next trading session starts after now (an aware datetime)"""
+    zone, sessions = EXCHANGES[exchange]
+    local = (now or datetime.now(timezone.utc)).astimezone(ZoneInfo(zone))
+    for days in range(8):
+        day = local.date() + timedelta(days=days)
+        if day.weekday() >= 5:
+            continue
+        for start, _ in sessions:
+            opens = datetime.combine(day, start, tzinfo=ZoneInfo(zone))
+            if opens > local:
+                return opens
+
+
+class PrefetchScheduler:
+    """Keeps a set of symbols warm in market_data's quote cache
+
+    Every tick the symbols whose refresh interval has passed are ranked by
+    request popularity and the top BATCH_SIZE are reloaded in one batched
+    download; then symbols whose slow-changing fields have expired get their
+    info reloaded, most popular first. Every upstream request (the download
+    and each info call) takes a token from a background rate limiter, so
+    prefetching stays within CALLS_PER_MINUTE calls however many symbols are
+    due; whatever has no token waits for a later tick. Alpha Vantage calls
+    made when the download is hedged are metered by its own limiter.
+    """
+
+    def __init__(self, symbols, batch_size=BATCH_SIZE, limiter=None,
+                 clock=time.monotonic, wall_clock=lambda: datetime.now(timezone.utc)):
+        self.symbols = list(dict.fromkeys(symbols))
+        self.batch_size = batch_size
+        self.limiter = limiter or alpha_vantage.TokenBucket(CALLS_PER_MINUTE)
+        self.clock = clock
+        self.wall_clock = wall_clock
+        self.refreshed = {}   # symbol -> clock() of its last prefetch
+        self._stop = threading.Event()
+        self._thread = None
+
+    def due(self):
+        """Symbols whose interval has passed, most popular first"""
+        now, wall = self.clock(), self.wall_clock()
+        open_by_exchange = {}
+        due = []
+        for symbol in self.symbols:
+            exchange = exchange_for(symbol)
+            if exchange not in open_by_exchange:
+                open_by_exchange[exchange] = is_open(exchange, wall)
+            interval = OPEN_INTERVAL if open_by_exchange[exchange] else CLOSED_INTERVAL
+            if not interval:
+                continue
+            last = self.refreshed.get(symbol)
+            if last is None or now - last >= interval:
+                due.append(symbol)
+        return market_data.popularity.ranked(due)
+
+    def _take_token(self):
+        return self.limiter.acquire(alpha_vantage.BACKGROUND, timeout=0)
+
+    def run_once(self):
+        """Spend the free rate-limit tokens on due histories, then on expired infos
+
+        Returns the symbols whose history was refreshed.
+        """
+        batch = self.due()[:self.batch_size]
+        if batch and self._take_token():
+            with tracing.span('prefetch.batch'):
+                market_data.refresh_histories(batch)
+            now = self.clock()
+            for symbol in batch:
+                self.refreshed[symbol] = now
+            tracing.count('prefetch_symbols_total', amount=len(batch))
+        else:
+            batch = []
+
+        infos = []
+        for symbol in market_data.stale_infos(market_data.popularity.ranked(self.symbols)):
+            if not self._take_token():
+                break
+            infos.append(symbol)
+        if infos:
+            with tracing.span('prefetch.info'):
+                market_data.refresh_infos(infos)
+            tracing.count('prefetch_infos_total', amount=len(infos))
+        return batch
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"[WARN] Prefetch failed: {e}")
+            self._stop.wait(TICK_SECONDS)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True, name='prefetch')
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,391 @@
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import pandas as pd
+import yfinance as yf
+
+import alpha_vantage
+import data_store
+import tracing
+import upstream
+
+# ---------------- CONFIG ----------------
+# A secondary provider is started when the current one has not answered
+# after HEDGE_DELAY seconds (or failed); the first usable answer wins as long
+# as it arrives within LATENCY_BUDGET.
+HEDGE_DELAY = float(os.getenv('PROVIDER_HEDGE_DELAY', 1.5))
+LATENCY_BUDGET = float(os.getenv('PROVIDER_LATENCY_BUDGET', 8))
+# Consecutive failures that open a provider's circuit, and how long it stays open
+BREAKER_FAILURES = int(os.getenv('PROVIDER_BREAKER_FAILURES', 5))
+BREAKER_RESET_SECONDS = float(os.getenv('PROVIDER_BREAKER_RESET_SECONDS', 30))
+HEDGE_WORKERS = int(os.getenv('PROVIDER_HEDGE_WORKERS', 16))
+# Alpha Vantage makes one call per symbol against a few calls a minute, so it
+# is only a price secondary for requests this small
+ALPHA_VANTAGE_MAX_SYMBOLS = int(os.getenv('PROVIDER_ALPHA_VANTAGE_MAX_SYMBOLS', 2))
+# The adjusted daily series is a premium endpoint; free keys get raw closes,
+# which match Yahoo's adjusted ones except across a split or dividend
+ALPHA_VANTAGE_ADJUSTED = os.getenv('ALPHA_VANTAGE_ADJUSTED', '0').lower() in ('1', 'true', 'yes')
+
+# Calendar days covered by the yfinance period strings used here
+PERIOD_DAYS = {'1d': 1, '5d': 5, '1mo': 31, '3mo': 92, '6mo': 183, '1y': 366}
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class ProviderError(Exception):
+    """Raised when a provider cannot answer a request"""
+
+
+class CircuitBreaker:
+    """Stops traffic to a provider after repeated failures
+
+    After BREAKER_FAILURES consecutive failures the circuit opens and calls are
+    refused for reset_timeout seconds; then one trial call is let through and
+    its outcome closes or reopens the circuit.
+    """
+
+    def __init__(self, failure_threshold=BREAKER_FAILURES, reset_timeout=BREAKER_RESET_SECONDS, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Whether a call may go out now; a half-open circuit admits one trial at a time"""
+        with self._lock:
+            if self.state == OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self._trial_running = False
+
+    def release_trial(self):
+        """End a trial that neither succeeded nor failed (e.g. the request ran out of time)"""
+        with self._lock:
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = OPEN
+                self.opened_at = self.clock()
+
+
+class Provider:
+    """One data source; methods raise ProviderError when they cannot answer"""
+
+    name = 'provider'
+    # Largest symbol list histories() is worth asking for; None for no limit
+    max_symbols = None
+
+    def __init__(self):
+        # One circuit per method, so failing price lookups do not block news
+        self.breakers = {'histories': CircuitBreaker(), 'news': CircuitBreaker()}
+
+    def available(self):
+        """Whether the provider is configured at all (e.g. has an API key)"""
+        return True
+
+    def histories(self, symbols, period, priority=alpha_vantage.INTERACTIVE):
+        """{symbol: split/dividend-adjusted OHLCV frame} for the recent period"""
+        raise ProviderError(f"{self.name} has no price history")
+
+    def news(self, symbol, limit=3):
+        """Latest (title, url) headlines"""
+        raise ProviderError(f"{self.name} has no news")
+
+
+class YahooProvider(Provider):
+    name = 'yahoo'
+
+    def histories(self, symbols, period, priority=alpha_vantage.INTERACTIVE):
+        """Download several symbols in one batched request"""
+        try:
+            with upstream.slot('yahoo', 'download'):
+                data = yf.download(
+                    list(symbols), period=period, group_by='ticker',
+                    auto_adjust=True, threads=True, progress=False,
+                    timeout=upstream.timeout_for(10)
+                )
+        except upstream.DeadlineExceeded:
+            raise
+        except Exception as e:
+            raise ProviderError(f"yahoo download failed: {e}") from e
+        if data is None or data.empty:
+            return {}
+
+        if not isinstance(data.columns, pd.MultiIndex):
+            frames = {symbols[0]: data}
+        else:
+            available = set(data.columns.get_level_values(0))
+            frames = {symbol: data[symbol] for symbol in symbols if symbol in available}
+
+        histories = {}
+        for symbol, frame in frames.items():
+            # Batched downloads align every symbol on one calendar, so drop the
+            # padding rows and restore integer volumes like Ticker.history returns
+            frame = frame.dropna(subset=['Close'])
+            if not frame.empty:
+                frame = frame.assign(Volume=frame['Volume'].fillna(0).astype('int64'))
+                histories[symbol] = frame
+        return histories
+
+    def news(self, symbol, limit=3):
+        try:
+            stock = yf.Ticker(symbol)
+            with upstream.slot('yahoo', 'news'):
+                news = stock.news or []
+        except upstream.DeadlineExceeded:
+            raise
+        except Exception as e:
+            raise ProviderError(f"yahoo news failed: {e}") from e
+
+        results = []
+        for item in news:
+            title = item.get('title', '')
+            url = item.get('link', '')
+            if title and url:
+                results.append((title, url))
+        return results[:limit]
+
+
+class AlphaVantageProvider(Provider):
+    name = 'alphavantage'
+    max_symbols = ALPHA_VANTAGE_MAX_SYMBOLS
+
+    def available(self):
+        return bool(alpha_vantage.get_client().api_key)
+
+    def histories(self, symbols, period, priority=alpha_vantage.INTERACTIVE):
+        """Daily bars, one call per symbol; symbols it does not cover are left out
+
+        Adjusted like yfinance's auto_adjust when ALPHA_VANTAGE_ADJUSTED is set
+        (premium keys), raw otherwise.
+        """
+        days = PERIOD_DAYS.get(period, 31)
+        function = 'TIME_SERIES_DAILY_ADJUSTED' if ALPHA_VANTAGE_ADJUSTED else 'TIME_SERIES_DAILY'
+        histories = {}
+        for symbol in symbols:
+            data = alpha_vantage.get_client().query({'function': function, 'symbol': symbol}, priority)
+            series = (data or {}).get('Time Series (Daily)')
+            if not series:
+                # NSE tickers, indices and the like; the next provider can answer for them
+                tracing.count('provider_unsupported_total', provider=self.name)
+                continue
+            frame = pd.DataFrame.from_dict(series, orient='index').astype(float)
+            frame.index = pd.to_datetime(frame.index).rename('Date')
+            frame = frame.sort_index()
+            frame = frame[frame.index >= frame.index[-1] - pd.Timedelta(days=days)]
+            if ALPHA_VANTAGE_ADJUSTED:
+                # Scale OHLC by adjusted/raw close, as yfinance's auto_adjust does
+                ratio = frame['5. adjusted close'] / frame['4. close']
+                volume = frame['6. volume']
+            else:
+                ratio = 1.0
+                volume = frame['5. volume']
+            histories[symbol] = pd.DataFrame({
+                'Open': frame['1. open'] * ratio,
+                'High': frame['2. high'] * ratio,
+                'Low': frame['3. low'] * ratio,
+                'Close': frame['4. close'] * ratio,
+                'Volume': volume.astype('int64'),
+            })
+        return histories
+
+    def news(self, symbol, limit=3):
+        return alpha_vantage.get_client().news(symbol, limit=limit)
+
+
+class LocalStoreProvider(Provider):
+    """Bars already saved by the dashboard; possibly stale, but never slow"""
+
+    name = 'local'
+
+    def histories(self, symbols, period, priority=alpha_vantage.INTERACTIVE):
+        days = PERIOD_DAYS.get(period, 31)
+        histories = {}
+        for symbol in symbols:
+            data, _ = data_store.load_bars(symbol)
+            if not data.empty:
+                histories[symbol] = data[data.index >= data.index[-1] - pd.Timedelta(days=days)]
+        return histories
+
+
+yahoo = YahooProvider()
+alphavantage = AlphaVantageProvider()
+local = LocalStoreProvider()
+
+# Providers tried in order; the fallbacks are only used once every hedged
+# provider has failed or the budget is spent
+HISTORY_PROVIDERS = [yahoo, alphavantage]
+HISTORY_FALLBACKS = [local]
+NEWS_PROVIDERS = [alphavantage, yahoo]
+
+_executor = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix='hedge')
+
+
+def _record(provider, method, future):
+    breaker = provider.breakers[method]
+    try:
+        future.result()
+    except upstream.DeadlineExceeded:
+        # Says nothing about the provider, but a half-open trial must not stay claimed
+        breaker.release_trial()
+        return
+    except Exception:
+        breaker.record_failure()
+        tracing.count('provider_errors_total', provider=provider.name)
+    else:
+        breaker.record_success()
+
+
+def _call(provider, method, args):
+    return getattr(provider, method)(*args)
+
+
+def hedged(providers, method, *args, hedge_delay=HEDGE_DELAY, budget=LATENCY_BUDGET, fallbacks=()):
+    """Ask providers for method(*args), hedging to the next one after hedge_delay
+
+    Returns (provider, answer) for the first non-empty answer that arrives
+    within the budget (capped by the request deadline). Providers whose
+    circuit is open are skipped. Calls still running when an answer wins are
+    left to finish in the background so their outcome still reaches the
+    breaker. Raises ProviderError when nobody answered.
+    """
+    candidates = [p for p in providers if p.available()]
+    budget = upstream.timeout_for(budget)
+    ends_at = time.monotonic() + budget
+    pending = {}
+    next_start = 0.0
+
+    def launch():
+        while candidates:
+            provider = candidates.pop(0)
+            if provider.breakers[method].allow():
+                future = upstream.submit(_executor, _call, provider, method, args)
+                future.add_done_callback(lambda f, p=provider: _record(p, method, f))
+                pending[future] = provider
+                return True
+            tracing.count('provider_skipped_total', provider=provider.name)
+        return False
+
+    if launch():
+        next_start = time.monotonic() + hedge_delay
+    while pending or candidates:
+        now = time.monotonic()
+        if now >= ends_at:
+            break
+        if not pending or (candidates and now >= next_start):
+            if pending:
+                tracing.count('provider_hedges_total', method=method)
+            if launch():
+                next_start = time.monotonic() + hedge_delay
+            continue
+        timeout = ends_at - now
+        if candidates:
+            timeout = min(timeout, max(0.0, next_start - now))
+        done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in done:
+            provider = pending.pop(future)
+            try:
+                answer = future.result()
+            except Exception:
+                continue
+            if answer:
+                return provider, answer
+        # A failed or empty answer starts the next provider right away
+        if done:
+            next_start = 0.0
+
+    for provider in pending.values():
+        tracing.count('provider_timeouts_total', provider=provider.name)
+    for provider in fallbacks:
+        breaker = provider.breakers[method]
+        if not breaker.allow():
+            continue
+        try:
+            answer = _call(provider, method, args)
+        except upstream.DeadlineExceeded:
+            breaker.release_trial()
+            continue
+        except Exception:
+            breaker.record_failure()
+            continue
+        breaker.record_success()
+        if answer:
+            tracing.count('provider_failovers_total', provider=provider.name)
+            return provider, answer
+    raise ProviderError(f"no provider answered {method} within {budget:.1f}s")
+
+
+def histories(symbols, period='1mo', priority=alpha_vantage.INTERACTIVE):
+    """Recent bars for several symbols from whichever provider answers first
+
+    Symbols the winning provider did not return are asked of the others.
+    Providers with a max_symbols limit are only hedged to for lists that
+    small. Background callers pass priority=BACKGROUND so their rate-limited
+    calls queue behind interactive ones.
+    """
+    symbols = list(symbols)
+    results = {}
+    remaining_providers = list(HISTORY_PROVIDERS)
+    while symbols and remaining_providers:
+        eligible = [p for p in remaining_providers if p.max_symbols is None or len(symbols) <= p.max_symbols]
+        if not eligible:
+            break
+        try:
+            provider, answer = hedged(eligible, 'histories', symbols, period, priority, fallbacks=HISTORY_FALLBACKS)
+        except ProviderError:
+            break
+        results.update(answer)
+        symbols = [symbol for symbol in symbols if symbol not in answer]
+        if provider in remaining_providers:
+            remaining_providers.remove(provider)
+        else:
+            break
+    return results
+
+
+def news(symbol, limit=3):
+    """Latest (title, url) headlines, empty when every provider failed"""
+    try:
+        return hedged(NEWS_PROVIDERS, 'news', symbol, limit)[1]
+    except ProviderError:
+        return []
+
+
+def breaker_states():
+    """{(provider, method): circuit state}, for the metrics endpoint"""
+    return {
+        (p.name, method): breaker.state
+        for p in (yahoo, alphavantage, local) for method, breaker in p.breakers.items()
+    }
+
+
+def _breaker_metrics():
+    return [
+        ('provider_circuit_open', {'provider': name, 'method': method}, int(state != CLOSED), 'gauge')
+        for (name, method), state in breaker_states().items()
+    ]
+
+
+tracing.register_collector(_breaker_metrics)
@@ -0,0 +1,112 @@
+import math
+import os
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objs as go
+
+# ---------------- CONFIG ----------------
+# Roughly one point per horizontal pixel of a wide chart; anything beyond that
+# costs payload and browser time without adding visible detail
+CHART_MAX_POINTS = int(os.getenv('CHART_MAX_POINTS', 2000))
+WEBGL_THRESHOLD = int(os.getenv('CHART_WEBGL_THRESHOLD', 1000))
+
+
+def aggregate_ohlc(data, max_bars=CHART_MAX_POINTS):
+    """Merge consecutive bars into at most max_bars buckets
+
+    Each bucket keeps the true open (first), high (max), low (min) and close
+    (last) of the bars it covers, so candles never hide a price extreme.
+    """
+    n = len(data)
+    if n <= max_bars:
+        return data
+    size = math.ceil(n / max_bars)
+    starts = np.arange(0, n, size)
+    ends = np.minimum(starts + size, n) - 1
+
+    columns = {
+        'Open': data['Open'].to_numpy()[starts],
+        'High': np.maximum.reduceat(data['High'].to_numpy(), starts),
+        'Low': np.minimum.reduceat(data['Low'].to_numpy(), starts),
+        'Close': data['Close'].to_numpy()[ends],
+    }
+    if 'Volume' in data:
+        columns['Volume'] = np.add.reduceat(data['Volume'].to_numpy(), starts)
+    return pd.DataFrame(columns, index=data.index[starts])
+
+
+def lttb_indices(x, y, threshold):
+    """Largest-Triangle-Three-Buckets: positions of the points to keep"""
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    keep = np.empty(threshold, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+
+    selected = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # Average of the next bucket (the last point for the final bucket)
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        # Keep the point forming the largest triangle with the previous pick
+        area = np.abs(
+            (x[selected] - avg_x) * (y[start:end] - y[selected])
+            - (x[selected] - x[start:end]) * (avg_y - y[selected])
+        )
+        selected = start + int(np.argmax(area))
+        keep[i + 1] = selected
+    return keep
+
+
+def downsample_line(series, max_points=CHART_MAX_POINTS):
+    """Reduce a line series to max_points with LTTB, keeping its visual shape"""
+    if len(series) <= max_points:
+        return series
+    x = series.index.asi8 if isinstance(series.index, pd.DatetimeIndex) else np.arange(len(series))
+    return series.iloc[lttb_indices(x, series.to_numpy(), max_points)]
+
+
+def line_figure(series, name="Close", max_points=CHART_MAX_POINTS):
+    """Line chart of a downsampled series, WebGL-backed for large point counts"""
+    points = downsample_line(series.dropna(), max_points)
+    trace = go.Scattergl if len(points) > WEBGL_THRESHOLD else go.Scatter
+    fig = go.Figure(data=[trace(x=points.index, y=points.to_numpy(), mode='lines', name=name)])
+    fig.update_layout(margin=dict(l=0, r=0, t=10, b=0), height=350)
+    return fig
+
+
+def candlestick_figure(data, max_bars=CHART_MAX_POINTS):
+    """Candlestick chart with bars aggregated to fit the viewport"""
+    bars = aggregate_ohlc(data, max_bars)
+    fig = go.Figure(data=[go.Candlestick(
+        x=bars.index, open=bars['Open'], high=bars['High'],
+        low=bars['Low'], close=bars['Close']
+    )])
+    fig.update_layout(xaxis_rangeslider_visible=False)
+    return fig
+
+
+def forecast_figure(forecast, max_points=CHART_MAX_POINTS):
+    """History line, forecast line and its uncertainty band, from a forecasters result frame"""
+    history = forecast.dropna(subset=['y']).set_index('ds')['y']
+    future = forecast.dropna(subset=['yhat'])
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=future['ds'], y=future['yhat_upper'], mode='lines', line=dict(width=0), showlegend=False, hoverinfo='skip'
+    ))
+    fig.add_trace(go.Scatter(
+        x=future['ds'], y=future['yhat_lower'], mode='lines', line=dict(width=0), fill='tonexty',
+        fillcolor='rgba(0, 114, 178, 0.2)', name='80% interval'
+    ))
+    points = downsample_line(history, max_points)
+    fig.add_trace(go.Scatter(x=points.index, y=points.to_numpy(), mode='lines', name='Close', line=dict(color='black')))
+    fig.add_trace(go.Scatter(x=future['ds'], y=future['yhat'], mode='lines', name='Forecast', line=dict(color='#0072B2')))
+    fig.update_layout(margin=dict(l=0, r=0, t=10, b=0), height=400)
+    return fig
@@ -0,0 +1,226 @@
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+import alpha_vantage
+
+# ---------------- CONFIG ----------------
+# Recorded responses live as <SYMBOL>.history.parquet, <SYMBOL>.info.json and
+# <SYMBOL>.news.json in the fixtures directory
+FIXTURES_DIR = os.getenv('REPLAY_FIXTURES_DIR', 'fixtures')
+REPLAY_LATENCY = float(os.getenv('REPLAY_LATENCY', 0.0))
+
+PERIOD_DAYS = {'1d': 1, '5d': 5, '1mo': 31, '3mo': 92, '6mo': 183, '1y': 366, '2y': 731, '5y': 1827, '10y': 3653}
+
+
+def _fixture_path(fixtures_dir, symbol, kind):
+    safe = re.sub(r'[^A-Za-z0-9._^-]', '_', symbol.upper())
+    return os.path.join(fixtures_dir, f"{safe}.{kind}")
+
+
+class ReplayProvider:
+    """Serves recorded history, info and news with configurable injected latency"""
+
+    def __init__(self, fixtures_dir=FIXTURES_DIR, latency=REPLAY_LATENCY, jitter=0.0, seed=0):
+        self.fixtures_dir = fixtures_dir
+        self.latency = latency
+        self.jitter = jitter
+        self.rng = np.random.default_rng(seed)
+        self.calls = {'history': 0, 'info': 0, 'news': 0, 'download': 0}
+        self._histories = {}
+
+    def _wait(self, kind):
+        self.calls[kind] += 1
+        delay = self.latency + (self.rng.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _full_history(self, symbol):
+        if symbol not in self._histories:
+            try:
+                self._histories[symbol] = pd.read_parquet(_fixture_path(self.fixtures_dir, symbol, 'history.parquet'))
+            except (FileNotFoundError, OSError):
+                self._histories[symbol] = pd.DataFrame()
+        return self._histories[symbol]
+
+    def _read_json(self, symbol, kind, default):
+        try:
+            with open(_fixture_path(self.fixtures_dir, symbol, kind)) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return default
+
+    def _slice(self, data, start=None, end=None, period=None):
+        if data.empty:
+            return data
+        index = data.index.tz_localize(None) if data.index.tz is not None else data.index
+        if period and period != 'max' and start is None:
+            # Periods count back from the last recorded bar, as if recorded "today"
+            start = index[-1].normalize() - pd.Timedelta(days=PERIOD_DAYS.get(period, 31))
+        mask = np.ones(len(data), dtype=bool)
+        if start is not None:
+            mask &= index >= pd.Timestamp(start)
+        if end is not None:
+            mask &= index < pd.Timestamp(end)
+        return data[mask]
+
+    def history(self, symbol, start=None, end=None, period=None, **kwargs):
+        self._wait('history')
+        return self._slice(self._full_history(symbol), start, end, period).copy()
+
+    def info(self, symbol):
+        self._wait('info')
+        return self._read_json(symbol, 'info.json', {})
+
+    def news(self, symbol):
+        self._wait('news')
+        return self._read_json(symbol, 'news.json', [])
+
+    def download(self, tickers, start=None, end=None, period='1mo', group_by='column', **kwargs):
+        """yf.download stand-in: one latency hit for the whole batch"""
+        self._wait('download')
+        tickers = [tickers] if isinstance(tickers, str) else list(tickers)
+        frames = {}
+        for symbol in tickers:
+            data = self._slice(self._full_history(symbol), start, end, period)
+            if not data.empty:
+                frames[symbol] = data[['Open', 'High', 'Low', 'Close', 'Volume']]
+        if not frames:
+            return pd.DataFrame()
+        data = pd.concat(frames, axis=1)
+        if group_by != 'ticker':
+            data = data.swaplevel(0, 1, axis=1).sort_index(axis=1)
+        return data
+
+    def ticker(self, symbol):
+        return ReplayTicker(self, symbol)
+
+
+class ReplayTicker:
+    """yf.Ticker stand-in backed by a ReplayProvider"""
+
+    def __init__(self, provider, symbol):
+        self.provider = provider
+        self.ticker = symbol.upper()
+
+    def history(self, period=None, start=None, end=None, **kwargs):
+        if period is None and start is None:
+            period = '1mo'
+        return self.provider.history(self.ticker, start=start, end=end, period=period)
+
+    @property
+    def info(self):
+        return self.provider.info(self.ticker)
+
+    @property
+    def news(self):
+        return self.provider.news(self.ticker)
+
+
+class _ReplayResponse:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def json(self):
+        return self.payload
+
+
+class ReplaySession:
+    """requests.Session stand-in answering Alpha Vantage NEWS_SENTIMENT calls"""
+
+    def __init__(self, provider):
+        self.provider = provider
+
+    def get(self, url, params=None, **kwargs):
+        symbol = (params or {}).get('tickers', '')
+        items = self.provider.news(symbol)
+        return _ReplayResponse({'feed': [{'title': i.get('title', ''), 'url': i.get('link', '')} for i in items]})
+
+
+@contextmanager
+def install(fixtures_dir=FIXTURES_DIR, latency=REPLAY_LATENCY, jitter=0.0):
+    """Route yfinance and Alpha Vantage calls to recorded fixtures inside the block"""
+    provider = ReplayProvider(fixtures_dir, latency, jitter)
+    saved = (yf.Ticker, yf.download, alpha_vantage._client)
+    yf.Ticker = provider.ticker
+    yf.download = provider.download
+    client = alpha_vantage.AlphaVantageClient(
+        api_key='replay', limiter=alpha_vantage.TokenBucket(1e9),
+        cache_dir=tempfile.mkdtemp(prefix='replay-news-')
+    )
+    client.session = ReplaySession(provider)
+    alpha_vantage._client = client
+    try:
+        yield provider
+    finally:
+        yf.Ticker, yf.download, alpha_vantage._client = saved
+
+
+# ---------------- FIXTURE CREATION ----------------
+
+def _write_fixtures(fixtures_dir, symbol, history, info, news):
+    os.makedirs(fixtures_dir, exist_ok=True)
+    history.to_parquet(_fixture_path(fixtures_dir, symbol, 'history.parquet'))
+    with open(_fixture_path(fixtures_dir, symbol, 'info.json'), 'w') as f:
+        json.dump(info, f, default=str)
+    with open(_fixture_path(fixtures_dir, symbol, 'news.json'), 'w') as f:
+        json.dump(news, f, default=str)
+
+
+def record(symbols, fixtures_dir=FIXTURES_DIR, period='5y'):
+    """Record live yfinance responses for the given symbols"""
+    for symbol in symbols:
+        stock = yf.Ticker(symbol)
+        history = stock.history(period=period)
+        info = {key: stock.info.get(key) for key in ('longName', 'marketCap', 'trailingPE')}
+        news = [{'title': item.get('title', ''), 'link': item.get('link', '')} for item in (stock.news or [])[:10]]
+        _write_fixtures(fixtures_dir, symbol, history, info, news)
+        print(f"[INFO] Recorded {symbol}: {len(history)} bars")
+
+
+def generate(symbols, fixtures_dir=FIXTURES_DIR, years=5, seed=0):
+    """Write synthetic random-walk fixtures, for benchmarking without network access"""
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(end=date.today() - timedelta(days=1), periods=252 * years, tz='America/New_York', name='Date')
+    for symbol in symbols:
+        close = rng.uniform(20, 500) * np.exp(np.cumsum(rng.normal(0.0003, 0.018, len(index))))
+        spread = close * np.abs(rng.normal(0, 0.01, len(index)))
+        history = pd.DataFrame({
+            'Open': close + rng.normal(0, 0.3, len(index)) * spread,
+            'High': close + spread,
+            'Low': close - spread,
+            'Close': close,
+            'Volume': rng.integers(100_000, 50_000_000, len(index)),
+            'Dividends': 0.0,
+            'Stock Splits': 0.0,
+        }, index=index)
+        info = {'longName': f"{symbol} Inc.", 'marketCap': int(close[-1] * 1e9), 'trailingPE': float(rng.uniform(8, 60))}
+        news = [{'title': f"{symbol} headline {i}", 'link': f"https://example.com/{symbol}/{i}"} for i in range(5)]
+        _write_fixtures(fixtures_dir, symbol, history, info, news)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Record or generate replay fixtures")
+    parser.add_argument('command', choices=['record', 'generate'])
+    parser.add_argument('symbols', nargs='+')
+    parser.add_argument('--dir', default=FIXTURES_DIR)
+    args = parser.parse_args(argv)
+    if args.command == 'record':
+        record(args.symbols, args.dir)
+    else:
+        generate(args.symbols, args.dir)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
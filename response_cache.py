@@ -0,0 +1,105 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+import prefetch
+import tracing
+
+# ---------------- CONFIG ----------------
+# While any exchange an answer depends on is trading, data answers live for
+# RESPONSE_TTL_OPEN seconds (news for NEWS_TTL_OPEN); once they have all
+# closed, until the first of them opens again. Static answers never expire.
+RESPONSE_TTL_OPEN = float(os.getenv('RESPONSE_TTL_OPEN', 30))
+NEWS_TTL_OPEN = float(os.getenv('RESPONSE_NEWS_TTL_OPEN', 300))
+RESPONSE_CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE', 1024))
+
+STATIC = 'static'
+DATA = 'data'
+NEWS = 'news'
+
+
+def response_ttl(kind, symbols, now=None):
+    """Seconds an answer of this kind about these symbols stays valid; None for never"""
+    if kind == STATIC:
+        return None
+    now = now or datetime.now(timezone.utc)
+    exchanges = {prefetch.exchange_for(symbol) for symbol in symbols} or {'US'}
+    if any(prefetch.is_open(exchange, now) for exchange in exchanges):
+        return NEWS_TTL_OPEN if kind == NEWS else RESPONSE_TTL_OPEN
+    reopens = min(prefetch.next_open(exchange, now) for exchange in exchanges)
+    return max((reopens - now).total_seconds(), RESPONSE_TTL_OPEN)
+
+
+def response_key(intent, symbols):
+    """Normalized cache key: the intent and the set of symbols, in any order"""
+    return intent, tuple(sorted(symbols))
+
+
+class ResponseCache:
+    """LRU cache of finished chatbot answers with per-entry expiry
+
+    Each entry remembers how long its answer took to build, so every hit
+    adds that to the latency saved.
+    """
+
+    def __init__(self, max_entries=RESPONSE_CACHE_SIZE, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> (response, expires_at or None, build seconds)
+        self.stats = {'hits': 0, 'misses': 0, 'saved_seconds': 0.0}
+
+    def get(self, key):
+        """The cached response, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] is not None and entry[1] <= self.clock():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            self.stats['saved_seconds'] += entry[2]
+            return entry[0]
+
+    def put(self, key, response, ttl, seconds):
+        with self._lock:
+            expires_at = None if ttl is None else self.clock() + ttl
+            self._entries[key] = (response, expires_at, seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def snapshot(self):
+        """Counters plus hit rate and entry count"""
+        with self._lock:
+            stats = dict(self.stats, entries=len(self._entries))
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+cache = ResponseCache()
+
+
+def _response_cache_metrics():
+    stats = cache.snapshot()
+    metrics = [
+        ('response_cache_hit_rate', {}, round(stats['hit_rate'], 6), 'gauge'),
+        ('response_cache_entries', {}, stats['entries'], 'gauge'),
+        ('response_cache_saved_seconds_total', {}, round(stats['saved_seconds'], 6), 'counter'),
+    ]
+    for key, outcome in (('hits', 'hit'), ('misses', 'miss')):
+        metrics.append(('response_cache_lookups_total', {'outcome': outcome}, stats[key], 'counter'))
+    return metrics
+
+
+tracing.register_collector(_response_cache_metrics)
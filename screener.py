@@ -0,0 +1,114 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import forecasters
+import indicators
+import market_data
+import tracing
+import upstream
+
+# ---------------- CONFIG ----------------
+# Enough daily bars for the 50-day SMA and a settled MACD
+SCREEN_PERIOD = os.getenv('SCREENER_PERIOD', '6mo')
+# Symbols per batched download; batches run concurrently up to the Yahoo slot limit
+SCREEN_BATCH_SIZE = int(os.getenv('SCREENER_BATCH_SIZE', 40))
+RETURN_WINDOWS = {'1D %': 1, '1M %': 21, '3M %': 63}
+VOLUME_WINDOW = 20
+# Expected move over the next month from a batched forecaster, fitted for the
+# whole universe in one call (a non-batched backend such as Prophet would
+# take minutes here)
+SCREEN_FORECAST_BACKEND = os.getenv('SCREENER_FORECAST_BACKEND', 'ar')
+FORECAST_BARS = 21
+
+COLUMNS = ['Symbol', 'Price', *RETURN_WINDOWS, 'Fcst 1M %', 'RSI', 'MACD', 'Trend', 'Volume Spike', 'Bars']
+
+
+def fetch_universe(symbols, period=SCREEN_PERIOD):
+    """Bars for every symbol, downloaded in concurrent batches"""
+    symbols = list(dict.fromkeys(symbols))
+    batches = [symbols[i:i + SCREEN_BATCH_SIZE] for i in range(0, len(symbols), SCREEN_BATCH_SIZE)]
+    if not batches:
+        return {}
+    histories = {}
+    workers = min(len(batches), upstream.HOST_LIMITS['yahoo'])
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [upstream.submit(pool, market_data.fetch_histories, batch, period) for batch in batches]
+        for future in futures:
+            histories.update(future.result())
+    return histories
+
+
+def _trailing_return(closes, counts, bars):
+    # Percentage change over the last `bars` bars, NaN where history is shorter
+    last = closes[:, -1]
+    previous = closes[:, -1 - bars] if closes.shape[1] > bars else np.full(len(closes), np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        change = (last / previous - 1.0) * 100.0
+    return np.where(counts > bars, change, np.nan)
+
+
+def macd_state(hist):
+    """Label each row by the sign of the last MACD histogram bar and whether it just flipped"""
+    last = hist[:, -1]
+    previous = hist[:, -2] if hist.shape[1] > 1 else np.full(len(hist), np.nan)
+    short = indicators.insufficient_history(hist, 2)
+    return np.select(
+        [np.isnan(last) | short, (last > 0) & (previous <= 0), (last < 0) & (previous >= 0), last > 0],
+        ['N/A', 'Bullish cross', 'Bearish cross', 'Bullish'],
+        default='Bearish'
+    )
+
+
+def sma_trend(price, sma_20, sma_50):
+    """Bullish when price > SMA20 > SMA50, Bearish when the order is reversed"""
+    return np.select(
+        [np.isnan(sma_50), (price > sma_20) & (sma_20 > sma_50), (price < sma_20) & (sma_20 < sma_50)],
+        ['N/A', 'Bullish', 'Bearish'],
+        default='Neutral'
+    )
+
+
+def screen(histories):
+    """One table row per symbol, with every indicator computed in one vectorized pass"""
+    symbols = [symbol for symbol, hist in histories.items() if hist is not None and not hist.empty]
+    if not symbols:
+        return pd.DataFrame(columns=COLUMNS)
+
+    closes = indicators.stack_closes([histories[symbol]['Close'].to_numpy() for symbol in symbols])
+    volumes = indicators.stack_closes([histories[symbol]['Volume'].to_numpy() for symbol in symbols])
+    counts = indicators.valid_counts(closes)
+    price = closes[:, -1]
+    sma_20 = indicators.sma(closes, 20)[:, -1]
+    sma_50 = indicators.sma(closes, 50)[:, -1]
+    _, _, hist = indicators.macd(closes)
+    forecast, _, _ = forecasters.get_forecaster(SCREEN_FORECAST_BACKEND).predict_many(closes, FORECAST_BARS)
+
+    # Today's volume against the average of the bars before it
+    if volumes.shape[1] > 1:
+        average_volume = indicators.sma(volumes[:, :-1], VOLUME_WINDOW)[:, -1]
+    else:
+        average_volume = np.full(len(volumes), np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        spike = np.where(average_volume > 0, volumes[:, -1] / average_volume, np.nan)
+
+    table = pd.DataFrame({'Symbol': symbols, 'Price': price})
+    for column, bars in RETURN_WINDOWS.items():
+        table[column] = _trailing_return(closes, counts, bars)
+    table['Fcst 1M %'] = (forecast[:, -1] / price - 1.0) * 100.0
+    table['RSI'] = indicators.rsi(closes)[:, -1]
+    table['MACD'] = macd_state(hist)
+    table['Trend'] = sma_trend(price, sma_20, sma_50)
+    table['Volume Spike'] = spike
+    table['Bars'] = counts
+    return table
+
+
+def run_screen(symbols, period=SCREEN_PERIOD):
+    """Fetch and screen a universe of symbols"""
+    with tracing.span('screener.fetch'):
+        histories = fetch_universe(symbols, period)
+    with tracing.span('screener.indicators'):
+        return screen(histories)
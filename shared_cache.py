@@ -0,0 +1,351 @@
+import atexit
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+
+import tracing
+
+# ---------------- CONFIG ----------------
+# One SQLite file in WAL mode shared by every session and worker process on
+# the host. Lookups only read, so under WAL they run concurrently with each
+# other and with the writer; their LRU touches and counters are buffered per
+# process and written in one transaction every FLUSH_LOOKUPS lookups or
+# FLUSH_SECONDS.
+CACHE_DIR = os.getenv('STOCK_CACHE_DIR', '.cache')
+SHARED_CACHE_PATH = os.getenv('SHARED_CACHE_PATH', os.path.join(CACHE_DIR, 'shared.sqlite'))
+SHARED_CACHE_ENABLED = os.getenv('SHARED_CACHE_ENABLED', '1').lower() in ('1', 'true', 'yes')
+SHARED_CACHE_MAX_BYTES = int(os.getenv('SHARED_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+# How long others wait for a process that is computing the same entry
+LEASE_SECONDS = float(os.getenv('SHARED_CACHE_LEASE_SECONDS', 30))
+LEASE_POLL_SECONDS = 0.05
+FLUSH_LOOKUPS = int(os.getenv('SHARED_CACHE_FLUSH_LOOKUPS', 64))
+FLUSH_SECONDS = float(os.getenv('SHARED_CACHE_FLUSH_SECONDS', 5))
+
+MISSING = object()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    namespace TEXT NOT NULL,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    expires_at REAL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_lru ON entries (accessed_at);
+CREATE TABLE IF NOT EXISTS leases (key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS stats (
+    namespace TEXT NOT NULL,
+    name TEXT NOT NULL,
+    value INTEGER NOT NULL,
+    PRIMARY KEY (namespace, name)
+);
+-- Running total of entries.size, kept by triggers so eviction need not scan
+CREATE TABLE IF NOT EXISTS usage (id INTEGER PRIMARY KEY CHECK (id = 0), bytes INTEGER NOT NULL);
+INSERT OR IGNORE INTO usage (id, bytes) SELECT 0, COALESCE(SUM(size), 0) FROM entries;
+CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries
+BEGIN UPDATE usage SET bytes = bytes + NEW.size WHERE id = 0; END;
+CREATE TRIGGER IF NOT EXISTS entries_update AFTER UPDATE OF size ON entries
+BEGIN UPDATE usage SET bytes = bytes + NEW.size - OLD.size WHERE id = 0; END;
+CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries
+BEGIN UPDATE usage SET bytes = bytes - OLD.size WHERE id = 0; END;
+"""
+
+
+def make_key(namespace, *parts):
+    """Cache key for a namespace and the arguments that identify the value"""
+    return f"{namespace}:{hashlib.sha256(repr(parts).encode()).hexdigest()}"
+
+
+class SharedCache:
+    """Byte-limited LRU cache in SQLite, shared across threads and processes
+
+    Values are pickled. Entries may carry a TTL; the least recently used
+    entries are evicted once the total size passes max_bytes. Hit, miss,
+    coalesce and eviction counters live in the database too, so they cover
+    every worker on the host; recency and counters reach the database in
+    batches (see flush).
+    """
+
+    def __init__(self, path=SHARED_CACHE_PATH, max_bytes=SHARED_CACHE_MAX_BYTES, clock=time.time,
+                 flush_lookups=FLUSH_LOOKUPS, flush_seconds=FLUSH_SECONDS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self.flush_lookups = flush_lookups
+        self.flush_seconds = flush_seconds
+        self._local = threading.local()
+        self._pending_lock = threading.Lock()
+        self._touched = {}    # key -> last access time not yet written
+        self._counts = {}     # (namespace, name) -> amount not yet written
+        self._lookups = 0
+        self._flushed_at = clock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._reader().executescript(_SCHEMA)
+
+    def _reader(self):
+        """This thread's connection in autocommit mode; each statement is its own read"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _connect(self):
+        return _Transaction(self._reader())
+
+    @staticmethod
+    def _count(conn, namespace, name, amount=1):
+        conn.execute(
+            "INSERT INTO stats (namespace, name, value) VALUES (?, ?, ?) "
+            "ON CONFLICT (namespace, name) DO UPDATE SET value = value + excluded.value",
+            (namespace, name, amount)
+        )
+
+    def _buffer(self, namespace, name=None, key=None, now=None):
+        """Queue a counter bump and/or LRU touch; flushes when the batch is due"""
+        with self._pending_lock:
+            if name is not None:
+                self._counts[(namespace, name)] = self._counts.get((namespace, name), 0) + 1
+            if key is not None:
+                self._touched[key] = now
+            self._lookups += 1
+            due = self._lookups >= self.flush_lookups or self.clock() - self._flushed_at >= self.flush_seconds
+        if due:
+            try:
+                self.flush()
+            except sqlite3.Error:
+                tracing.count('shared_cache_errors_total')
+
+    def _take_pending(self):
+        with self._pending_lock:
+            touched, counts = self._touched, self._counts
+            self._touched, self._counts, self._lookups = {}, {}, 0
+            self._flushed_at = self.clock()
+        return touched, counts
+
+    def _write_pending(self, conn, touched, counts):
+        conn.executemany(
+            "UPDATE entries SET accessed_at = MAX(accessed_at, ?) WHERE key = ?",
+            [(at, key) for key, at in touched.items()]
+        )
+        for (namespace, name), amount in counts.items():
+            self._count(conn, namespace, name, amount)
+
+    def flush(self):
+        """Write buffered LRU touches and counters, and drop expired entries, in one transaction"""
+        touched, counts = self._take_pending()
+        with self._connect() as conn:
+            self._write_pending(conn, touched, counts)
+            conn.execute("DELETE FROM entries WHERE expires_at IS NOT NULL AND expires_at <= ?", (self.clock(),))
+
+    def get(self, namespace, key, count=True):
+        """The cached value, or MISSING; a plain read, with no write lock taken"""
+        now = self.clock()
+        row = self._reader().execute("SELECT value, expires_at FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None or (row[1] is not None and row[1] <= now):
+            # Expired rows are deleted by the next flush or eviction
+            if count:
+                self._buffer(namespace, 'misses')
+            return MISSING
+        self._buffer(namespace, 'hits' if count else None, key, now)
+        return pickle.loads(row[0])
+
+    def set(self, namespace, key, value, ttl=None):
+        """Store a value, evicting least recently used entries past max_bytes"""
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(blob) > self.max_bytes:
+            return False
+        now = self.clock()
+        # Buffered touches ride along, so eviction sees recent hits
+        touched, counts = self._take_pending()
+        with self._connect() as conn:
+            self._write_pending(conn, touched, counts)
+            # An upsert rather than INSERT OR REPLACE, whose implicit delete skips the usage trigger
+            conn.execute(
+                "INSERT INTO entries (key, namespace, value, size, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET namespace = excluded.namespace, "
+                "value = excluded.value, size = excluded.size, expires_at = excluded.expires_at, "
+                "accessed_at = excluded.accessed_at",
+                (key, namespace, blob, len(blob), None if ttl is None else now + ttl, now)
+            )
+            self._count(conn, namespace, 'sets')
+            self._evict(conn)
+        return True
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT bytes FROM usage WHERE id = 0").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        now = self.clock()
+        # Expired entries go first, then the least recently used
+        rows = conn.execute(
+            "SELECT key, namespace, size FROM entries "
+            "ORDER BY (expires_at IS NOT NULL AND expires_at <= ?) DESC, accessed_at",
+            (now,)
+        ).fetchall()
+        for key, namespace, size in rows:
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._count(conn, namespace, 'evictions')
+            total -= size
+
+    def acquire_lease(self, key, owner, seconds=LEASE_SECONDS):
+        """Claim the right to compute key; False while another owner holds it"""
+        now = self.clock()
+        with self._connect() as conn:
+            conn.execute("DELETE FROM leases WHERE key = ? AND expires_at <= ?", (key, now))
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO leases (key, owner, expires_at) VALUES (?, ?, ?)",
+                (key, owner, now + seconds)
+            )
+            return cursor.rowcount == 1
+
+    def release_lease(self, key, owner):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, owner))
+
+    def lease_held(self, key):
+        """Whether some owner is currently computing key"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT 1 FROM leases WHERE key = ? AND expires_at > ?", (key, self.clock())).fetchone()
+        return row is not None
+
+    def get_or_compute(self, namespace, key, compute, ttl=None):
+        """Cached value for key, computing it once across every process that asks
+
+        While one caller computes, others asking for the same key wait for its
+        result (up to the lease time) instead of repeating the work.
+        """
+        try:
+            value = self.get(namespace, key)
+            if value is not MISSING:
+                return value
+            owner = uuid.uuid4().hex
+            if not self.acquire_lease(key, owner):
+                waited_until = self.clock() + LEASE_SECONDS
+                while self.clock() < waited_until:
+                    time.sleep(LEASE_POLL_SECONDS)
+                    value = self.get(namespace, key, count=False)
+                    if value is not MISSING:
+                        self._buffer(namespace, 'coalesced')
+                        return value
+                    if self.acquire_lease(key, owner):
+                        break
+        except sqlite3.Error:
+            tracing.count('shared_cache_errors_total')
+            return compute()
+
+        try:
+            value = compute()
+            try:
+                self.set(namespace, key, value, ttl)
+            except sqlite3.Error:
+                tracing.count('shared_cache_errors_total')
+            return value
+        finally:
+            try:
+                self.release_lease(key, owner)
+            except sqlite3.Error:
+                pass
+
+    def stats(self):
+        """Per-namespace counters and hit rate, plus the stored bytes and entries"""
+        self.flush()
+        with self._connect() as conn:
+            rows = conn.execute("SELECT namespace, name, value FROM stats").fetchall()
+            usage = conn.execute(
+                "SELECT namespace, COUNT(*), COALESCE(SUM(size), 0) FROM entries GROUP BY namespace"
+            ).fetchall()
+        stats = {}
+        for namespace, name, value in rows:
+            stats.setdefault(namespace, {})[name] = value
+        for namespace, entries, size in usage:
+            stats.setdefault(namespace, {}).update(entries=entries, bytes=size)
+        for counters in stats.values():
+            lookups = counters.get('hits', 0) + counters.get('misses', 0)
+            counters['hit_rate'] = (counters.get('hits', 0) + counters.get('coalesced', 0)) / lookups if lookups else 0.0
+        return stats
+
+    def clear(self):
+        self._take_pending()
+        with self._connect() as conn:
+            conn.execute("DELETE FROM entries")
+            conn.execute("DELETE FROM leases")
+            conn.execute("DELETE FROM stats")
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT around a block, on a reused connection"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute('BEGIN IMMEDIATE')
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute('ROLLBACK' if exc_type else 'COMMIT')
+        return False
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Process-wide SharedCache, or None when disabled or the file is unusable"""
+    global _cache
+    if not SHARED_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = SharedCache()
+            except (sqlite3.Error, OSError) as e:
+                print(f"[WARN] Shared cache disabled: {e}")
+                return None
+            atexit.register(_flush_on_exit, _cache)
+        return _cache
+
+
+def _flush_on_exit(cache):
+    try:
+        cache.flush()
+    except sqlite3.Error:
+        pass
+
+
+def cached(namespace, parts, compute, ttl=None):
+    """compute() through the shared cache, keyed by namespace and parts"""
+    cache = get_cache()
+    if cache is None:
+        return compute()
+    return cache.get_or_compute(namespace, make_key(namespace, *parts), compute, ttl)
+
+
+def _shared_cache_metrics():
+    cache = get_cache()
+    if cache is None:
+        return []
+    metrics = []
+    for namespace, counters in cache.stats().items():
+        labels = {'namespace': namespace}
+        metrics.append(('shared_cache_hit_rate', labels, round(counters['hit_rate'], 6), 'gauge'))
+        metrics.append(('shared_cache_bytes', labels, counters.get('bytes', 0), 'gauge'))
+        for name in ('hits', 'misses', 'coalesced', 'evictions'):
+            metrics.append(('shared_cache_events_total', {**labels, 'event': name}, counters.get(name, 0), 'counter'))
+    return metrics
+
+
+tracing.register_collector(_shared_cache_metrics)
@@ -0,0 +1,124 @@
+import csv
+import os
+import re
+import threading
+
+# ---------------- CONFIG ----------------
+# CSV with symbol,name,aliases columns (aliases separated by '|'). Point
+# SYMBOLS_FILE at a full exchange listing to cover the whole ticker universe.
+SYMBOLS_FILE = os.getenv('SYMBOLS_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'symbols.csv'))
+
+TOKEN_PATTERN = re.compile(r"\$?\^?[A-Za-z0-9&]+(?:[.\-][A-Za-z0-9]+)*")
+
+# Any single word can be an everyday word ("coin", "hood", "sap", "reliance"),
+# so one-token matches must look like what they name: tickers in capitals or
+# as a $cashtag ("COIN", "$coin"), names capitalized ("Reliance", "Shell").
+# Lowercase text only matches as part of a multi-word name ("reliance
+# industries").
+
+_END = object()
+
+
+def tokenize(text):
+    """Split text into ticker-aware tokens, keeping dots and dashes inside symbols"""
+    return TOKEN_PATTERN.findall(text)
+
+
+class SymbolResolver:
+    """Token trie over symbols, company names and aliases
+
+    Every phrase is stored as a path of lowercase tokens, so resolving a
+    message is a single left-to-right pass with a longest-match walk at each
+    token. Whole-token matching means "and" never matches inside "brand", and
+    lookups cost the same with a hundred or a hundred thousand symbols.
+    """
+
+    def __init__(self):
+        self.trie = {}
+        self.names = {}
+
+    def add(self, phrase, symbol, ticker=False):
+        tokens = [token.lower() for token in tokenize(phrase)]
+        if not tokens:
+            return
+        rule = None
+        if len(tokens) == 1:
+            rule = 'upper' if ticker else 'title'
+        node = self.trie
+        for token in tokens:
+            node = node.setdefault(token, {})
+        node.setdefault(_END, (symbol, rule))
+
+    def add_symbol(self, symbol, name='', aliases=()):
+        symbol = symbol.strip().upper()
+        if not symbol:
+            return
+        self.names.setdefault(symbol, name or symbol)
+        self.add(symbol, symbol, ticker=True)
+        for phrase in (name, *aliases):
+            if phrase:
+                self.add(phrase, symbol)
+
+    @staticmethod
+    def _accepts(rule, original):
+        if rule == 'upper':
+            return original.isupper()
+        if rule == 'title':
+            return original[:1].isupper()
+        return True
+
+    def find_all(self, text):
+        """Return every symbol mentioned in text, in order of first mention"""
+        tokens = tokenize(text)
+        found = []
+        i = 0
+        while i < len(tokens):
+            node, match, match_end = self.trie, None, i
+            for j in range(i, len(tokens)):
+                original = tokens[j]
+                cashtag = original.startswith('$')
+                node = node.get(original.lstrip('$').lower())
+                if node is None:
+                    break
+                entry = node.get(_END)
+                if entry and (cashtag or j > i or self._accepts(entry[1], original)):
+                    match, match_end = entry[0], j + 1
+            if match:
+                if match not in found:
+                    found.append(match)
+                i = match_end
+            else:
+                i += 1
+        return found
+
+    def find_first(self, text):
+        found = self.find_all(text)
+        return found[0] if found else None
+
+
+def load_resolver(path=SYMBOLS_FILE):
+    """Build a resolver from a symbol,name,aliases CSV file"""
+    resolver = SymbolResolver()
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            aliases = [alias for alias in (row.get('aliases') or '').split('|') if alias]
+            resolver.add_symbol(row['symbol'], row.get('name', ''), aliases)
+    return resolver
+
+
+_resolver = None
+_resolver_lock = threading.Lock()
+
+
+def get_resolver():
+    """Process-wide resolver, built on first use"""
+    global _resolver
+    with _resolver_lock:
+        if _resolver is None:
+            _resolver = load_resolver()
+        return _resolver
+
+
+def find_symbols(text):
+    """All ticker symbols mentioned in text"""
+    return get_resolver().find_all(text)
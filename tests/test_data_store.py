@@ -0,0 +1,141 @@
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+
+import data_store
+
+
+def bars(start, end, dividends=None):
+    index = pd.bdate_range(start, pd.Timestamp(end) - pd.Timedelta(days=1), name='Date', tz='America/New_York')
+    frame = pd.DataFrame(
+        {'Open': 1.0, 'High': 1.0, 'Low': 1.0, 'Close': 1.0, 'Volume': 1, 'Dividends': 0.0, 'Stock Splits': 0.0},
+        index=index
+    )
+    for day, amount in (dividends or {}).items():
+        frame.loc[frame.index.date == day, 'Dividends'] = amount
+    return frame
+
+
+class FakeTicker:
+    """yf.Ticker stand-in; responses maps (start, end) to a frame, anything else is bars()"""
+
+    calls = []
+    responses = {}
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+
+    def history(self, start, end, **kwargs):
+        FakeTicker.calls.append((start, end))
+        return FakeTicker.responses.get((start, end), bars(start, end))
+
+
+@pytest.fixture(autouse=True)
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_store, 'BARS_DIR', str(tmp_path))
+    monkeypatch.setattr(data_store.yf, 'Ticker', FakeTicker)
+    FakeTicker.calls = []
+    FakeTicker.responses = {}
+
+
+def test_merge_ranges_joins_touching_and_overlapping():
+    assert data_store.merge_ranges([(5, 8), (1, 3), (3, 4), (7, 10)]) == [(1, 4), (5, 10)]
+
+
+def test_missing_ranges_returns_uncovered_parts():
+    coverage = [(date(2024, 1, 10), date(2024, 1, 20)), (date(2024, 2, 1), date(2024, 2, 10))]
+    assert data_store.missing_ranges(coverage, date(2024, 1, 1), date(2024, 2, 15)) == [
+        (date(2024, 1, 1), date(2024, 1, 10)),
+        (date(2024, 1, 20), date(2024, 2, 1)),
+        (date(2024, 2, 10), date(2024, 2, 15)),
+    ]
+    assert data_store.missing_ranges(coverage, date(2024, 1, 12), date(2024, 1, 18)) == []
+
+
+def test_second_call_only_fetches_the_gap():
+    data_store.get_history('AAA', date(2024, 1, 1), date(2024, 2, 1))
+    data_store.get_history('AAA', date(2024, 1, 15), date(2024, 3, 1))
+    assert FakeTicker.calls == [
+        (date(2024, 1, 1), date(2024, 2, 1)),
+        (date(2024, 2, 1), date(2024, 3, 1)),
+    ]
+    data, coverage = data_store.load_bars('AAA')
+    assert coverage == [(date(2024, 1, 1), date(2024, 3, 1))]
+    assert data.index.is_monotonic_increasing and not data.index.duplicated().any()
+
+
+def test_empty_fetch_is_not_recorded_as_covered():
+    FakeTicker.responses[(date(2024, 1, 1), date(2024, 2, 1))] = pd.DataFrame()
+    assert data_store.get_history('AAA', date(2024, 1, 1), date(2024, 2, 1)).empty
+    assert data_store.load_bars('AAA')[1] == []
+
+    # The range is asked for again once upstream answers
+    del FakeTicker.responses[(date(2024, 1, 1), date(2024, 2, 1))]
+    assert not data_store.get_history('AAA', date(2024, 1, 1), date(2024, 2, 1)).empty
+    assert len(FakeTicker.calls) == 2
+
+
+def test_empty_weekend_gap_is_covered():
+    saturday, monday = date(2024, 1, 6), date(2024, 1, 8)
+    FakeTicker.responses[(saturday, monday)] = pd.DataFrame()
+    data_store.get_history('AAA', date(2024, 1, 1), saturday)
+    data_store.get_history('AAA', date(2024, 1, 1), monday)
+    data_store.get_history('AAA', date(2024, 1, 1), monday)
+    assert FakeTicker.calls == [(date(2024, 1, 1), saturday), (saturday, monday)]
+    assert data_store.load_bars('AAA')[1] == [(date(2024, 1, 1), monday)]
+
+
+def test_new_dividend_refetches_on_the_current_basis(monkeypatch):
+    today = date.today()
+    start = today - timedelta(days=20)
+    middle = today - timedelta(days=10)
+    data_store.get_history('AAA', start, middle)
+    # The stored bars were adjusted 10 days ago; a dividend since then changes the basis
+    stored, _ = data_store.load_bars('AAA')
+    stored.attrs['adjusted_as_of'] = middle
+    data_store.save_bars('AAA', stored, [(start, middle)])
+
+    ex_date = pd.bdate_range(middle, today)[0].date()
+    FakeTicker.responses[(middle, today)] = bars(middle, today, {ex_date: 0.5})
+    FakeTicker.calls = []
+    data_store.get_history('AAA', start, today)
+
+    assert FakeTicker.calls == [(middle, today), (start, today)]
+    data, coverage = data_store.load_bars('AAA')
+    assert data.attrs['adjusted_as_of'] == today
+    assert coverage == [(start, today)]
+
+
+def test_stale_adjustment_basis_is_refetched(monkeypatch):
+    start, end = date(2024, 1, 1), date(2024, 2, 1)
+    data_store.get_history('AAA', start, end)
+    stored, coverage = data_store.load_bars('AAA')
+    stored.attrs['adjusted_as_of'] = date.today() - timedelta(days=data_store.ADJUSTMENT_MAX_AGE_DAYS + 1)
+    data_store.save_bars('AAA', stored, coverage)
+
+    data_store.get_history('AAA', start, end)
+    assert FakeTicker.calls == [(start, end), (start, end)]
+    assert data_store.load_bars('AAA')[0].attrs['adjusted_as_of'] == date.today()
+
+
+def test_merge_save_keeps_bars_another_worker_saved():
+    first = bars(date(2024, 1, 1), date(2024, 2, 1))
+    second = bars(date(2024, 3, 1), date(2024, 4, 1))
+    for frame in (first, second):
+        frame.attrs['adjusted_as_of'] = date(2024, 4, 1)
+    data_store.merge_save_bars('AAA', first, [(date(2024, 1, 1), date(2024, 2, 1))])
+    data_store.merge_save_bars('AAA', second, [(date(2024, 3, 1), date(2024, 4, 1))])
+
+    data, coverage = data_store.load_bars('AAA')
+    assert len(data) == len(first) + len(second)
+    assert coverage == [(date(2024, 1, 1), date(2024, 2, 1)), (date(2024, 3, 1), date(2024, 4, 1))]
+
+
+def test_empty_intraday_chunk_only_counts_on_weekends(monkeypatch):
+    day = 86400
+    friday = int(pd.Timestamp('2024-01-05', tz='UTC').timestamp())
+    saturday, monday = friday + day, friday + 3 * day
+    monkeypatch.setattr(data_store, '_fetch_chunk', lambda ticker, interval, start, end: data_store._empty_compact())
+    _, fetched = data_store.fetch_intraday('AAA', '1h', [(friday, saturday), (saturday, monday)])
+    assert fetched == [(saturday, monday)]
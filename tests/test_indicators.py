@@ -0,0 +1,47 @@
+import math
+
+import numpy as np
+import pytest
+
+import indicators
+
+
+def first_defined(state, closes):
+    """1-based count of closes after which the state's value is first defined"""
+    for count, close in enumerate(closes, start=1):
+        value = state.update(close)
+        if not any(math.isnan(v) for v in np.atleast_1d(value)):
+            return count
+    return None
+
+
+@pytest.mark.parametrize('name', ['sma_20', 'sma_50', 'rsi', 'macd'])
+def test_warmup_matches_first_defined_value(name):
+    closes = 100 + np.cumsum(np.random.default_rng(0).normal(size=120))
+    state = indicators.IndicatorSet().states[name]
+    expected = state.warmup
+    assert first_defined(state, closes) == expected
+
+
+def test_warmups_of_default_set():
+    assert indicators.IndicatorSet().warmups() == {'sma_20': 20, 'sma_50': 50, 'rsi': 14, 'macd': 34}
+
+
+def test_incremental_set_matches_vectorized_indicators():
+    closes = 100 + np.cumsum(np.random.default_rng(1).normal(size=200))
+    latest = indicators.IndicatorSet().seed(closes).values()
+    line, signal, histogram = indicators.macd(closes)
+
+    np.testing.assert_allclose(latest['sma_20'], indicators.sma(closes, 20)[0, -1])
+    np.testing.assert_allclose(latest['sma_50'], indicators.sma(closes, 50)[0, -1])
+    np.testing.assert_allclose(latest['rsi'], indicators.rsi(closes)[0, -1])
+    np.testing.assert_allclose(latest['macd'], (line[0, -1], signal[0, -1], histogram[0, -1]))
+
+
+def test_state_round_trips_through_dict():
+    closes = 100 + np.cumsum(np.random.default_rng(2).normal(size=80))
+    state = indicators.IndicatorSet().seed(closes[:60])
+    restored = indicators.state_from_dict(state.to_dict())
+    # The restored running sum is recomputed exactly, so allow rounding
+    for close in closes[60:]:
+        assert restored.update(close) == pytest.approx(state.update(close))
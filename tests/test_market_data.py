@@ -0,0 +1,80 @@
+import threading
+import time
+
+import market_data
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def prices(symbols):
+    return {symbol: {'price': float(len(symbol))} for symbol in symbols}
+
+
+def test_fresh_values_are_hits_and_expire_with_their_ttl():
+    clock = FakeClock()
+    cache = market_data.QuoteCache({'price': 10}, clock=clock)
+    calls = []
+
+    def loader(symbols):
+        calls.append(list(symbols))
+        return prices(symbols)
+
+    assert cache.get_many(['AAPL'], ['price'], loader) == {'AAPL': {'price': 4.0}}
+    cache.get_many(['AAPL'], ['price'], loader)
+    assert calls == [['AAPL']]
+    clock.now = 10
+    cache.get_many(['AAPL'], ['price'], loader)
+    assert calls == [['AAPL'], ['AAPL']]
+    assert cache.snapshot()['hits'] == 1
+
+
+def test_least_recently_used_symbol_is_evicted():
+    cache = market_data.QuoteCache({'price': 60}, clock=FakeClock(), max_symbols=2)
+    cache.get_many(['A', 'B'], ['price'], prices)
+    cache.get_many(['A'], ['price'], prices)   # B is now least recent
+    cache.get_many(['C'], ['price'], prices)
+    assert cache.stale(['A', 'B', 'C'], ['price']) == ['B']
+
+
+def test_concurrent_misses_share_one_load():
+    cache = market_data.QuoteCache({'price': 60}, clock=FakeClock())
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def slow_loader(symbols):
+        calls.append(list(symbols))
+        started.set()
+        release.wait(5)
+        return prices(symbols)
+
+    results = []
+    first = threading.Thread(target=lambda: results.append(cache.get_many(['MSFT'], ['price'], slow_loader)))
+    first.start()
+    assert started.wait(5)
+    second = threading.Thread(target=lambda: results.append(cache.get_many(['MSFT'], ['price'], slow_loader)))
+    second.start()
+    waited_until = time.monotonic() + 2
+    while cache.snapshot()['coalesced'] == 0 and time.monotonic() < waited_until:
+        time.sleep(0.01)
+    release.set()
+    first.join(5)
+    second.join(5)
+
+    assert calls == [['MSFT']]
+    assert results == [{'MSFT': {'price': 4.0}}] * 2
+
+
+def test_failed_load_is_not_cached():
+    cache = market_data.QuoteCache({'price': 60}, clock=FakeClock())
+
+    def failing(symbols):
+        raise RuntimeError('upstream down')
+
+    assert cache.get_many(['AAPL'], ['price'], failing) == {}
+    assert cache.get_many(['AAPL'], ['price'], prices) == {'AAPL': {'price': 4.0}}
@@ -0,0 +1,145 @@
+import time
+
+import pytest
+
+import providers
+import upstream
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeProvider(providers.Provider):
+    name = 'fake'
+
+    def __init__(self, clock):
+        super().__init__()
+        self.breakers = {
+            'histories': providers.CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock),
+            'news': providers.CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock),
+        }
+        self.error = None
+
+    def histories(self, symbols, period, priority=0):
+        if self.error is not None:
+            raise self.error
+        return {symbol: 'bars' for symbol in symbols}
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_breaker_opens_after_threshold_and_half_opens_after_reset(clock):
+    breaker = providers.CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == providers.OPEN
+    assert not breaker.allow()
+
+    clock.now = 10
+    assert breaker.allow()
+    assert breaker.state == providers.HALF_OPEN
+    # Only one trial at a time
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == providers.CLOSED
+    assert breaker.allow()
+
+
+def test_failed_trial_reopens(clock):
+    breaker = providers.CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    clock.now = 10
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == providers.OPEN
+    assert not breaker.allow()
+
+
+def test_release_trial_keeps_failure_count(clock):
+    breaker = providers.CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    clock.now = 10
+    assert breaker.allow()
+    breaker.release_trial()
+    assert breaker.state == providers.HALF_OPEN
+    assert breaker.failures == 1
+    assert breaker.allow()
+
+
+def test_deadline_exceeded_trial_does_not_wedge_breaker(clock):
+    provider = FakeProvider(clock)
+    breaker = provider.breakers['histories']
+    breaker.record_failure()
+    breaker.record_failure()
+    clock.now = 10
+
+    provider.error = upstream.DeadlineExceeded('out of time')
+    with pytest.raises(providers.ProviderError):
+        providers.hedged([provider], 'histories', ['AAPL'], '1mo', hedge_delay=0, budget=1)
+    # The breaker is updated from the future's done callback, just after hedged() sees the result
+    waited_until = time.monotonic() + 2
+    while breaker._trial_running and time.monotonic() < waited_until:
+        time.sleep(0.01)
+    assert not breaker._trial_running
+
+    provider.error = None
+    assert providers.hedged([provider], 'histories', ['AAPL'], '1mo', hedge_delay=0, budget=1) == \
+        (provider, {'AAPL': 'bars'})
+    assert breaker.state == providers.CLOSED
+
+
+def test_histories_and_news_have_separate_breakers(clock):
+    provider = FakeProvider(clock)
+    provider.breakers['histories'].record_failure()
+    provider.breakers['histories'].record_failure()
+    assert not provider.breakers['histories'].allow()
+    assert provider.breakers['news'].allow()
+
+
+class FakeClient:
+    api_key = 'test'
+
+    def __init__(self, series):
+        self.series = series
+        self.functions = []
+
+    def query(self, params, priority=0):
+        self.functions.append(params['function'])
+        return self.series.get(params['symbol'])
+
+
+def test_alpha_vantage_uses_free_endpoint_and_skips_unsupported(monkeypatch):
+    client = FakeClient({'IBM': {'Time Series (Daily)': {
+        '2024-01-02': {'1. open': '10', '2. high': '12', '3. low': '9', '4. close': '11', '5. volume': '100'},
+        '2024-01-03': {'1. open': '11', '2. high': '13', '3. low': '10', '4. close': '12', '5. volume': '200'},
+    }}})
+    monkeypatch.setattr(providers.alpha_vantage, 'get_client', lambda: client)
+    monkeypatch.setattr(providers, 'ALPHA_VANTAGE_ADJUSTED', False)
+
+    histories = providers.AlphaVantageProvider().histories(['IBM', 'RELIANCE.NS'], '1mo')
+    assert client.functions == ['TIME_SERIES_DAILY', 'TIME_SERIES_DAILY']
+    assert list(histories) == ['IBM']
+    assert histories['IBM']['Close'].tolist() == [11.0, 12.0]
+    assert histories['IBM']['Volume'].tolist() == [100, 200]
+
+
+def test_alpha_vantage_adjusted_series_scales_ohlc(monkeypatch):
+    client = FakeClient({'IBM': {'Time Series (Daily)': {
+        '2024-01-02': {'1. open': '10', '2. high': '12', '3. low': '8', '4. close': '10',
+                       '5. adjusted close': '5', '6. volume': '100'},
+    }}})
+    monkeypatch.setattr(providers.alpha_vantage, 'get_client', lambda: client)
+    monkeypatch.setattr(providers, 'ALPHA_VANTAGE_ADJUSTED', True)
+
+    bars = providers.AlphaVantageProvider().histories(['IBM'], '1mo')['IBM']
+    assert client.functions == ['TIME_SERIES_DAILY_ADJUSTED']
+    assert bars.iloc[0][['Open', 'High', 'Low', 'Close']].tolist() == [5.0, 6.0, 4.0, 5.0]
@@ -0,0 +1,49 @@
+import pytest
+
+import symbol_resolver
+
+
+@pytest.fixture(scope='module')
+def resolver():
+    return symbol_resolver.load_resolver()
+
+
+@pytest.mark.parametrize('text', [
+    'buy a coin',
+    'the hood',
+    'reliance on data',
+    'the sap is flowing',
+    'a stock to watch',
+    'is it up or down',
+    'should I go long',
+])
+def test_everyday_lowercase_words_do_not_resolve(resolver, text):
+    assert resolver.find_all(text) == []
+
+
+@pytest.mark.parametrize('text, symbols', [
+    ('COIN price', ['COIN']),
+    ('$hood news', ['HOOD']),
+    ('SAP price', ['SAP']),
+    ('V price', ['V']),
+    ('Reliance price', ['RELIANCE.NS']),
+    ('reliance industries share price', ['RELIANCE.NS']),
+    ('Apple stock', ['AAPL']),
+    ('compare AAPL vs TSLA', ['AAPL', 'TSLA']),
+    ('Nifty 50 today', ['^NSEI']),
+    ('how is the s&p 500 doing', ['^GSPC']),
+])
+def test_tickers_cashtags_and_names_resolve(resolver, text, symbols):
+    assert resolver.find_all(text) == symbols
+
+
+def test_matches_whole_tokens_only(resolver):
+    assert resolver.find_all('the BRAND new AAPLE') == []
+
+
+def test_longest_name_wins():
+    resolver = symbol_resolver.SymbolResolver()
+    resolver.add_symbol('X', 'Bank')
+    resolver.add_symbol('Y', 'Bank of America')
+    assert resolver.find_all('Bank of America earnings') == ['Y']
+    assert resolver.find_all('Bank earnings') == ['X']
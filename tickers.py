@@ -0,0 +1,81 @@
+# COMPREHENSIVE STOCK OPTIONS
+# Display name -> ticker; "--- Group ---" keys with None values separate groups
+TICKER_OPTIONS = {
+    "--- Popular US Tech Stocks ---": None,
+    "Apple (AAPL)": "AAPL", "Microsoft (MSFT)": "MSFT", "Alphabet/Google (GOOGL)": "GOOGL",
+    "Amazon (AMZN)": "AMZN", "Tesla (TSLA)": "TSLA", "Meta Platforms (META)": "META",
+    "NVIDIA (NVDA)": "NVDA", "Netflix (NFLX)": "NFLX", "Adobe (ADBE)": "ADBE",
+    "Salesforce (CRM)": "CRM", "Oracle (ORCL)": "ORCL", "Intel (INTC)": "INTC",
+    "AMD (AMD)": "AMD", "Cisco (CSCO)": "CSCO", "IBM (IBM)": "IBM",
+    
+    "--- US Financial & Healthcare ---": None,
+    "Berkshire Hathaway (BRK-B)": "BRK-B", "J.P. Morgan Chase (JPM)": "JPM", "Visa (V)": "V",
+    "Mastercard (MA)": "MA", "Bank of America (BAC)": "BAC", "Wells Fargo (WFC)": "WFC",
+    "Johnson & Johnson (JNJ)": "JNJ", "Pfizer (PFE)": "PFE", "UnitedHealth (UNH)": "UNH",
+    "Moderna (MRNA)": "MRNA", "AbbVie (ABBV)": "ABBV", "Merck (MRK)": "MRK",
+    
+    "--- US Consumer & Industrial ---": None,
+    "Walmart (WMT)": "WMT", "Procter & Gamble (PG)": "PG", "Coca-Cola (KO)": "KO",
+    "PepsiCo (PEP)": "PEP", "McDonald's (MCD)": "MCD", "Nike (NKE)": "NKE",
+    "Home Depot (HD)": "HD", "Disney (DIS)": "DIS", "Starbucks (SBUX)": "SBUX",
+    "Boeing (BA)": "BA", "Caterpillar (CAT)": "CAT", "3M (MMM)": "MMM",
+    
+    "--- US Energy & Utilities ---": None,
+    "Exxon Mobil (XOM)": "XOM", "Chevron (CVX)": "CVX", "ConocoPhillips (COP)": "COP",
+    "NextEra Energy (NEE)": "NEE", "Dominion Energy (D)": "D", "Duke Energy (DUK)": "DUK",
+    
+    "--- Indian Stocks (NSE) ---": None,
+    "Reliance Industries (RELIANCE.NS)": "RELIANCE.NS", "Tata Consultancy (TCS.NS)": "TCS.NS",
+    "HDFC Bank (HDFCBANK.NS)": "HDFCBANK.NS", "Infosys (INFY.NS)": "INFY.NS",
+    "ICICI Bank (ICICIBANK.NS)": "ICICIBANK.NS", "State Bank of India (SBIN.NS)": "SBIN.NS",
+    "Hindustan Unilever (HINDUNILVR.NS)": "HINDUNILVR.NS", "ITC (ITC.NS)": "ITC.NS",
+    "Bharti Airtel (BHARTIARTL.NS)": "BHARTIARTL.NS", "Kotak Mahindra Bank (KOTAKBANK.NS)": "KOTAKBANK.NS",
+    "Larsen & Toubro (LT.NS)": "LT.NS", "Asian Paints (ASIANPAINT.NS)": "ASIANPAINT.NS",
+    "Maruti Suzuki (MARUTI.NS)": "MARUTI.NS", "Wipro (WIPRO.NS)": "WIPRO.NS",
+    "HCL Technologies (HCLTECH.NS)": "HCLTECH.NS", "Tech Mahindra (TECHM.NS)": "TECHM.NS",
+    
+    "--- Chinese & Asian Stocks ---": None,
+    "Alibaba (BABA)": "BABA", "Tencent (TCEHY)": "TCEHY", "JD.com (JD)": "JD",
+    "Baidu (BIDU)": "BIDU", "NIO (NIO)": "NIO", "Pinduoduo (PDD)": "PDD",
+    "Toyota Motor (TM)": "TM", "Sony (SONY)": "SONY", "SoftBank (SFTBY)": "SFTBY",
+    "Samsung (005930.KS)": "005930.KS", "Taiwan Semiconductor (TSM)": "TSM",
+    
+    "--- European Stocks ---": None,
+    "ASML Holding (ASML)": "ASML", "SAP (SAP)": "SAP", "Nestle (NSRGY)": "NSRGY",
+    "LVMH (LVMUY)": "LVMUY", "Unilever (UL)": "UL", "Shell (SHEL)": "SHEL",
+    "Novo Nordisk (NVO)": "NVO", "Roche (RHHBY)": "RHHBY", "Siemens (SIEGY)": "SIEGY",
+    
+    "--- Cryptocurrency Stocks ---": None,
+    "Coinbase (COIN)": "COIN", "MicroStrategy (MSTR)": "MSTR", "Block (SQ)": "SQ",
+    "PayPal (PYPL)": "PYPL", "Robinhood (HOOD)": "HOOD",
+    
+    "--- ETFs & Funds ---": None,
+    "SPDR S&P 500 ETF (SPY)": "SPY", "Invesco QQQ (QQQ)": "QQQ", "Vanguard Total Stock (VTI)": "VTI",
+    "iShares MSCI Emerging Markets (EEM)": "EEM", "Vanguard FTSE Developed (VEA)": "VEA",
+    "ARK Innovation ETF (ARKK)": "ARKK", "Technology Select Sector (XLK)": "XLK",
+    
+    "--- Global Market Indices ---": None,
+    "S&P 500 (^GSPC)": "^GSPC", "Dow Jones (^DJI)": "^DJI", "Nasdaq Composite (^IXIC)": "^IXIC",
+    "Nasdaq 100 (^NDX)": "^NDX", "Russell 2000 (^RUT)": "^RUT",
+    "Nifty 50 India (^NSEI)": "^NSEI", "Sensex India (^BSESN)": "^BSESN",
+    "FTSE 100 UK (^FTSE)": "^FTSE", "DAX Germany (^GDAXI)": "^GDAXI",
+    "CAC 40 France (^FCHI)": "^FCHI", "Nikkei 225 Japan (^N225)": "^N225",
+    "Hang Seng Hong Kong (^HSI)": "^HSI", "Shanghai Composite (000001.SS)": "000001.SS"
+}
+
+
+def display_options():
+    """Display name -> ticker, without the group separators"""
+    return {name: symbol for name, symbol in TICKER_OPTIONS.items() if symbol is not None}
+
+
+def ticker_groups():
+    """Group name -> list of tickers, in the order they are listed"""
+    groups, current = {}, None
+    for name, symbol in TICKER_OPTIONS.items():
+        if symbol is None:
+            current = name.strip('- ').strip()
+            groups[current] = []
+        elif current is not None:
+            groups[current].append(symbol)
+    return groups
@@ -0,0 +1,186 @@
+import contextvars
+import functools
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ---------------- CONFIG ----------------
+ENABLED = os.getenv('TRACING_ENABLED', '').lower() in ('1', 'true', 'yes')
+METRICS_PORT = int(os.getenv('METRICS_PORT', 0))
+# Quantiles are computed over this many recent samples per stage
+SAMPLE_WINDOW = int(os.getenv('TRACING_SAMPLE_WINDOW', 2048))
+QUANTILES = (0.5, 0.95, 0.99)
+
+_NOOP = nullcontext()
+_lock = threading.Lock()
+_stages = {}      # stage -> {'samples': deque, 'count': int, 'sum': float}
+_counters = {}    # (name, labels) -> value
+_collectors = []  # callables returning [(name, labels, value, type)]
+_capture = contextvars.ContextVar('tracing_capture', default=None)
+_server = None
+
+
+class _Span:
+    __slots__ = ('name', 'started')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        observe(self.name, time.perf_counter() - self.started)
+        return False
+
+
+def span(name):
+    """Time a block as one stage; a shared no-op when tracing is off"""
+    if not ENABLED and _capture.get() is None:
+        return _NOOP
+    return _Span(name)
+
+
+def traced(name):
+    """Decorator form of span()"""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def observe(name, seconds):
+    """Record a duration measured elsewhere (e.g. in a worker process)"""
+    captured = _capture.get()
+    if captured is not None:
+        captured.append((name, seconds))
+    if not ENABLED:
+        return
+    with _lock:
+        stage = _stages.get(name)
+        if stage is None:
+            stage = _stages[name] = {'samples': deque(maxlen=SAMPLE_WINDOW), 'count': 0, 'sum': 0.0}
+        stage['samples'].append(seconds)
+        stage['count'] += 1
+        stage['sum'] += seconds
+
+
+def count(name, amount=1, **labels):
+    """Increment a counter such as upstream errors"""
+    if not ENABLED:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def register_collector(collector):
+    """Add a callable that reports extra metrics (e.g. cache hit rates) at scrape time"""
+    if collector not in _collectors:
+        _collectors.append(collector)
+
+
+@contextmanager
+def capture():
+    """Collect the (stage, seconds) spans of the current request, e.g. for a debug panel"""
+    spans = []
+    token = _capture.set(spans)
+    try:
+        yield spans
+    finally:
+        _capture.reset(token)
+
+
+def _quantile(sorted_samples, q):
+    index = min(len(sorted_samples) - 1, int(round(q * (len(sorted_samples) - 1))))
+    return sorted_samples[index]
+
+
+def stage_summary():
+    """Per-stage count, sum and p50/p95/p99 in seconds"""
+    with _lock:
+        stages = {name: (sorted(s['samples']), s['count'], s['sum']) for name, s in _stages.items()}
+    summary = {}
+    for name, (samples, total_count, total_sum) in stages.items():
+        summary[name] = {'count': total_count, 'sum': total_sum}
+        for q in QUANTILES:
+            summary[name][f"p{int(q * 100)}"] = _quantile(samples, q) if samples else 0.0
+    return summary
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    body = ','.join(f'{key}="{str(value)}"' for key, value in labels)
+    return '{' + body + '}'
+
+
+def render_prometheus():
+    """All metrics in the Prometheus text exposition format"""
+    lines = ['# TYPE stage_seconds summary']
+    for name, stats in sorted(stage_summary().items()):
+        for q in QUANTILES:
+            labels = _format_labels((('stage', name), ('quantile', q)))
+            lines.append(f"stage_seconds{labels} {stats[f'p{int(q * 100)}']:.6f}")
+        lines.append(f"stage_seconds_sum{_format_labels((('stage', name),))} {stats['sum']:.6f}")
+        lines.append(f"stage_seconds_count{_format_labels((('stage', name),))} {stats['count']}")
+
+    with _lock:
+        counters = sorted(_counters.items())
+    declared = set()
+    for (name, labels), value in counters:
+        if name not in declared:
+            lines.append(f"# TYPE {name} counter")
+            declared.add(name)
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+
+    for collector in list(_collectors):
+        try:
+            metrics = collector()
+        except Exception:
+            continue
+        for name, labels, value, metric_type in metrics:
+            if name not in declared:
+                lines.append(f"# TYPE {name} {metric_type}")
+                declared.add(name)
+            lines.append(f"{name}{_format_labels(tuple(sorted(labels.items())))} {value}")
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = render_prometheus().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_metrics_server(port=METRICS_PORT):
+    """Serve /metrics on a background thread once per process; no-op when disabled"""
+    global _server
+    if not ENABLED or not port:
+        return None
+    with _lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer(('0.0.0.0', port), _MetricsHandler)
+            except OSError as e:
+                print(f"[WARN] Metrics endpoint not started on port {port}: {e}")
+                return None
+            threading.Thread(target=_server.serve_forever, daemon=True, name='metrics').start()
+        return _server
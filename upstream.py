@@ -0,0 +1,129 @@
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import tracing
+
+# ---------------- CONFIG ----------------
+# Limits apply to blocking upstream calls wherever they run, so sync callers
+# and the async chat handlers share the same budget.
+GLOBAL_LIMIT = int(os.getenv('UPSTREAM_MAX_CONCURRENCY', 16))
+HOST_LIMITS = {
+    'yahoo': int(os.getenv('UPSTREAM_YAHOO_CONCURRENCY', 8)),
+    'alphavantage': int(os.getenv('UPSTREAM_ALPHAVANTAGE_CONCURRENCY', 2)),
+}
+DEFAULT_HOST_LIMIT = 4
+REQUEST_DEADLINE = float(os.getenv('REQUEST_DEADLINE_SECONDS', 20))
+HANDLER_WORKERS = int(os.getenv('CHAT_HANDLER_WORKERS', 32))
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a request runs out of time before an upstream call starts"""
+
+
+_deadline = contextvars.ContextVar('upstream_deadline', default=None)
+_global_slots = threading.BoundedSemaphore(GLOBAL_LIMIT)
+_host_slots = {}
+_host_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=HANDLER_WORKERS, thread_name_prefix='chat')
+
+
+def _host_semaphore(host):
+    with _host_lock:
+        if host not in _host_slots:
+            _host_slots[host] = threading.BoundedSemaphore(HOST_LIMITS.get(host, DEFAULT_HOST_LIMIT))
+        return _host_slots[host]
+
+
+def remaining(default=None):
+    """Seconds left before the current request's deadline, or default if none is set"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return default
+    return max(0.0, deadline - time.monotonic())
+
+
+def timeout_for(limit):
+    """Per-call timeout capped by the time left on the request deadline"""
+    left = remaining()
+    return limit if left is None else min(limit, left)
+
+
+@contextmanager
+def deadline(seconds):
+    """Set a deadline for every upstream call made inside the block"""
+    with _deadline_at(time.monotonic() + seconds):
+        yield
+
+
+@contextmanager
+def _deadline_at(ends_at):
+    token = _deadline.set(ends_at)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+@contextmanager
+def slot(host, call='request'):
+    """Hold a global and a per-host concurrency slot for one upstream call
+
+    The call itself is traced as the '<host>.<call>' stage and failures are
+    counted per host.
+    """
+    host_slots = _host_semaphore(host)
+    try:
+        if remaining() == 0:
+            raise DeadlineExceeded(f"request deadline passed before calling {host}")
+        if not _global_slots.acquire(timeout=remaining()):
+            raise DeadlineExceeded(f"no upstream slot free before the deadline ({host})")
+    except DeadlineExceeded:
+        tracing.count('upstream_deadline_exceeded_total', host=host)
+        raise
+    try:
+        if not host_slots.acquire(timeout=remaining()):
+            tracing.count('upstream_deadline_exceeded_total', host=host)
+            raise DeadlineExceeded(f"no {host} slot free before the deadline")
+        try:
+            with tracing.span(f"{host}.{call}"):
+                yield
+        except Exception:
+            tracing.count('upstream_errors_total', host=host, call=call)
+            raise
+        finally:
+            host_slots.release()
+    finally:
+        _global_slots.release()
+
+
+def submit(pool, func, *args):
+    """Submit to a thread pool, carrying the caller's deadline into the worker"""
+    return pool.submit(contextvars.copy_context().run, func, *args)
+
+
+async def run(func, *args, timeout=REQUEST_DEADLINE):
+    """Run blocking work off the event loop under a request deadline
+
+    Timing out only stops the wait; a worker thread cannot be interrupted.
+    The worker shares the awaiter's deadline, though: work still queued when
+    it passes is skipped, slot() refuses new upstream calls, and calls that
+    take a timeout have it capped by timeout_for, so their slots free up
+    around the deadline. Calls without one (yfinance .info and .news) hold
+    their slot until the upstream answers.
+    """
+    loop = asyncio.get_running_loop()
+    # Fixed at submission, so time spent queued for a worker counts too
+    ends_at = time.monotonic() + timeout
+
+    def call():
+        with _deadline_at(ends_at):
+            if remaining() == 0:
+                raise DeadlineExceeded("request deadline passed before the work started")
+            return func(*args)
+
+    return await asyncio.wait_for(loop.run_in_executor(_executor, call), timeout=timeout)